@@ -1,159 +1,119 @@
+import math
+import os
+from concurrent.futures import wait
+
 import streamlit as st
-import pandas as pd
-import polars as pl
 
-from src.data_loader import load_data
-from src.preprocessing import preprocess, filter_candidates
-from src.analysis import compute_totals, build_percentile_table, percentile_of_score, rank_of_score, counts_at_thresholds
-from src.conversion import convert_score_via_percentile
-from src.plots import histogram_with_score
-from src.ui import render_header, render_stat_cards
+# pandas / polars / plotly được import muộn, ở nhánh code cần đến chúng,
+# để trang hiện ra ngay (xem benchmarks/bench_startup.py)
+from src.conversion import ConversionJobs
+from src.registry import DATASETS, DatasetRegistry, parse_datasets
+from src.schemes import apply_bonus, load_schemes
+from src.ui import render_header, render_stat_cards, render_debug_panel, render_loading
+from src import instrumentation
 
 st.set_page_config(page_title="Tra cứu điểm THPT 2025", layout="wide")
 
-# ---------- helpers ----------
-def df_len(df_obj):
-    if isinstance(df_obj, pl.DataFrame):
-        return df_obj.height
-    return len(df_obj)
-
-def count_non_null(df_obj, col, backend):
-    if backend == "polars":
-        return int(df_obj.select(pl.col(col).is_not_null().sum()).item())
-    else:
-        return int(df_obj[col].notna().sum())
+# đo thời gian cả lần chạy lại (THPT_INSTRUMENT=1, xem src/instrumentation.py)
+_rerun_timer = instrumentation.start("app.rerun")
+_profile = (instrumentation.Profile().start()
+            if instrumentation.ENABLED and st.session_state.get("debug_profile") else None)
+
+MIN_STUDENTS_PER_BLOCK = 1
+# lưu điểm dạng mã số nguyên (src/compact.py); kết quả giống hệt float64
+COMPACT_SCORES = os.environ.get("THPT_COMPACT_SCORES", "1") != "0"
+# đọc CSV theo từng chunk (src/streaming.py) cho file lớn hơn RAM
+STREAMING_INGEST = os.environ.get("THPT_STREAMING", "0") == "1"
+# số luồng tính block index; 0 = tất cả nhân CPU
+INDEX_WORKERS = int(os.environ.get("THPT_INDEX_WORKERS", "0"))
+# chuẩn bị dữ liệu ở luồng nền, giao diện hiện ngay; 0 = chờ xong mới vẽ
+BACKGROUND_LOAD = os.environ.get("THPT_BACKGROUND_LOAD", "1") != "0"
+# chờ tối đa (giây) việc quy đổi chạy nền trước khi hiện ô chờ
+CONVERT_WAIT_SECONDS = 0.05
+# số khối gợi ý theo điểm từng môn
+TOP_K_BLOCKS = 5
 
-def df_copy(df_obj, backend):
-    return df_obj.clone() if backend == "polars" else df_obj.copy()
+# ---------- helpers ----------
+@st.cache_resource
+def get_registry():
+    """
+    Dataset registry (THPT_DATASETS, one file per year; src/registry.py)
+    shared by every session and rerun. Datasets are loaded in its
+    background thread and evicted by LRU under THPT_MEMORY_BUDGET_MB.
+    """
+    return DatasetRegistry(parse_datasets(DATASETS), compact=COMPACT_SCORES,
+                           streaming=STREAMING_INGEST, min_count=MIN_STUDENTS_PER_BLOCK,
+                           workers=INDEX_WORKERS, schemes=load_schemes())
+
+@st.cache_resource
+def get_conversion_jobs():
+    """
+    Background pool for conversions, shared by all sessions (src/conversion.py).
+    """
+    return ConversionJobs()
+
+def end_rerun():
+    """
+    Stop the rerun timer and profiler, then draw the debug panel. Runs at
+    the end of the script and before every st.stop(), so cProfile never
+    stays enabled on the script thread into the next rerun.
+    """
+    _rerun_timer.stop()
+    if instrumentation.ENABLED:
+        if _profile is not None:
+            st.session_state.debug_profile_text = _profile.stop()
+        render_debug_panel(instrumentation.snapshot(), instrumentation.samples,
+                           st.session_state.get("debug_profile_text"))
 
 # --- Header ---
 render_header()
 st.write("")
 
-# --- Load data ---
-DATA_PATH = "data/diem_2018.csv"
+# --- Load data + block index ---
+registry = get_registry()
+years = registry.names()
+if not years:
+    st.error("Chưa khai báo bộ dữ liệu nào (THPT_DATASETS).")
+    end_rerun()
+    st.stop()
+sel_year = st.sidebar.selectbox("Năm dữ liệu", years, key="sel_year") if len(years) > 1 else years[0]
+
 try:
-    df_raw, backend = load_data(DATA_PATH, use_polars_if_possible=True)
+    loading = registry.load_async(sel_year)
+    if not BACKGROUND_LOAD:
+        with st.spinner("Đang chuẩn bị dữ liệu..."):
+            loading.result()
 except Exception as e:
     st.error(f"Lỗi khi đọc dữ liệu: {e}")
+    end_rerun()
     st.stop()
 
-# --- Preprocess ---
-df_proc, subjects, backend = preprocess(df_raw, backend)
-if len(subjects) == 0:
-    st.error("Không tìm thấy cột môn hợp lệ trong file dữ liệu.")
+if not loading.done():
+    # trang đã hiện; tự chạy lại khi dữ liệu sẵn sàng
+    render_loading(loading)
+    end_rerun()
     st.stop()
 
-# --- Build blocks ---
-BLOCKS = {
-    # Khối A
-    "A00": ["Toán", "Lí", "Hóa"],
-    "A01": ["Toán", "Lí", "Tiếng Anh"],
-    "A02": ["Toán", "Lí", "Sinh"],
-    "A03": ["Toán", "Lí", "Sử"],
-    "A04": ["Toán", "Lí", "Địa"],
-    "A05": ["Toán", "Hóa", "Sử"],
-    "A06": ["Toán", "Hóa", "Địa"],
-    "A07": ["Toán", "Sử", "Địa"],
-    "A08": ["Toán", "Sử", "Giáo dục kinh tế và pháp luật"],
-    "A09": ["Toán", "Địa", "Giáo dục kinh tế và pháp luật"],
-    "A10": ["Toán", "Lí", "Giáo dục kinh tế và pháp luật"],
-    "A11": ["Toán", "Hóa", "Giáo dục kinh tế và pháp luật"],
-
-    # Khối B
-    "B00": ["Toán", "Hóa", "Sinh"],
-    "B02": ["Toán", "Sinh", "Địa"],
-    "B03": ["Toán", "Sinh", "Văn"],
-    "B04": ["Toán", "Sinh", "Giáo dục kinh tế và pháp luật"],
-    "B08": ["Toán", "Sinh", "Tiếng Anh"],
-
-    # Khối C
-    "C00": ["Văn", "Sử", "Địa"],
-    "C01": ["Văn", "Toán", "Lí"],
-    "C02": ["Văn", "Toán", "Hóa"],
-    "C03": ["Văn", "Toán", "Sử"],
-    "C04": ["Văn", "Toán", "Địa"],
-    "C05": ["Văn", "Lí", "Hóa"],
-    "C08": ["Văn", "Hóa", "Sinh"],
-    "C12": ["Văn", "Sử", "Sinh"],
-    "C13": ["Văn", "Sinh", "Địa"],
-    "C14": ["Văn", "Toán", "Giáo dục kinh tế và pháp luật"],
-    "C17": ["Văn", "Hóa", "Giáo dục kinh tế và pháp luật"],
-    "C19": ["Văn", "Sử", "Giáo dục kinh tế và pháp luật"],
-    "C20": ["Văn", "Địa", "Giáo dục kinh tế và pháp luật"],
-
-    # Khối D
-    "D01": ["Văn", "Toán", "Tiếng Anh"],
-    "D02": ["Văn", "Toán", "Tiếng Nga"],
-    "D03": ["Văn", "Toán", "Tiếng Pháp"],
-    "D04": ["Văn", "Toán", "Tiếng Trung"],
-    "D05": ["Văn", "Toán", "Tiếng Đức"],
-    "D06": ["Văn", "Toán", "Tiếng Nhật"],
-    "D07": ["Toán", "Hóa", "Tiếng Anh"],
-    "D08": ["Toán", "Sinh", "Tiếng Anh"],
-    "D09": ["Toán", "Sử", "Tiếng Anh"],
-    "D10": ["Toán", "Địa", "Tiếng Anh"],
-    "D11": ["Văn", "Lí", "Tiếng Anh"],
-    "D12": ["Văn", "Hóa", "Tiếng Anh"],
-    "D13": ["Văn", "Sinh", "Tiếng Anh"],
-    "D14": ["Văn", "Sử", "Tiếng Anh"],
-    "D15": ["Văn", "Địa", "Tiếng Anh"],
-    "D20": ["Toán", "Địa", "Tiếng Trung"],
-    "D21": ["Toán", "Hóa", "Tiếng Đức"],
-    "D22": ["Toán", "Hóa", "Tiếng Nga"],
-    "D23": ["Toán", "Hóa", "Tiếng Nhật"],
-    "D24": ["Toán", "Hóa", "Tiếng Pháp"],
-    "D25": ["Toán", "Hóa", "Tiếng Trung"],
-    "D26": ["Toán", "Lí", "Tiếng Đức"],
-    "D27": ["Toán", "Lí", "Tiếng Nga"],
-    "D28": ["Toán", "Lí", "Tiếng Nhật"],
-    "D29": ["Toán", "Lí", "Tiếng Pháp"],
-    "D30": ["Toán", "Lí", "Tiếng Trung"],
-    "D31": ["Toán", "Sinh", "Tiếng Đức"],
-    "D32": ["Toán", "Sinh", "Tiếng Nga"],
-    "D33": ["Toán", "Sinh", "Tiếng Nhật"],
-    "D34": ["Toán", "Sinh", "Tiếng Pháp"],
-    "D35": ["Toán", "Sinh", "Tiếng Trung"],
-    "D42": ["Văn", "Địa", "Tiếng Nga"],
-    "D43": ["Văn", "Địa", "Tiếng Nhật"],
-    "D44": ["Văn", "Địa", "Tiếng Pháp"],
-    "D45": ["Văn", "Địa", "Tiếng Trung"],
-    "D55": ["Văn", "Lí", "Tiếng Trung"],
-    "D63": ["Văn", "Sử", "Tiếng Nhật"],
-    "D64": ["Văn", "Sử", "Tiếng Pháp"],
-    "D65": ["Văn", "Sử", "Tiếng Trung"],
-    "D66": ["Văn", "Giáo dục kinh tế và pháp luật", "Tiếng Anh"],
-    "D68": ["Văn", "Giáo dục kinh tế và pháp luật", "Tiếng Nga"],
-    "D70": ["Văn", "Giáo dục kinh tế và pháp luật", "Tiếng Pháp"],
-    "D71": ["Văn", "Giáo dục kinh tế và pháp luật", "Tiếng Trung"],
-    "D84": ["Toán", "Tiếng Anh", "Giáo dục kinh tế và pháp luật"],
-}
-
-
-MIN_STUDENTS_PER_BLOCK = 1
-available_blocks = []
-
-for code, subs in BLOCKS.items():
-    if all(sub in subjects for sub in subs):
-        valid_students = filter_candidates(df_proc, subs)
-        if df_len(valid_students) >= MIN_STUDENTS_PER_BLOCK:
-            available_blocks.append(code)
-
-for subj in subjects:
-    try:
-        cnt = count_non_null(df_proc, subj, backend)
-        if cnt >= MIN_STUDENTS_PER_BLOCK:
-            available_blocks.append(subj)
-    except Exception:
-        pass
+try:
+    with instrumentation.stage("app.load"):
+        dataset = loading.result()  # tải lỗi: lần chạy lại sau sẽ thử tải lại
+except Exception as e:
+    st.error(f"Lỗi khi đọc dữ liệu: {e}")
+    end_rerun()
+    st.stop()
+subjects, block_index, conversion = dataset.subjects, dataset.block_index, dataset.conversion
+conversion_jobs = get_conversion_jobs()
 
-if not available_blocks:
-    available_blocks = subjects
+if len(subjects) == 0 or not block_index:
+    st.error("Không tìm thấy cột môn hợp lệ trong file dữ liệu.")
+    end_rerun()
+    st.stop()
 
-default_block = "A00" if all(s in subjects for s in ["Toán","Lí","Hóa"]) else subjects[0]
+available_blocks = list(block_index)
+default_block = "A00" if "A00" in block_index else available_blocks[0]
 
 # --- FIX 1: Giữ state cho sel_block ---
-if "sel_block" not in st.session_state:
+if st.session_state.get("sel_block") not in available_blocks:
     st.session_state.sel_block = default_block
 
 st.session_state.sel_block = st.sidebar.selectbox(
@@ -164,10 +124,18 @@ st.session_state.sel_block = st.sidebar.selectbox(
 )
 sel_block = st.session_state.sel_block
 
+# cách tính có hệ số có thể lên thang 40 (src/schemes.py)
 user_score = st.sidebar.number_input(
     "Nhập tổng điểm",
-    min_value=0.0, max_value=30.0, value=21.0, step=0.01
+    min_value=0.0, max_value=float(max(30, block_index[sel_block].max_score)), value=21.0, step=0.01
 )
+bonus = st.sidebar.number_input(
+    "Điểm ưu tiên (khu vực, đối tượng)",
+    min_value=0.0, max_value=2.75, value=0.0, step=0.25
+)
+# điểm xét tuyển = tổng + ưu tiên (giảm dần khi tổng từ 22,5/30), chỉ để hiển thị:
+# dữ liệu toàn quốc không có điểm ưu tiên nên percentile/xếp hạng/quy đổi dùng tổng điểm thi
+admission_score = apply_bonus(user_score, bonus, block_index[sel_block].max_score)
 
 # --- FIX 2: Cờ submitted ---
 if "submitted" not in st.session_state:
@@ -178,27 +146,21 @@ if st.sidebar.button("🔎 Tra cứu ngay"):
 
 show_results = st.session_state.submitted
 
-# --- Tính totals ---
-if sel_block in BLOCKS:
-    subs = [s for s in BLOCKS[sel_block] if s in subjects]
-    df_filtered = filter_candidates(df_proc, subs)
-    totals_arr = compute_totals(df_filtered, subs, backend=backend)
-elif sel_block in subjects:
-    df_filtered = filter_candidates(df_proc, [sel_block])
-    totals_arr = compute_totals(df_filtered, [sel_block], backend=backend)
-else:
-    df_filtered = df_copy(df_proc, backend)
-    totals_arr = compute_totals(df_filtered, subjects[:3], backend=backend)
+# --- Tính totals (đọc từ block index) ---
+sel_stats = block_index[sel_block]
+n_candidates = sel_stats.count
 
-st.sidebar.markdown(f"**Số thí sinh được tính:** {len(totals_arr):,}")
+st.sidebar.markdown(f"**Số thí sinh được tính:** {n_candidates:,}")
 
 # --- Hiển thị kết quả ---
 if show_results:
-    if len(totals_arr) == 0:
+    if n_candidates == 0:
         st.warning("Không có đủ dữ liệu để tính cho lựa chọn này.")
     else:
-        pct = percentile_of_score(totals_arr, user_score)
-        rank = rank_of_score(totals_arr, user_score)
+        query = sel_stats.query
+        with instrumentation.stage("app.lookup"):
+            pct = query.percentile(user_score)
+            rank = query.rank(user_score)
         top_pct = round(100.0 - pct, 2)
 
         cards = {
@@ -206,87 +168,165 @@ if show_results:
             "Top % (toàn quốc)": f"{top_pct}%",
             "Xếp hạng (ước tính)": f"#{rank:,}",
         }
+        if bonus:
+            cards["Điểm xét tuyển (có ưu tiên)"] = f"{admission_score:.2f}"
         render_stat_cards(cards)
+        if bonus:
+            st.caption("Top %, xếp hạng, phổ điểm và quy đổi tính theo tổng điểm thi, "
+                       "không cộng điểm ưu tiên (dữ liệu toàn quốc không có điểm ưu tiên).")
 
         # Trích đoạn trong file app.py (phần hiển thị phổ điểm + bảng mốc)
 
-        # Xác định số môn trong block/môn đang chọn
-        if sel_block in BLOCKS:
-            num_subjects = len(BLOCKS[sel_block])
-        else:
-            num_subjects = 1  # trường hợp chỉ chọn 1 môn lẻ
+        max_score = sel_stats.max_score  # mỗi môn tối đa 10 điểm
 
-        max_score = num_subjects * 10  # mỗi môn tối đa 10 điểm
+        import pandas as pd
+        from src.plots import histogram_with_score
 
         # Vẽ biểu đồ phổ điểm
-        st.plotly_chart(
-            histogram_with_score(
-                totals_arr, user_score, bin_min=0, bin_max=max_score, bin_step=1,
-                title=f"Phổ điểm - {sel_block} (toàn quốc)"
-            ),
-            use_container_width=True
-        )
+        with instrumentation.stage("app.plotly_chart"):
+            st.plotly_chart(
+                histogram_with_score(
+                    sel_stats.hist, user_score, bin_min=0, bin_max=max_score, bin_step=1,
+                    title=f"Phổ điểm - {sel_block} (toàn quốc)",
+                    hist=(sel_stats.hist_counts, sel_stats.hist_edges)
+                ),
+                use_container_width=True
+            )
 
         # Bảng số thí sinh >= mốc
-        thr_df = pd.DataFrame(counts_at_thresholds(totals_arr, max_score=max_score)).rename(
+        thr_df = pd.DataFrame(query.counts_at_thresholds(max_score=max_score)).rename(
             columns={"moc": "Từ mốc", "count": "Số thí sinh >= mốc", "pct": "% tổng"}
         )
         st.dataframe(thr_df, use_container_width=True)
 
+        # ---- Vị trí theo tỉnh (2 chữ số đầu SBD, src/segments.py) ----
+        if dataset.segments is not None and sel_block in dataset.segments:
+            st.markdown("### Vị trí theo tỉnh/thành")
+            with instrumentation.stage("app.segments"):
+                seg_stats = dataset.segments.stats(sel_block)
+                seg_rows = seg_stats.table(user_score)
+            provinces = [r["segment"] for r in seg_rows]
+            if provinces:
+                province = st.selectbox("Mã tỉnh (2 chữ số đầu SBD)", provinces,
+                                        format_func=lambda g: f"{g:02d}", key="sel_province")
+                row = seg_rows[provinces.index(province)]
+                render_stat_cards({
+                    f"Top % (tỉnh {province:02d})": f"{row['top_pct']}%",
+                    "Xếp hạng trong tỉnh": f"#{row['rank']:,} / {row['count']:,}",
+                })
+                with st.expander("So sánh tất cả tỉnh/thành"):
+                    seg_df = pd.DataFrame(seg_rows).rename(columns={
+                        "segment": "Mã tỉnh", "count": "Số thí sinh", "percentile": "Percentile",
+                        "top_pct": "Top %", "rank": "Xếp hạng", "ties": "Cùng điểm"})
+                    st.dataframe(seg_df.round(2), use_container_width=True, hide_index=True)
+
         # ---- Quy đổi điểm ----
         st.markdown("### Quy đổi điểm (theo percentiles)")
 
-        # --- FIX 3: Giữ state cho target_block ---
-        if "target_block" not in st.session_state:
-            st.session_state.target_block = available_blocks[0]
-
-        if st.session_state.target_block not in available_blocks:
-            st.session_state.target_block = available_blocks[0]
-
-        st.session_state.target_block = st.selectbox(
-            "Chọn khối đích để quy đổi",
-            available_blocks,
-            index=available_blocks.index(st.session_state.target_block),
-            key="target_block_select"
-        )
-        target_block = st.session_state.target_block
-
-        if target_block in BLOCKS:
-            dst_subjs = [s for s in BLOCKS[target_block] if s in subjects]
-        elif target_block in subjects:
-            dst_subjs = [target_block]
-        else:
-            dst_subjs = subjects[:3]
+        # quy đổi sang năm khác (khi có nhiều bộ dữ liệu)
+        target_year = sel_year
+        if len(years) > 1:
+            target_year = st.selectbox("Năm đích", years, index=years.index(sel_year),
+                                       key="target_year_select")
+        target_blocks = available_blocks
+        if target_year != sel_year:
+            target_loading = registry.load_async(target_year)
+            wait([target_loading], timeout=CONVERT_WAIT_SECONDS)
+            target_blocks = None
+            if not target_loading.done():
+                render_loading(target_loading, message="Đang chuẩn bị dữ liệu năm đích...")
+            elif target_loading.exception() is not None:
+                st.error(f"Lỗi khi đọc dữ liệu năm {target_year}: {target_loading.exception()}")
+            else:
+                target_blocks = list(target_loading.result().block_index)
 
-        if dst_subjs:
-            df_dst = filter_candidates(df_proc, dst_subjs)
-            dst_totals = compute_totals(df_dst, dst_subjs, backend=backend)
-        else:
-            dst_totals = compute_totals(df_proc, dst_subjs, backend=backend)
+        if target_blocks:
+            # --- FIX 3: Giữ state cho target_block ---
+            if "target_block" not in st.session_state:
+                st.session_state.target_block = target_blocks[0]
 
-        if target_block == sel_block:
-            converted = user_score
-        else:
-            if len(totals_arr) == 0 or len(dst_totals) == 0:
-                st.warning("Không đủ dữ liệu để quy đổi giữa hai khối.")
-                converted = float("nan")
-            else:
-                src_table = build_percentile_table(totals_arr)
-                dst_table = build_percentile_table(dst_totals)
-                converted = convert_score_via_percentile(src_table, dst_table, user_score)
+            if st.session_state.target_block not in target_blocks:
+                st.session_state.target_block = target_blocks[0]
 
-        if pd.isna(converted):
-            st.markdown("- Không thể quy đổi do thiếu dữ liệu.")
-        else:
-            st.markdown(
-                f"- Điểm **{user_score:.2f}** (khối {sel_block}) "
-                f"≈ **{converted:.2f}** (khối {target_block}) theo percentiles"
+            st.session_state.target_block = st.selectbox(
+                "Chọn khối đích để quy đổi",
+                target_blocks,
+                index=target_blocks.index(st.session_state.target_block),
+                key="target_block_select"
             )
-
-        equals_same = int((totals_arr == user_score).sum())
-        above_same = int((totals_arr > user_score).sum())
-        st.markdown(f"- Tổng thí sinh trong dữ liệu (được tính): **{len(totals_arr):,}**")
+            target_block = st.session_state.target_block
+
+            # quy đổi sang năm khác: chạy cả phép quy đổi ở luồng nền (kể cả nạp lại năm đã
+            # bị giải phóng), app chỉ đọc kết quả của job; các phiên cùng hỏi một điểm
+            # (cùng phiên bản dữ liệu) dùng chung một Future.
+            # Trong cùng một năm chỉ là hai bảng O(bins): tính luôn.
+            job = None
+            if target_year != sel_year:
+                target_version = target_loading.result().version
+                job = conversion_jobs.submit(
+                    (sel_year, dataset.version, sel_block, target_year, target_version, target_block,
+                     user_score),
+                    registry.convert, sel_year, sel_block, target_year, target_block, user_score)
+                wait([job], timeout=CONVERT_WAIT_SECONDS)
+
+            if job is not None and not job.done():
+                render_loading(job, message="Đang quy đổi điểm...")
+            elif job is not None and job.exception() is not None:
+                st.error(f"Lỗi khi quy đổi: {job.exception()}")
+            else:
+                with instrumentation.stage("app.convert"):
+                    if job is not None:
+                        converted = job.result()
+                    elif target_block == sel_block:
+                        converted = user_score
+                    else:
+                        converted = conversion.convert(sel_block, target_block, user_score)
+                if math.isnan(converted):
+                    st.warning("Không đủ dữ liệu để quy đổi giữa hai khối.")
+
+                src_label = f"khối {sel_block}" + (f", {sel_year}" if target_year != sel_year else "")
+                dst_label = f"khối {target_block}" + (f", {target_year}" if target_year != sel_year else "")
+                if math.isnan(converted):
+                    st.markdown("- Không thể quy đổi do thiếu dữ liệu.")
+                else:
+                    st.markdown(
+                        f"- Điểm **{user_score:.2f}** ({src_label}) "
+                        f"≈ **{converted:.2f}** ({dst_label}) theo percentiles"
+                    )
+
+        equals_same = query.ties(user_score)
+        above_same = int(query.count_above(user_score))
+        st.markdown(f"- Tổng thí sinh trong dữ liệu (được tính): **{n_candidates:,}**")
         st.markdown(f"- Số thí sinh điểm cao hơn bạn: **{above_same:,}**")
         st.markdown(f"- Số thí sinh cùng điểm: **{max(equals_same-1, 0):,}**")
 else:
-    st.info("Nhấn 'Tra cứu ngay' trong sidebar để bắt đầu.")
\ No newline at end of file
+    st.info("Nhấn 'Tra cứu ngay' trong sidebar để bắt đầu.")
+
+# --- Gợi ý khối có lợi nhất theo điểm từng môn (src/recommend.py) ---
+with st.expander("🎯 Gợi ý khối có lợi nhất theo điểm từng môn"):
+    recommender = dataset.recommender
+    rec_subjects = [s for s in subjects
+                    if any(s in subs for subs in recommender.wanted.values())]
+    rec_cols = st.columns(4)
+    rec_scores = {}
+    for i, subj in enumerate(rec_subjects):
+        with rec_cols[i % 4]:
+            value = st.number_input(subj, min_value=0.0, max_value=10.0, value=None,
+                                    step=0.25, key=f"rec_{subj}")
+        if value is not None:
+            rec_scores[subj] = value
+    if rec_scores:
+        with instrumentation.stage("app.recommend"):
+            best_blocks = recommender.recommend(rec_scores, k=TOP_K_BLOCKS)
+        if best_blocks:
+            import pandas as pd
+            rec_df = pd.DataFrame(best_blocks)
+            rec_df["subjects"] = rec_df["subjects"].str.join(", ")
+            rec_df = rec_df.rename(columns={
+                "block": "Khối", "subjects": "Môn", "total": "Tổng điểm",
+                "percentile": "Percentile", "top_pct": "Top %", "rank": "Xếp hạng"})
+            st.dataframe(rec_df.round(2), use_container_width=True, hide_index=True)
+        else:
+            st.caption("Chưa đủ môn để tạo thành một khối.")
+
+end_rerun()
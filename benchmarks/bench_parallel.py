@@ -0,0 +1,54 @@
+# benchmarks/bench_parallel.py
+"""
+Wall-clock speedup of the parallel block-index build against worker count.
+
+    python -m benchmarks.bench_parallel --rows 2000000
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_raw
+from src.block_index import build_block_index, subject_columns
+from src.compact import encode_columns
+from src.parallel import default_workers
+from src.preprocessing import preprocess
+
+
+def _best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--max-workers", type=int, default=default_workers())
+    args = ap.parse_args()
+
+    df, subjects, backend = preprocess(make_raw(args.rows, "polars"), "polars")
+    columns = encode_columns(subject_columns(df, subjects, backend))
+    del df
+
+    counts = [1]
+    while counts[-1] * 2 <= args.max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+
+    base = _best(lambda: build_block_index(columns), args.repeat)
+    print(f"rows={args.rows:,}  cores available={default_workers()}  best of {args.repeat}")
+    print(f"  {'executor':<8} {'workers':>7} {'seconds':>9} {'speedup':>8}")
+    print(f"  {'serial':<8} {1:>7} {base:>9.3f} {1.0:>8.2f}")
+    for executor in ("thread", "process"):
+        for w in counts[1:]:
+            t = _best(lambda: build_block_index(columns, workers=w, executor=executor), args.repeat)
+            print(f"  {executor:<8} {w:>7} {t:>9.3f} {base / t:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
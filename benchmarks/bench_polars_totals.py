@@ -0,0 +1,63 @@
+# benchmarks/bench_polars_totals.py
+"""
+compute_totals / filter_candidates on the polars backend: the old
+to_pandas round-trip vs the lazy sum_horizontal path.
+
+    python -m benchmarks.bench_polars_totals --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_raw
+from src.analysis import compute_totals, compute_block_totals
+from src.blocks import BLOCKS
+from src.preprocessing import preprocess, filter_candidates, count_candidates
+
+
+def _best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def _totals_via_pandas(df, subs):
+    # the pre-lazy implementation, kept here as the baseline
+    return df.select(subs).to_pandas().fillna(0).sum(axis=1).to_numpy()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    df, subjects, backend = preprocess(make_raw(args.rows, "polars"), "polars")
+    blocks = {c: s for c, s in BLOCKS.items() if all(x in subjects for x in s)}
+    subs = BLOCKS["A00"]
+
+    old = np.sort(_totals_via_pandas(filter_candidates(df, subs), subs))
+    new = np.sort(compute_totals(filter_candidates(df, subs), subs, backend="polars"))
+    assert np.array_equal(old, new), "lazy totals differ from the pandas round-trip"
+
+    rows = [
+        ("A00 totals (to_pandas)", lambda: _totals_via_pandas(filter_candidates(df, subs), subs)),
+        ("A00 totals (lazy)", lambda: compute_totals(filter_candidates(df, subs), subs, backend="polars")),
+        ("A00 count (len(filter))", lambda: len(filter_candidates(df, subs))),
+        ("A00 count (count_candidates)", lambda: count_candidates(df, subs)),
+        (f"{len(blocks)} blocks (loop, to_pandas)",
+         lambda: [_totals_via_pandas(filter_candidates(df, s), s) for s in blocks.values()]),
+        (f"{len(blocks)} blocks (compute_block_totals)",
+         lambda: compute_block_totals(df, blocks, backend="polars")),
+    ]
+    print(f"rows={args.rows:,}  best of {args.repeat}")
+    for name, fn in rows:
+        print(f"  {name:<40} {_best(fn, args.repeat) * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_preprocess.py
+"""
+preprocess() time per million rows on both backends, against the
+previous row-wise foreign-language split (map_elements lambda + one
+with_columns per language on polars, masked .loc loop on pandas).
+
+    python -m benchmarks.bench_preprocess --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from benchmarks.synthetic import make_raw
+from src.block_index import subject_columns
+from src.preprocessing import FOREIGN_LANGUAGE_CODES, preprocess
+
+
+def _legacy_split_polars(df):
+    df = df.with_columns(
+        pl.col("Mã môn ngoại ngữ").map_elements(lambda x: FOREIGN_LANGUAGE_CODES.get(x, None),
+                                                return_dtype=pl.String).alias("Tên môn ngoại ngữ"))
+    for code, subject in FOREIGN_LANGUAGE_CODES.items():
+        df = df.with_columns(pl.when(pl.col("Mã môn ngoại ngữ") == code)
+                             .then(pl.col("Ngoại ngữ")).otherwise(None).alias(subject))
+    return df
+
+
+def _legacy_split_pandas(df):
+    df = df.copy()
+    mmnn = df["Mã môn ngoại ngữ"].astype(str).str.upper().str.strip()
+    for code in FOREIGN_LANGUAGE_CODES:
+        df[code] = pd.NA
+        mask = mmnn.eq(code)
+        if mask.any():
+            df.loc[mask, code] = df.loc[mask, "Ngoại ngữ"]
+    for code in FOREIGN_LANGUAGE_CODES:
+        df[code] = pd.to_numeric(df[code], errors="coerce")
+    df["Tên môn ngoại ngữ"] = mmnn.map(FOREIGN_LANGUAGE_CODES)
+    return df
+
+
+def _best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    raw = {be: make_raw(args.rows, be) for be in ("pandas", "polars")}
+    cols = {}
+    for be, df in raw.items():
+        out, subjects, _ = preprocess(df, be)
+        cols[be] = subject_columns(out, subjects, be)
+    assert list(cols["pandas"]) == list(cols["polars"])
+    for s in cols["pandas"]:
+        assert np.array_equal(cols["pandas"][s], cols["polars"][s], equal_nan=True), s
+
+    per_m = 1_000_000 / args.rows
+    rows = [
+        ("polars split (legacy)", lambda: _legacy_split_polars(raw["polars"])),
+        ("polars preprocess", lambda: preprocess(raw["polars"], "polars")),
+        ("pandas split (legacy)", lambda: _legacy_split_pandas(raw["pandas"])),
+        ("pandas preprocess", lambda: preprocess(raw["pandas"], "pandas")),
+    ]
+    print(f"rows={args.rows:,}  best of {args.repeat}, scaled to 1M rows")
+    for name, fn in rows:
+        print(f"  {name:<28} {_best(fn, args.repeat) * per_m * 1000:9.1f} ms / 1M rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_startup.py
+"""
+Startup cost of the app: module import time and time to first paint.
+
+1. imports  - fresh interpreter importing what app.py imports at the top,
+              as it is now (polars / pandas / plotly deferred) and with the
+              heavy modules forced eagerly like before.
+2. paint    - fresh interpreter running app.py once through Streamlit's
+              AppTest on a synthetic dataset with a cold cache: "paint" is
+              when the first page is returned, "ready" when the lookup form
+              is shown. THPT_BACKGROUND_LOAD=1 (default) vs 0.
+
+    python -m benchmarks.bench_startup --rows 1000000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import make_raw
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_IMPORTS = "streamlit, src.registry, src.ui, src.instrumentation"
+EAGER_IMPORTS = "pandas, polars, plotly.graph_objects, src.plots, src.streaming"
+HEAVY = ("pandas", "polars")  # plotly is imported by streamlit itself (lazy submodules)
+
+_IMPORT_SNIPPET = """
+import json, sys, time
+t0 = time.perf_counter()
+import {modules}
+print(json.dumps({{"seconds": time.perf_counter() - t0,
+                  "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_PAINT_SNIPPET = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=600).run()
+paint = time.perf_counter() - t0
+while not at.sidebar.button and not at.exception:
+    time.sleep(0.25)  # ~ the browser-side poll of ui.render_loading
+    at.run()
+print(json.dumps({"paint": paint, "ready": time.perf_counter() - t0}))
+"""
+
+
+def _run(code, args=(), cwd=ROOT, env=None):
+    env = dict(os.environ, PYTHONPATH=ROOT, **(env or {}))
+    out = subprocess.run([sys.executable, "-c", code, *args], cwd=cwd, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench_imports(repeat: int):
+    rows = []
+    for name, modules in (("lazy (now)", APP_IMPORTS), ("eager", f"{EAGER_IMPORTS}, {APP_IMPORTS}")):
+        runs = [_run(_IMPORT_SNIPPET.format(modules=modules, heavy=HEAVY)) for _ in range(repeat)]
+        rows.append((name, statistics.median(r["seconds"] for r in runs), runs[0]["loaded"]))
+    return rows
+
+
+def bench_paint(rows: int, repeat: int):
+    out = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "data"))
+        make_raw(rows, "polars").write_csv(os.path.join(tmp, "data", "diem_2018.csv"))
+        app = os.path.join(ROOT, "app.py")
+        for background in ("1", "0"):
+            runs = []
+            for i in range(repeat):
+                # new cache dir per run: cold start (CSV parse + cache build + index)
+                env = {"THPT_BACKGROUND_LOAD": background,
+                       "THPT_CACHE_DIR": os.path.join(tmp, f"cache_{background}_{i}")}
+                runs.append(_run(_PAINT_SNIPPET, [app], cwd=tmp, env=env))
+            out.append((f"THPT_BACKGROUND_LOAD={background}",
+                        statistics.median(r["paint"] for r in runs),
+                        statistics.median(r["ready"] for r in runs)))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"imports (median of {args.repeat} fresh interpreters)")
+    for name, seconds, loaded in bench_imports(args.repeat):
+        print(f"  {name:<12} {seconds * 1000:8.1f} ms   heavy modules loaded: {', '.join(loaded) or '-'}")
+
+    print(f"\nfirst paint, cold cache, rows={args.rows:,} (median of {args.repeat})")
+    for name, paint, ready in bench_paint(args.rows, args.repeat):
+        print(f"  {name:<24} paint {paint * 1000:8.1f} ms   ready {ready * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# benchmarks/loadtest.py
+"""
+Load test: results-day traffic of many concurrent users.
+
+Every simulated user replays one visit: pick a block, type a score, press
+"Tra cứu", then change the score, the conversion target, the province or
+the block a few times. Streamlit reruns the whole script on each
+interaction, so every step is timed as one rerun.
+
+  logic    (default) a rerun does what app.py does once the data is loaded:
+           lookups, the figure serialized the way st.plotly_chart sends it,
+           the threshold and province tables, the conversion. Users are
+           threads sharing one DatasetRegistry, like sessions of one
+           Streamlit server process.
+  apptest  each user drives app.py itself through streamlit.testing
+           AppTest (full script run + widget state, cache_resource shared
+           between users): slower, closer to the real server.
+
+The data is synthetic, national-size (benchmarks/synthetic.py). Reported:
+throughput (reruns/s), latency percentiles per action and overall, and
+memory per session = process RSS growth during the run / users.
+
+    python -m benchmarks.loadtest --rows 1000000 --users 50 --steps 20
+    python -m benchmarks.loadtest --rows 200000 --users 8 --steps 8 --apptest
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import make_raw
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# blocks most candidates look up; the rest share the remaining probability
+POPULAR_BLOCKS = ("A00", "A01", "B00", "C00", "D01", "D07")
+POPULAR_SHARE = 0.8
+# what a user does after the first lookup
+ACTION_WEIGHTS = {"score": 0.35, "target": 0.3, "block": 0.2, "province": 0.15}
+
+
+def _rss() -> int:
+    """
+    Current resident set size of the process (bytes).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource  # peak, not current, where /proc is missing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _PeakRSS:
+    """
+    Samples the RSS in a background thread; `peak` after stop().
+    """
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = _rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss())
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> int:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss())
+        return self.peak
+
+
+def _pick_block(rng, blocks):
+    popular = [b for b in POPULAR_BLOCKS if b in blocks]
+    if popular and rng.random() < POPULAR_SHARE:
+        return str(rng.choice(popular))
+    return str(rng.choice(blocks))
+
+
+def _pick_score(rng) -> float:
+    return float(np.clip(np.round(rng.normal(20.0, 3.5) * 4) / 4, 0, 30))
+
+
+def scenario(rng, blocks, provinces, steps: int) -> list:
+    """
+    [(action, value)] of one visit: block, score, submit, then `steps - 3`
+    random changes drawn from ACTION_WEIGHTS.
+    """
+    plan = [("block", _pick_block(rng, blocks)), ("score", _pick_score(rng)), ("submit", True)]
+    names, p = list(ACTION_WEIGHTS), list(ACTION_WEIGHTS.values())
+    while len(plan) < steps:
+        action = str(rng.choice(names, p=p))
+        if action == "score":
+            value = _pick_score(rng)
+        elif action == "province":
+            value = int(rng.choice(provinces)) if provinces else None
+        else:
+            value = _pick_block(rng, blocks)
+        plan.append((action, value))
+    return plan[:steps]
+
+
+# ---------- logic mode ----------
+def rerun(ds, state: dict):
+    """
+    The work of one app.py rerun after the data is loaded (src imports are
+    already cached by then).
+    """
+    import plotly.io as pio
+    from src.plots import histogram_with_score
+
+    stats = ds.block_index[state["block"]]
+    if not state["submitted"]:
+        return
+    score, q = state["score"], stats.query
+    q.percentile(score)
+    q.rank(score)
+    fig = histogram_with_score(stats.hist, score, bin_min=0, bin_max=stats.max_score, bin_step=1,
+                               title=f"Phổ điểm - {stats.code} (toàn quốc)",
+                               hist=(stats.hist_counts, stats.hist_edges))
+    pio.to_json(fig, validate=False)  # what st.plotly_chart sends to the browser
+    q.counts_at_thresholds(max_score=stats.max_score)
+    if ds.segments is not None and stats.code in ds.segments:
+        # the province only picks which row of the table is shown
+        ds.segments.stats(stats.code).table(score)
+    target = state["target"] if state["target"] in ds.block_index else stats.code
+    if target != stats.code:
+        ds.conversion.convert(stats.code, target, score)
+    q.ties(score)
+    q.count_above(score)
+
+
+def run_logic(registry, name: str, users: int, steps: int, think: float, seed: int):
+    from src.blocks import BLOCKS
+
+    ds = registry.get(name)
+    blocks = [c for c in ds.block_index if c in BLOCKS]
+    provinces = [int(g) for g in ds.segments.segments] if ds.segments is not None else []
+    samples = []  # (action, seconds); list.append is atomic
+
+    def user(i):
+        rng = np.random.default_rng(seed + i)
+        state = {"block": blocks[0], "score": 21.0, "submitted": False,
+                 "target": blocks[0], "province": None}
+        for action, value in scenario(rng, blocks, provinces, steps):
+            if think:
+                time.sleep(rng.exponential(think))
+            state["submitted" if action == "submit" else action] = value
+            t0 = time.perf_counter()
+            rerun(ds, state)
+            samples.append((action, time.perf_counter() - t0))
+
+    return _drive(user, users, samples)
+
+
+# ---------- apptest mode ----------
+def _find(widgets, key):
+    return next((w for w in widgets if w.key == key), None)
+
+
+def run_apptest(app_path: str, users: int, steps: int, think: float, seed: int,
+                poll: float = 0.25, timeout: float = 600):
+    from streamlit.testing.v1 import AppTest
+
+    samples = []
+
+    def settle(at):
+        # data loading / background conversion: the browser polls like this
+        deadline = time.perf_counter() + timeout
+        while (not at.sidebar.button or any("⏳" in i.value for i in at.info)) \
+                and not at.exception and time.perf_counter() < deadline:
+            time.sleep(poll)
+            at.run()
+
+    def user(i):
+        rng = np.random.default_rng(seed + i)
+        at = AppTest.from_file(app_path, default_timeout=timeout)
+        t0 = time.perf_counter()
+        at.run()
+        settle(at)
+        samples.append(("open", time.perf_counter() - t0))
+        blocks = [b for b in at.selectbox(key="sel_block_select").options]
+        for action, value in scenario(rng, blocks, list(range(1, 65)), steps):
+            if think:
+                time.sleep(rng.exponential(think))
+            if action == "block":
+                at.selectbox(key="sel_block_select").select(value)
+            elif action == "score":
+                at.sidebar.number_input[0].set_value(value)
+            elif action == "submit":
+                at.sidebar.button[0].click()
+            else:
+                key = "target_block_select" if action == "target" else "sel_province"
+                box = _find(at.selectbox, key)
+                if box is None or value not in box.options:
+                    continue  # not on the page for this state
+                box.select(value)
+            t0 = time.perf_counter()
+            at.run()
+            settle(at)
+            samples.append((action, time.perf_counter() - t0))
+            if at.exception:
+                raise RuntimeError(f"user {i}: {at.exception[0].message}")
+
+    return _drive(user, users, samples)
+
+
+# ---------- driver / report ----------
+def _drive(user, users: int, samples: list) -> dict:
+    rss_base = _rss()
+    sampler = _PeakRSS().start()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix="user") as ex:
+        for f in [ex.submit(user, i) for i in range(users)]:
+            f.result()
+    wall = time.perf_counter() - t0
+    rss_peak = sampler.stop()
+    return summarize(samples, wall, users, rss_base, rss_peak)
+
+
+def _latency(seconds) -> dict:
+    ms = np.asarray(seconds) * 1000
+    return {"count": int(ms.size), "p50_ms": float(np.percentile(ms, 50)),
+            "p90_ms": float(np.percentile(ms, 90)), "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max())}
+
+
+def summarize(samples, wall: float, users: int, rss_base: int, rss_peak: int) -> dict:
+    reruns = [s for a, s in samples if a != "open"]
+    actions = sorted({a for a, _ in samples})
+    return {
+        "users": users,
+        "wall_seconds": wall,
+        "reruns": len(reruns),
+        "throughput_per_s": len(reruns) / wall if wall > 0 else 0.0,
+        "overall": _latency(reruns) if reruns else {},
+        "actions": {a: _latency([s for b, s in samples if b == a]) for a in actions},
+        "rss_base_bytes": rss_base,
+        "rss_peak_bytes": rss_peak,
+        "bytes_per_session": max(0, rss_peak - rss_base) / users,
+    }
+
+
+def print_report(r: dict, mode: str):
+    print(f"\n{mode}: {r['users']} users, {r['reruns']:,} reruns in {r['wall_seconds']:.2f}s "
+          f"-> {r['throughput_per_s']:.1f} reruns/s")
+    print(f"  {'action':<10} {'count':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, lat in [*r["actions"].items(), ("all", r["overall"])]:
+        if lat:
+            print(f"  {name:<10} {lat['count']:>7,} {lat['p50_ms']:>9.2f} {lat['p90_ms']:>9.2f} "
+                  f"{lat['p99_ms']:>9.2f} {lat['max_ms']:>9.2f}")
+    print(f"  RSS {r['rss_base_bytes'] / 2**20:.0f} -> {r['rss_peak_bytes'] / 2**20:.0f} MiB, "
+          f"~{r['bytes_per_session'] / 2**20:.2f} MiB per session")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000, help="synthetic candidates")
+    ap.add_argument("--users", type=int, default=20, help="concurrent simulated users")
+    ap.add_argument("--steps", type=int, default=15, help="interactions per user")
+    ap.add_argument("--think", type=float, default=0.0,
+                    help="mean think time between interactions (s); 0 = closed loop")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--apptest", action="store_true", help="drive app.py through AppTest")
+    ap.add_argument("--out", help="write the results as JSON")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.path.join(tmp, "diem.csv")
+        t0 = time.perf_counter()
+        make_raw(args.rows, "pandas").to_csv(data, index=False)
+        # read by src modules at import time: set before the first src import
+        os.environ["THPT_DATASETS"] = f"loadtest={data}"
+        os.environ["THPT_CACHE_DIR"] = os.path.join(tmp, "cache")
+        print(f"synthetic data: {args.rows:,} rows ({time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+
+        if args.apptest:
+            mode = "apptest"
+            result = run_apptest(os.path.join(ROOT, "app.py"), args.users, args.steps,
+                                 args.think, args.seed)
+        else:
+            from src.registry import DatasetRegistry, parse_datasets
+            from src.schemes import load_schemes
+            mode = "logic"
+            registry = DatasetRegistry(parse_datasets(os.environ["THPT_DATASETS"]),
+                                       schemes=load_schemes(), workers=0)
+            t0 = time.perf_counter()
+            registry.get("loadtest")
+            print(f"dataset ready ({time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+            result = run_logic(registry, "loadtest", args.users, args.steps, args.think, args.seed)
+
+    result.update(mode=mode, rows=args.rows, steps=args.steps, think=args.think)
+    print_report(result, mode)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
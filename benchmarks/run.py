@@ -0,0 +1,167 @@
+# benchmarks/run.py
+"""
+Benchmark suite for the analysis, preprocessing and conversion hot paths.
+
+Every stage runs on synthetic THPT-shaped data (benchmarks/synthetic.py)
+for each size and backend; the best wall time of --repeat runs and the
+peak traced allocation (tracemalloc: Python + NumPy buffers, not polars'
+Rust allocator) are recorded. Results are written as JSON and can be
+compared against a stored baseline:
+
+    python -m benchmarks.run --sizes 100k 1m --out bench.json
+    python -m benchmarks.run --sizes 100k 1m --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --sizes 100k 1m --baseline benchmarks/baseline.json
+
+With --baseline the exit status is 1 when any stage is slower than the
+baseline by more than --tolerance (default 20%).
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import make_raw
+from src.analysis import (compute_totals, compute_block_totals, build_percentile_table,
+                          percentile_of_score, counts_at_thresholds)
+from src.block_index import build_block_index, subject_columns
+from src.blocks import BLOCKS
+from src.compact import encode_columns
+from src.conversion import ConversionService, convert_score_via_percentile
+from src.preprocessing import preprocess, filter_candidates
+
+SIZES = {"100k": 100_000, "1m": 1_000_000, "5m": 5_000_000}
+SUITE_VERSION = 1
+
+
+def measure(fn, repeat: int) -> dict:
+    """
+    Best per-call wall time over `repeat` samples + peak traced memory of
+    one call. Fast stages are looped (timeit autorange, >= 0.2 s per sample)
+    so microsecond lookups are not lost in timer noise.
+    """
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    times = [t / loops for t in timer.repeat(repeat=repeat, number=loops)]
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "peak_bytes": int(peak)}
+
+
+def stages(rows: int, backend: str):
+    """
+    Yield (stage name, callable) for one dataset size and backend.
+    """
+    raw = make_raw(rows, backend)
+    df, subjects, _ = preprocess(raw, backend)
+    subs = BLOCKS["A00"]
+    blocks = {c: s for c, s in BLOCKS.items() if all(x in subjects for x in s)}
+    filtered = filter_candidates(df, subs)
+    totals = compute_totals(filtered, subs, backend=backend)
+    src_table, dst_table = build_percentile_table(totals), build_percentile_table(
+        compute_totals(filter_candidates(df, BLOCKS["D01"]), BLOCKS["D01"], backend=backend))
+    scores = np.random.default_rng(0).uniform(0, 30, 10_000)
+
+    yield "preprocess", lambda: preprocess(raw, backend)
+    yield "filter_candidates", lambda: filter_candidates(df, subs)
+    yield "compute_totals", lambda: compute_totals(filtered, subs, backend=backend)
+    yield "compute_block_totals", lambda: compute_block_totals(df, blocks, backend=backend)
+    yield "percentile_of_score", lambda: percentile_of_score(totals, 21.0)
+    yield "counts_at_thresholds", lambda: counts_at_thresholds(totals, max_score=30)
+    yield "build_percentile_table", lambda: build_percentile_table(totals)
+    yield "convert_score_via_percentile", lambda: convert_score_via_percentile(src_table, dst_table, 21.0)
+
+    if backend != "polars":
+        return
+    # backend-independent stages, measured once
+    columns = subject_columns(df, subjects, backend)
+    compact = encode_columns(columns)
+    index = build_block_index(compact)
+    service = ConversionService(index)
+    service.convert("A00", "D01", 21.0)
+    yield "encode_columns", lambda: encode_columns(columns)
+    yield "build_block_index[float]", lambda: build_block_index(columns)
+    yield "build_block_index[compact]", lambda: build_block_index(compact)
+    yield "histogram.percentile", lambda: index["A00"].query.percentile(21.0)
+    yield "service.convert", lambda: service.convert("A00", "D01", 21.0)
+    yield "service.convert_many[10k]", lambda: service.convert_many("A00", "D01", scores)
+
+
+def run_suite(sizes, backends, repeat: int) -> dict:
+    results = []
+    for size in sizes:
+        rows = SIZES[size]
+        for backend in backends:
+            for name, fn in stages(rows, backend):
+                m = measure(fn, repeat)
+                results.append(dict(m, size=size, rows=rows, backend=backend, stage=name))
+                print(f"  {size:>4} {backend:<7} {name:<30} {m['seconds'] * 1000:10.3f} ms "
+                      f"{m['peak_bytes'] / 2**20:9.1f} MiB", flush=True)
+    return {
+        "suite_version": SUITE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def _key(r):
+    return r["size"], r["backend"], r["stage"]
+
+
+def compare(current: dict, baseline: dict, tolerance: float):
+    """
+    Return rows (key, base_s, cur_s, ratio, regressed) for stages present in both.
+    """
+    base = {_key(r): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = base.get(_key(r))
+        if b is None or b["seconds"] <= 0:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        rows.append((_key(r), b["seconds"], r["seconds"], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", nargs="+", default=["100k", "1m"], choices=list(SIZES))
+    ap.add_argument("--backends", nargs="+", default=["polars", "pandas"], choices=["polars", "pandas"])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--save-baseline", help="write results JSON as the new baseline")
+    ap.add_argument("--baseline", help="compare against this baseline JSON")
+    ap.add_argument("--tolerance", type=float, default=0.20)
+    args = ap.parse_args(argv)
+
+    current = run_suite(args.sizes, args.backends, args.repeat)
+    for path in filter(None, [args.out, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=1)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(current, baseline, args.tolerance)
+    regressed = [r for r in rows if r[4]]
+    print(f"\nvs baseline {args.baseline} (tolerance {args.tolerance:.0%}):")
+    for (size, backend, stage), b, c, ratio, bad in rows:
+        flag = "REGRESSION" if bad else ""
+        print(f"  {size:>4} {backend:<7} {stage:<30} {b * 1000:10.3f} -> {c * 1000:10.3f} ms "
+              f"x{ratio:5.2f} {flag}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
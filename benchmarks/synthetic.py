@@ -0,0 +1,85 @@
+# benchmarks/synthetic.py
+"""
+Synthetic THPT-shaped score data for benchmarks.
+
+Column layout follows the real result files: SBD (8 digits, first two =
+province code), one column per subject, and the foreign language split
+into "Ngoại ngữ" + "Mã môn ngoại ngữ" (N1..N7). Each candidate takes Toán,
+Văn, one foreign language (most), and either the natural-science or the
+social-science group, like the real exam.
+
+    python -m benchmarks.synthetic 1000000 data/synthetic_1m.csv
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+# (mean, sd, step) per subject
+SUBJECT_SHAPE = {
+    "Toán": (6.5, 1.5, 0.25),
+    "Văn": (7.0, 1.2, 0.25),
+    "Lí": (6.7, 1.6, 0.25),
+    "Hóa": (6.6, 1.7, 0.25),
+    "Sinh": (5.8, 1.4, 0.25),
+    "Sử": (6.5, 1.5, 0.25),
+    "Địa": (6.9, 1.3, 0.25),
+    "Giáo dục kinh tế và pháp luật": (7.8, 1.1, 0.25),
+}
+FOREIGN_SHAPE = (5.5, 1.8, 0.2)
+# share of candidates per foreign language code
+FOREIGN_CODES = {"N1": 0.95, "N2": 0.005, "N3": 0.01, "N4": 0.015,
+                 "N5": 0.005, "N6": 0.01, "N7": 0.005}
+NATURAL = ["Lí", "Hóa", "Sinh"]
+SOCIAL = ["Sử", "Địa", "Giáo dục kinh tế và pháp luật"]
+
+
+def _scores(rng, n, mean, sd, step):
+    x = np.clip(rng.normal(mean, sd, n), 0, 10)
+    return np.round(np.round(x / step) * step, 2)
+
+
+def make_scores(n: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Return a raw (not yet preprocessed) pandas DataFrame with n candidates.
+    """
+    rng = np.random.default_rng(seed)
+    province = rng.integers(1, 65, n)
+    sbd = [f"{p:02d}{i:06d}" for p, i in zip(province, np.arange(n) % 1_000_000)]
+    data = {"SBD": sbd}
+    natural = rng.random(n) < 0.4
+    for subj, (mean, sd, step) in SUBJECT_SHAPE.items():
+        col = _scores(rng, n, mean, sd, step)
+        if subj in NATURAL:
+            col[~natural] = np.nan
+        elif subj in SOCIAL:
+            col[natural] = np.nan
+        col[rng.random(n) < 0.01] = np.nan  # absent / exempt
+        data[subj] = col
+
+    has_foreign = rng.random(n) < 0.85
+    foreign = _scores(rng, n, *FOREIGN_SHAPE)
+    foreign[~has_foreign] = np.nan
+    codes = rng.choice(list(FOREIGN_CODES), n, p=list(FOREIGN_CODES.values())).astype(object)
+    codes[~has_foreign] = None
+    data["Ngoại ngữ"] = foreign
+    data["Mã môn ngoại ngữ"] = codes
+    return pd.DataFrame(data)
+
+
+def make_raw(n: int, backend: str = "pandas", seed: int = 0):
+    """
+    Synthetic data in the shape load_data() returns for `backend`.
+    """
+    df = make_scores(n, seed)
+    if backend == "polars":
+        import polars as pl
+        return pl.from_pandas(df)
+    return df
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    out = sys.argv[2] if len(sys.argv) > 2 else f"synthetic_{rows}.csv"
+    make_scores(rows).to_csv(out, index=False)
+    print(f"wrote {rows:,} rows -> {out}")
@@ -1,6 +1,20 @@
 # src/analysis.py
 import numpy as np
 
+from src.histogram import ScoreHistogram
+from src.instrumentation import timed
+
+def _collect(lf):
+    """
+    Collect a polars LazyFrame with the streaming engine when available.
+    """
+    try:
+        return lf.collect(engine="streaming")
+    except TypeError:
+        # older polars without the engine argument
+        return lf.collect()
+
+@timed()
 def compute_totals(df, subjects, backend="pandas"):
     """
     Return numpy array of total scores per candidate for given subjects.
@@ -9,11 +23,11 @@ def compute_totals(df, subjects, backend="pandas"):
         return np.array([])
 
     if backend == "polars":
-        # convert only selected cols to pandas to sum reliably
+        import polars as pl
+        # lazy horizontal sum (nulls count as 0, like fillna(0).sum)
         try:
-            pdf = df.select(subjects).to_pandas()
-            totals = pdf.fillna(0).sum(axis=1).to_numpy()
-            return totals
+            out = _collect(df.lazy().select(pl.sum_horizontal(subjects).alias("_total")))
+            return out.get_column("_total").to_numpy()
         except Exception:
             # fallback: try direct to_numpy
             try:
@@ -26,10 +40,37 @@ def compute_totals(df, subjects, backend="pandas"):
         totals = df[subjects].fillna(0).sum(axis=1).to_numpy()
         return totals
 
+@timed()
+def compute_block_totals(df, blocks: dict, backend="pandas") -> dict:
+    """
+    Return {code: totals} for many blocks at once, each over the candidates
+    having all of the block's subjects (filter_candidates + compute_totals).
+    On polars every block is one lazy drop_nulls + sum_horizontal query and
+    all queries run together, so no filtered DataFrame is materialized.
+    """
+    blocks = {code: list(subs) for code, subs in blocks.items() if subs}
+    if backend == "polars":
+        import polars as pl
+        lf = df.lazy()
+        queries = [lf.drop_nulls(subset=subs).select(pl.sum_horizontal(subs).alias("_total"))
+                   for subs in blocks.values()]
+        try:
+            frames = pl.collect_all(queries, engine="streaming")
+        except TypeError:
+            frames = pl.collect_all(queries)
+        return {code: f.get_column("_total").to_numpy() for code, f in zip(blocks, frames)}
+
+    out = {}
+    for code, subs in blocks.items():
+        out[code] = df[subs].dropna().sum(axis=1).to_numpy()
+    return out
+
 def build_percentile_table(totals: np.ndarray):
     """
     Return dict {percentile: score}.
     """
+    if isinstance(totals, ScoreHistogram):
+        return {int(p): float(s) for p, s in enumerate(totals.percentile_table())}
     if totals.size == 0:
         return {p: 0.0 for p in range(0, 101)}
     pct_scores = np.percentile(totals, np.arange(0, 101, 1))
@@ -39,6 +80,8 @@ def percentile_of_score(totals: np.ndarray, score: float) -> float:
     """
     empirical percentile (0..100): percent below + 0.5*equal
     """
+    if isinstance(totals, ScoreHistogram):
+        return totals.percentile(score)
     n = totals.size
     if n == 0:
         return 0.0
@@ -51,12 +94,16 @@ def rank_of_score(totals: np.ndarray, score: float) -> int:
     """
     Rank where 1 is best (highest). rank = #with score > yours + 1
     """
+    if isinstance(totals, ScoreHistogram):
+        return totals.rank(score)
     return int((totals > score).sum() + 1)
 
 def counts_at_thresholds(totals: np.ndarray, max_score=30, min_score=0):
     """
     Return list of dicts for m in [max..min]: {'moc': 'm+','count':int,'pct':float}
     """
+    if isinstance(totals, ScoreHistogram):
+        return totals.counts_at_thresholds(max_score, min_score)
     n = totals.size
     rows = []
     for m in range(int(max_score), int(min_score) - 1, -1):
@@ -0,0 +1,138 @@
+# src/block_index.py
+"""
+Block index: per-block score distributions computed once per dataset version.
+
+Every block in BLOCKS (and every single subject) gets its exact score
+histogram (src/histogram.py): candidate count, 1-point bins, percentile,
+rank and percentile table all come from it, so the UI never has to touch
+the candidate DataFrame after startup and a block costs a few KB.
+"""
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+
+from src.blocks import BLOCKS, block_max_score
+from src.block_matrix import block_hundredth_counts
+from src.compact import SCALE
+from src.histogram import ScoreHistogram
+from src.instrumentation import timed
+
+ID_COLUMN = "SBD"  # số báo danh: 8 chữ số, 2 chữ số đầu = mã tỉnh
+
+
+@dataclass
+class BlockStats:
+    code: str
+    subjects: list
+    hist: ScoreHistogram      # exact distribution of totals (0.01 grid)
+    max_score: int
+
+    @property
+    def count(self) -> int:
+        return self.hist.n
+
+    @property
+    def query(self) -> ScoreHistogram:
+        # percentile / rank / ties / thresholds (ScoreHistogram queries)
+        return self.hist
+
+    @cached_property
+    def _binned(self):
+        return self.hist.histogram(self.max_score, 1)
+
+    @property
+    def hist_counts(self) -> np.ndarray:
+        """1-point bins over [0, max_score]."""
+        return self._binned[0]
+
+    @property
+    def hist_edges(self) -> np.ndarray:
+        return self._binned[1]
+
+
+def subject_columns(df, subjects, backend="pandas") -> dict:
+    """
+    Return {subject: float64 numpy array}, missing scores as NaN.
+    """
+    cols = {}
+    for s in subjects:
+        if backend == "polars":
+            arr = df.get_column(s).to_numpy()
+        else:
+            arr = df[s].to_numpy(dtype="float64", na_value=np.nan)
+        cols[s] = np.asarray(arr, dtype=np.float64)
+    return cols
+
+
+def id_column(df, backend="pandas", name=ID_COLUMN):
+    """
+    Candidate IDs (SBD) as an int64 array, or None when the column is
+    missing or has empty / non-integer values.
+    """
+    if name not in df.columns:
+        return None
+    if backend == "polars":
+        import polars as pl
+        arr = df.get_column(name).cast(pl.Float64, strict=False).to_numpy()
+    else:
+        import pandas as pd
+        arr = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    arr = np.asarray(arr, dtype=np.float64)
+    if not (np.isfinite(arr).all() and (arr == np.floor(arr)).all()):
+        return None
+    return arr.astype(np.int64)
+
+
+def build_block_stats_counts(code: str, subs, counts: np.ndarray) -> BlockStats:
+    """
+    BlockStats from counts over totals in hundredths (counts[k] = number of
+    candidates with total k / 100).
+    """
+    max_score = block_max_score(code)
+    top = max_score * SCALE
+    counts = np.pad(counts[:top + 1], (0, max(0, top + 1 - len(counts))))
+    return BlockStats(code=code, subjects=list(subs), hist=ScoreHistogram(counts),
+                      max_score=max_score)
+
+
+def index_blocks(subjects, blocks=BLOCKS) -> dict:
+    """
+    {code: subjects} of every block fully covered by `subjects`, then
+    every single subject (the entries of a block index, in order).
+    """
+    wanted = {code: list(subs) for code, subs in blocks.items()
+              if all(s in subjects for s in subs)}
+    for subj in subjects:
+        wanted[subj] = [subj]
+    return wanted
+
+
+def index_from_counts(wanted: dict, counts: np.ndarray, min_count=1) -> dict:
+    """
+    Block index from a block_hundredth_counts matrix (rows in `wanted` order).
+    """
+    index = {}
+    for row, (code, subs) in zip(counts, wanted.items()):
+        if int(row.sum()) >= min_count:
+            index[code] = build_block_stats_counts(code, subs, row)
+    return index
+
+
+@timed()
+def build_block_index(columns: dict, blocks=BLOCKS, min_count=1, workers=1,
+                      executor="thread") -> dict:
+    """
+    Return {code: BlockStats} for every block whose subjects all exist in
+    `columns` and every single subject, keeping only entries with at least
+    `min_count` candidates. Blocks come first, then subjects.
+    All distributions come from one batched pass (src/block_matrix.py),
+    split over `workers` threads/processes when > 1 (src/parallel.py).
+    """
+    wanted = index_blocks(list(columns), blocks)
+    if workers == 1:
+        counts = block_hundredth_counts(columns, wanted)
+    else:
+        from src.parallel import parallel_block_counts
+        counts = parallel_block_counts(columns, wanted, workers or None, executor)
+    return index_from_counts(wanted, counts, min_count)
@@ -0,0 +1,140 @@
+# src/block_matrix.py
+"""
+All block totals in one batched computation.
+
+The ~75 blocks only use 19 subjects, so instead of filtering and summing
+per block we build a subject x block 0/1 weight matrix W once and, for a
+chunk of rows with subject matrix X, compute
+
+    totals = X @ W          (one column per block)
+
+A missing score is stored in X as MISSING, far above any real total, so a
+block total is valid exactly when it is <= 10 points x subjects: the NaN
+mask falls out of the same matmul.
+
+Scores are handled in hundredths of a point in float32: every integer
+total up to MISSING * 3 is exact, so compact columns sum exactly and float
+columns are rounded to the nearest 0.01 (np.rint on the hundredths).
+
+Weighted totals (scoring schemes, src/schemes.py) use the same pass with
+a float64 W holding the subject weights; the totals are rounded to 0.01.
+"""
+import numpy as np
+
+from src.compact import SCALE, CompactColumn, column_mask
+
+CHUNK_ROWS = 1 << 15
+MISSING = float(1 << 20)  # > any total in hundredths, exact in float32 up to x16
+
+
+def block_weights(blocks: dict, subjects, weights: dict = None) -> np.ndarray:
+    """
+    Subject x block 0/1 matrix (float32, ready for matmul), or with
+    `weights` ({code: {subject: weight}}, positive) the weight of each
+    subject (float64; subjects not listed weigh 1).
+    """
+    pos = {s: i for i, s in enumerate(subjects)}
+    W = np.zeros((len(subjects), len(blocks)), dtype=np.float32 if weights is None else np.float64)
+    for j, (code, subs) in enumerate(blocks.items()):
+        w = (weights or {}).get(code, {})
+        for s in subs:
+            W[pos[s], j] = w.get(s, 1.0)
+    return W
+
+
+def _column_hundredths(col, start, stop) -> np.ndarray:
+    if isinstance(col, CompactColumn):
+        out = col.codes[start:stop].astype(np.float32)
+        out *= col.step
+        # unpack only the bytes of the bitmap covering this chunk
+        lo = start // 8
+        bits = np.unpackbits(col.valid[lo:(stop + 7) // 8])[start - lo * 8:stop - lo * 8]
+        out[bits == 0] = MISSING
+        return out
+    out = np.asarray(col[start:stop], dtype=np.float64) * SCALE
+    out[~column_mask(out)] = MISSING
+    return out.astype(np.float32)
+
+
+def subject_matrix(columns: dict, subjects, start=0, stop=None) -> np.ndarray:
+    """
+    Rows [start, stop) as a float32 [rows x subjects] matrix of scores in
+    hundredths, missing = MISSING.
+    """
+    n = len(columns[subjects[0]])
+    stop = n if stop is None else min(stop, n)
+    X = np.empty((stop - start, len(subjects)), dtype=np.float32)
+    for i, s in enumerate(subjects):
+        X[:, i] = _column_hundredths(columns[s], start, stop)
+    return X
+
+
+def _caps(blocks: dict, weights: dict = None) -> np.ndarray:
+    if weights is None:
+        return np.array([10 * SCALE * len(subs) for subs in blocks.values()], dtype=np.int32)
+    return np.array([round(10 * SCALE * sum(weights.get(code, {}).get(s, 1.0) for s in subs))
+                     for code, subs in blocks.items()], dtype=np.int32)
+
+
+def _chunk_totals(columns, subjects, W, start, stop) -> np.ndarray:
+    totals = subject_matrix(columns, subjects, start, stop) @ W
+    np.rint(totals, out=totals)
+    return totals.astype(np.int32)
+
+
+def block_totals_matrix(columns: dict, blocks: dict, start=0, stop=None, weights: dict = None):
+    """
+    Totals for every block over rows [start, stop) in one matmul.
+    Returns (totals_hundredths int32 [rows x blocks], valid bool [rows x blocks]),
+    columns in the order of `blocks`; totals are meaningful where valid.
+    """
+    subjects = sorted({s for subs in blocks.values() for s in subs})
+    W = block_weights(blocks, subjects, weights)
+    totals = _chunk_totals(columns, subjects, W, start, stop)
+    valid = (totals >= 0) & (totals <= _caps(blocks, weights))
+    return totals, valid
+
+
+def block_hundredth_counts(columns: dict, blocks: dict, chunk_rows: int = CHUNK_ROWS,
+                           start: int = 0, stop: int = None, groups=None, n_groups: int = 1,
+                           weights: dict = None):
+    """
+    Exact distribution of every block as counts over totals in hundredths:
+    returns a [blocks x (max_total + 1)] int64 matrix, row order = `blocks`.
+    Rows [start, stop) are processed in chunks so memory stays bounded; each
+    chunk is one matmul plus one bincount over all blocks. Totals outside
+    [0, 10 * subjects] (only possible with bad float data) are dropped.
+    Counts of disjoint row ranges add up (see src/parallel.py).
+
+    With `groups` (group number in [0, n_groups) of every row) the same
+    bincount splits the counts by group: [n_groups x blocks x (max_total + 1)].
+    With `weights` the counts are over weighted totals (see block_weights).
+    """
+    blocks = {code: list(subs) for code, subs in blocks.items()}
+    if not blocks:
+        return np.zeros((0, 1) if groups is None else (n_groups, 0, 1), dtype=np.int64)
+    subjects = sorted({s for subs in blocks.values() for s in subs})
+    W = block_weights(blocks, subjects, weights)
+    caps = _caps(blocks, weights)
+    stride = int(caps.max()) + 1
+    offsets = np.arange(len(blocks), dtype=np.int32) * stride
+    has_float = not all(isinstance(columns[s], CompactColumn) for s in subjects)
+
+    n = len(columns[subjects[0]])
+    stop = n if stop is None else min(stop, n)
+    size = len(blocks) * stride
+    counts = np.zeros(size * (1 if groups is None else n_groups), dtype=np.int64)
+    for lo in range(start, stop, chunk_rows):
+        hi = min(lo + chunk_rows, stop)
+        totals = _chunk_totals(columns, subjects, W, lo, hi)
+        valid = totals <= caps
+        if has_float:
+            valid &= totals >= 0
+        keys = totals + offsets
+        if groups is not None:
+            keys = keys.astype(np.int64)
+            keys += np.asarray(groups[lo:hi], dtype=np.int64)[:, None] * size
+        counts += np.bincount(keys[valid], minlength=counts.size)
+    if groups is None:
+        return counts.reshape(len(blocks), stride)
+    return counts.reshape(n_groups, len(blocks), stride)
@@ -0,0 +1,95 @@
+# src/blocks.py
+"""
+Tổ hợp xét tuyển (khối) -> danh sách môn.
+"""
+
+BLOCKS = {
+    # Khối A
+    "A00": ["Toán", "Lí", "Hóa"],
+    "A01": ["Toán", "Lí", "Tiếng Anh"],
+    "A02": ["Toán", "Lí", "Sinh"],
+    "A03": ["Toán", "Lí", "Sử"],
+    "A04": ["Toán", "Lí", "Địa"],
+    "A05": ["Toán", "Hóa", "Sử"],
+    "A06": ["Toán", "Hóa", "Địa"],
+    "A07": ["Toán", "Sử", "Địa"],
+    "A08": ["Toán", "Sử", "Giáo dục kinh tế và pháp luật"],
+    "A09": ["Toán", "Địa", "Giáo dục kinh tế và pháp luật"],
+    "A10": ["Toán", "Lí", "Giáo dục kinh tế và pháp luật"],
+    "A11": ["Toán", "Hóa", "Giáo dục kinh tế và pháp luật"],
+
+    # Khối B
+    "B00": ["Toán", "Hóa", "Sinh"],
+    "B02": ["Toán", "Sinh", "Địa"],
+    "B03": ["Toán", "Sinh", "Văn"],
+    "B04": ["Toán", "Sinh", "Giáo dục kinh tế và pháp luật"],
+    "B08": ["Toán", "Sinh", "Tiếng Anh"],
+
+    # Khối C
+    "C00": ["Văn", "Sử", "Địa"],
+    "C01": ["Văn", "Toán", "Lí"],
+    "C02": ["Văn", "Toán", "Hóa"],
+    "C03": ["Văn", "Toán", "Sử"],
+    "C04": ["Văn", "Toán", "Địa"],
+    "C05": ["Văn", "Lí", "Hóa"],
+    "C08": ["Văn", "Hóa", "Sinh"],
+    "C12": ["Văn", "Sử", "Sinh"],
+    "C13": ["Văn", "Sinh", "Địa"],
+    "C14": ["Văn", "Toán", "Giáo dục kinh tế và pháp luật"],
+    "C17": ["Văn", "Hóa", "Giáo dục kinh tế và pháp luật"],
+    "C19": ["Văn", "Sử", "Giáo dục kinh tế và pháp luật"],
+    "C20": ["Văn", "Địa", "Giáo dục kinh tế và pháp luật"],
+
+    # Khối D
+    "D01": ["Văn", "Toán", "Tiếng Anh"],
+    "D02": ["Văn", "Toán", "Tiếng Nga"],
+    "D03": ["Văn", "Toán", "Tiếng Pháp"],
+    "D04": ["Văn", "Toán", "Tiếng Trung"],
+    "D05": ["Văn", "Toán", "Tiếng Đức"],
+    "D06": ["Văn", "Toán", "Tiếng Nhật"],
+    "D07": ["Toán", "Hóa", "Tiếng Anh"],
+    "D08": ["Toán", "Sinh", "Tiếng Anh"],
+    "D09": ["Toán", "Sử", "Tiếng Anh"],
+    "D10": ["Toán", "Địa", "Tiếng Anh"],
+    "D11": ["Văn", "Lí", "Tiếng Anh"],
+    "D12": ["Văn", "Hóa", "Tiếng Anh"],
+    "D13": ["Văn", "Sinh", "Tiếng Anh"],
+    "D14": ["Văn", "Sử", "Tiếng Anh"],
+    "D15": ["Văn", "Địa", "Tiếng Anh"],
+    "D20": ["Toán", "Địa", "Tiếng Trung"],
+    "D21": ["Toán", "Hóa", "Tiếng Đức"],
+    "D22": ["Toán", "Hóa", "Tiếng Nga"],
+    "D23": ["Toán", "Hóa", "Tiếng Nhật"],
+    "D24": ["Toán", "Hóa", "Tiếng Pháp"],
+    "D25": ["Toán", "Hóa", "Tiếng Trung"],
+    "D26": ["Toán", "Lí", "Tiếng Đức"],
+    "D27": ["Toán", "Lí", "Tiếng Nga"],
+    "D28": ["Toán", "Lí", "Tiếng Nhật"],
+    "D29": ["Toán", "Lí", "Tiếng Pháp"],
+    "D30": ["Toán", "Lí", "Tiếng Trung"],
+    "D31": ["Toán", "Sinh", "Tiếng Đức"],
+    "D32": ["Toán", "Sinh", "Tiếng Nga"],
+    "D33": ["Toán", "Sinh", "Tiếng Nhật"],
+    "D34": ["Toán", "Sinh", "Tiếng Pháp"],
+    "D35": ["Toán", "Sinh", "Tiếng Trung"],
+    "D42": ["Văn", "Địa", "Tiếng Nga"],
+    "D43": ["Văn", "Địa", "Tiếng Nhật"],
+    "D44": ["Văn", "Địa", "Tiếng Pháp"],
+    "D45": ["Văn", "Địa", "Tiếng Trung"],
+    "D55": ["Văn", "Lí", "Tiếng Trung"],
+    "D63": ["Văn", "Sử", "Tiếng Nhật"],
+    "D64": ["Văn", "Sử", "Tiếng Pháp"],
+    "D65": ["Văn", "Sử", "Tiếng Trung"],
+    "D66": ["Văn", "Giáo dục kinh tế và pháp luật", "Tiếng Anh"],
+    "D68": ["Văn", "Giáo dục kinh tế và pháp luật", "Tiếng Nga"],
+    "D70": ["Văn", "Giáo dục kinh tế và pháp luật", "Tiếng Pháp"],
+    "D71": ["Văn", "Giáo dục kinh tế và pháp luật", "Tiếng Trung"],
+    "D84": ["Toán", "Tiếng Anh", "Giáo dục kinh tế và pháp luật"],
+}
+
+
+def block_max_score(code: str) -> int:
+    """
+    Max total for a block/subject (10 points per subject).
+    """
+    return 10 * (len(BLOCKS[code]) if code in BLOCKS else 1)
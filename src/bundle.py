@@ -0,0 +1,190 @@
+# src/bundle.py
+"""
+Precomputed statistics bundle: everything the lookups need, without the
+candidate file.
+
+A bundle is a directory with two files:
+
+  manifest.json  format + version, source fingerprint, and per block /
+                 subject / scoring scheme: subjects, count, max score,
+                 percentile table (0..100), counts_at_thresholds rows,
+                 1-point histogram bins and where its exact counts are in
+                 arrays.bin.
+  arrays.bin     the exact distributions: little-endian uint32 counts on
+                 the 0.01 grid, one array per entry, back to back.
+
+The JSON answers the usual static queries directly (e.g. from a CDN and a
+browser), the counts give exact percentile / rank for any score. A
+block -> block conversion curve is the pair of percentile tables
+(tables[src], tables[dst]), the two tables ConversionService interpolates.
+
+load_bundle rebuilds the block index ({code: BlockStats}) from the counts,
+so the app, the HTTP service and ConversionService run on a bundle
+unchanged (THPT_DATASETS="2018=bundles/2018"); only the features that
+need candidate rows (per-province index, incremental updates) are off.
+
+    python -m src.bundle data/diem_2018.csv bundles/2018
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from src.blocks import BLOCKS
+from src.block_index import BlockStats
+from src.conversion import PERCENTILES
+from src.histogram import ScoreHistogram
+
+FORMAT = "thpt-stats-bundle"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+ARRAYS = "arrays.bin"
+
+
+def is_bundle(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def _kind(code: str, stats: BlockStats) -> str:
+    if code in BLOCKS:
+        return "block"
+    return "subject" if stats.subjects == [code] else "scheme"
+
+
+def export_bundle(block_index: dict, out_dir: str, source: dict = None) -> dict:
+    """
+    Write the bundle of a block index to `out_dir` (replaced atomically).
+    `source` (e.g. the data file fingerprint) is stored as is; returns the
+    manifest.
+    """
+    tmp = f"{out_dir.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    blocks = {}
+    offset = 0
+    with open(os.path.join(tmp, ARRAYS), "wb") as f:
+        for code, st in block_index.items():
+            counts = st.hist.counts.astype("<u4")  # ScoreHistogram counts are uint32 < 2**32
+            f.write(counts.tobytes())
+            bins, _ = st.hist.histogram(st.max_score, 1)
+            blocks[code] = {
+                "kind": _kind(code, st),
+                "subjects": st.subjects,
+                "count": st.count,
+                "max_score": st.max_score,
+                "percentile_table": [float(x) for x in st.hist.percentile_table()],
+                "thresholds": st.query.counts_at_thresholds(max_score=st.max_score),
+                "bins": [int(x) for x in bins],
+                "counts": {"offset": offset, "length": int(counts.size), "dtype": "<u4"},
+            }
+            offset += counts.nbytes
+    manifest = {"format": FORMAT, "version": FORMAT_VERSION, "created": int(time.time()),
+                "source": source or {}, "grid_scale": 100,
+                "percentiles": [int(p) for p in PERCENTILES], "arrays": ARRAYS, "blocks": blocks}
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp, out_dir)
+    return manifest
+
+
+class StatsBundle:
+    """
+    Read side of a bundle: the manifest tables as they are, and the exact
+    histograms (memory-mapped) as a block index.
+    """
+    def __init__(self, path: str):
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT:
+            raise ValueError(f"{path}: not a statistics bundle")
+        if manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported bundle version {manifest.get('version')}")
+        self.path = path
+        self.manifest = manifest
+        self.source = manifest["source"]
+        self.blocks = manifest["blocks"]
+        size = os.path.getsize(os.path.join(path, manifest["arrays"]))
+        self._arrays = (np.memmap(os.path.join(path, manifest["arrays"]), dtype=np.uint8, mode="r")
+                        if size else np.zeros(0, dtype=np.uint8))
+
+    def __contains__(self, code) -> bool:
+        return code in self.blocks
+
+    def counts(self, code: str) -> np.ndarray:
+        """
+        Exact counts of `code` on the 0.01 grid (read-only view of arrays.bin).
+        """
+        c = self.blocks[code]["counts"]
+        dtype = np.dtype(c["dtype"])
+        return np.frombuffer(self._arrays, dtype=dtype, count=c["length"], offset=c["offset"])
+
+    def percentile_table(self, code: str) -> dict:
+        """
+        Same dict as ConversionService.percentile_table.
+        """
+        return {int(p): float(s) for p, s in
+                zip(self.manifest["percentiles"], self.blocks[code]["percentile_table"])}
+
+    def thresholds(self, code: str) -> list:
+        return self.blocks[code]["thresholds"]
+
+    def curve(self, src: str, dst: str):
+        """
+        (s_src, s_dst) percentile tables of a pair, the conversion curve;
+        None when either block has no candidates.
+        """
+        if self.blocks[src]["count"] == 0 or self.blocks[dst]["count"] == 0:
+            return None
+        return (np.asarray(self.blocks[src]["percentile_table"]),
+                np.asarray(self.blocks[dst]["percentile_table"]))
+
+    def block_index(self, min_count: int = 1) -> dict:
+        """
+        {code: BlockStats} identical to the index the bundle was exported from.
+        """
+        index = {}
+        for code, b in self.blocks.items():
+            if b["count"] >= min_count:
+                index[code] = BlockStats(code=code, subjects=list(b["subjects"]),
+                                         hist=ScoreHistogram(self.counts(code)),
+                                         max_score=int(b["max_score"]))
+        return index
+
+
+def load_bundle(path: str) -> StatsBundle:
+    return StatsBundle(path)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Xuất bộ thống kê tính sẵn (percentile, mốc điểm, phổ điểm)")
+    ap.add_argument("data", help="file điểm (CSV/XLSX)")
+    ap.add_argument("out", help="thư mục bundle")
+    ap.add_argument("--no-schemes", action="store_true", help="bỏ các cách tính có hệ số (src/schemes.py)")
+    args = ap.parse_args(argv)
+
+    from src.block_index import build_block_index
+    from src.cache import file_fingerprint, load_subject_columns
+    from src.schemes import build_scheme_index, load_schemes
+
+    t0 = time.perf_counter()
+    _, columns = load_subject_columns(args.data, compact=True)
+    index = build_block_index(columns, workers=0)
+    if not args.no_schemes:
+        index.update(build_scheme_index(columns, load_schemes()))
+    source = dict(file_fingerprint(args.data), path=os.path.basename(args.data),
+                  rows=len(next(iter(columns.values()), ())))
+    export_bundle(index, args.out, source)
+    size = sum(os.path.getsize(os.path.join(args.out, f)) for f in (MANIFEST, ARRAYS))
+    print(f"{args.data} -> {args.out}: {len(index)} blocks, {size / 2**10:.0f} KiB "
+          f"({time.perf_counter() - t0:.2f}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
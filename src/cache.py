@@ -0,0 +1,184 @@
+# src/cache.py
+"""
+On-disk columnar cache of the preprocessed subject columns.
+
+`compile_dataset` parses + preprocesses a CSV/XLSX once and writes each
+subject column as .npy files (float64, or compact codes + null bitmap,
+see src/compact.py), plus the candidate IDs (SBD) as int64 when the file
+has them; `load_subject_columns` memory-maps them on
+later starts, so every worker process shares the same page cache instead
+of re-parsing the source. The cache is invalidated by the source file's
+fingerprint (size, mtime, sha1).
+
+    python -m src.cache [--compact] data/diem_2018.csv
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from src.data_loader import load_data
+from src.preprocessing import preprocess
+from src.block_index import id_column, subject_columns
+from src.compact import CompactColumn, encode_columns
+from src.instrumentation import timed
+
+CACHE_DIR = os.environ.get("THPT_CACHE_DIR", ".cache/scores")
+CACHE_FORMAT = 4
+
+
+def file_fingerprint(path: str, chunk_size: int = 1 << 20) -> dict:
+    """
+    Return {'size', 'mtime_ns', 'sha1'} for a file (sha1 over the content).
+    """
+    st = os.stat(path)
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": h.hexdigest()}
+
+
+def _entry_dir(path: str, cache_dir: str, compact: bool = False) -> str:
+    key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, key + (".compact" if compact else ""))
+
+
+def _read_manifest(entry: str):
+    try:
+        with open(os.path.join(entry, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != CACHE_FORMAT:
+        return None
+    return manifest
+
+
+def _is_fresh(manifest, path: str) -> bool:
+    """
+    size + mtime match -> trust without hashing; otherwise compare sha1
+    (a touched but unchanged file keeps its cache).
+    """
+    if manifest is None:
+        return False
+    st = os.stat(path)
+    if st.st_size != manifest["size"]:
+        return False
+    if st.st_mtime_ns == manifest["mtime_ns"]:
+        return True
+    return file_fingerprint(path)["sha1"] == manifest["sha1"]
+
+
+def _open_entry(entry: str, manifest) -> tuple:
+    columns = {}
+    for col in manifest["columns"]:
+        arrays = [np.load(os.path.join(entry, f), mmap_mode="r") for f in col["files"]]
+        if col["kind"] == "compact":
+            columns[col["subject"]] = CompactColumn(codes=arrays[0], valid=arrays[1], step=col["step"])
+        else:
+            columns[col["subject"]] = arrays[0]
+    return [c["subject"] for c in manifest["columns"]], columns
+
+
+def _save_column(folder: str, i: int, subj: str, col) -> dict:
+    if isinstance(col, CompactColumn):
+        files = [f"{i:02d}.codes.npy", f"{i:02d}.valid.npy"]
+        np.save(os.path.join(folder, files[0]), col.codes)
+        np.save(os.path.join(folder, files[1]), col.valid)
+        return {"subject": subj, "kind": "compact", "step": col.step, "files": files}
+    files = [f"{i:02d}.npy"]
+    np.save(os.path.join(folder, files[0]), col)
+    return {"subject": subj, "kind": "float", "files": files}
+
+
+@timed()
+def compile_dataset(path: str, cache_dir: str = CACHE_DIR, use_polars_if_possible: bool = True,
+                    compact: bool = False):
+    """
+    Parse + preprocess `path` and write its subject columns to the cache
+    (as compact codes when `compact`). Returns (subjects, columns)
+    memory-mapped from the written files.
+    """
+    fp = file_fingerprint(path)
+    df_raw, backend = load_data(path, use_polars_if_possible=use_polars_if_possible)
+    df_proc, subjects, backend = preprocess(df_raw, backend)
+    columns = subject_columns(df_proc, subjects, backend)
+    ids = id_column(df_proc, backend)
+    del df_raw, df_proc
+    if compact:
+        columns = encode_columns(columns)
+
+    entry = _entry_dir(path, cache_dir, compact)
+    tmp = f"{entry}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    saved = [_save_column(tmp, i, subj, columns[subj]) for i, subj in enumerate(subjects)]
+    if ids is not None:
+        np.save(os.path.join(tmp, "ids.npy"), ids)
+    manifest = dict(fp, format=CACHE_FORMAT, source=os.path.abspath(path),
+                    rows=int(len(columns[subjects[0]])) if subjects else 0,
+                    columns=saved, ids="ids.npy" if ids is not None else None)
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    # swap in atomically; readers that already mapped the old files keep them
+    shutil.rmtree(entry, ignore_errors=True)
+    try:
+        os.replace(tmp, entry)
+    except OSError:
+        # another worker won the race with the same content
+        shutil.rmtree(tmp, ignore_errors=True)
+    return _open_entry(entry, _read_manifest(entry))
+
+
+@timed()
+def load_subject_columns(path: str, cache_dir: str = CACHE_DIR, use_cache: bool = True,
+                         compact: bool = False):
+    """
+    Return (subjects, {subject: column}) for a data file, memory-mapped
+    from the cache when it is fresh, compiling it otherwise. Columns are
+    float64 arrays, or CompactColumn when `compact`.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File not found: {path}")
+    if not use_cache:
+        df_raw, backend = load_data(path, use_polars_if_possible=True)
+        df_proc, subjects, backend = preprocess(df_raw, backend)
+        columns = subject_columns(df_proc, subjects, backend)
+        return subjects, encode_columns(columns) if compact else columns
+
+    entry = _entry_dir(path, cache_dir, compact)
+    manifest = _read_manifest(entry)
+    if _is_fresh(manifest, path):
+        return _open_entry(entry, manifest)
+    return compile_dataset(path, cache_dir, compact=compact)
+
+
+def load_candidate_ids(path: str, cache_dir: str = CACHE_DIR, compact: bool = False):
+    """
+    Candidate IDs (int64, row order of load_subject_columns) memory-mapped
+    from the cache, compiling it when stale; None when the file has no
+    usable SBD column.
+    """
+    entry = _entry_dir(path, cache_dir, compact)
+    manifest = _read_manifest(entry)
+    if not _is_fresh(manifest, path):
+        compile_dataset(path, cache_dir, compact=compact)
+        manifest = _read_manifest(entry)
+    if not manifest.get("ids"):
+        return None
+    return np.load(os.path.join(entry, manifest["ids"]), mmap_mode="r")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    compact = "--compact" in args
+    paths = [a for a in args if a != "--compact"] or ["data/diem_2018.csv"]
+    for p in paths:
+        subjects, columns = compile_dataset(p, compact=compact)
+        n = len(next(iter(columns.values()))) if columns else 0
+        print(f"{p}: {n:,} rows, {len(subjects)} subjects -> {_entry_dir(p, CACHE_DIR, compact)}")
@@ -0,0 +1,134 @@
+# src/compact.py
+"""
+Compact score storage: each subject column as small integer codes.
+
+A score x is stored as code = x * 100 / step, where step (in hundredths)
+is the largest grid the column fits on (25 for 0.25-point subjects, 20 for
+0.2-point foreign languages, ...). Codes fit in uint8 for every real
+subject (uint16 otherwise) and missing scores live in a packed null
+bitmap, so a column takes 1/8 - 1/4 of its float64 size. Totals are summed
+as integer hundredths and are exactly the float totals rounded to 0.01.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.instrumentation import timed
+
+SCALE = 100  # codes are counted in hundredths of a point
+
+
+@dataclass
+class CompactColumn:
+    codes: np.ndarray   # uint8/uint16, 0 where missing
+    valid: np.ndarray   # np.packbits(not-null mask)
+    step: int           # hundredths per code unit
+
+    def __len__(self):
+        return int(self.codes.size)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + self.valid.nbytes)
+
+    def mask(self) -> np.ndarray:
+        return np.unpackbits(self.valid, count=len(self)).astype(bool)
+
+    def hundredths(self, mask=None) -> np.ndarray:
+        """
+        Scores in hundredths (int32), optionally only rows in `mask`.
+        """
+        codes = self.codes if mask is None else self.codes[mask]
+        return codes.astype(np.int32) * self.step
+
+    def to_float(self) -> np.ndarray:
+        out = self.hundredths() / SCALE
+        out[~self.mask()] = np.nan
+        return out
+
+    def take(self, pos) -> np.ndarray:
+        """
+        float64 scores of rows `pos` (NaN = missing), without decoding the column.
+        """
+        out = self.hundredths(pos) / SCALE
+        out[~self.mask()[pos]] = np.nan
+        return out
+
+
+def encode_column(values: np.ndarray) -> CompactColumn:
+    """
+    Encode a float column (NaN = missing). Raises ValueError when a score
+    is not a multiple of 0.01, since the encoding would not be exact.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mask = ~np.isnan(values)
+    hund = np.rint(values[mask] * SCALE)
+    if not np.array_equal(hund / SCALE, values[mask]) or (hund < 0).any():
+        raise ValueError("scores are not non-negative multiples of 0.01")
+
+    hund = hund.astype(np.int64)
+    step = int(np.gcd.reduce(hund)) if hund.size else 1
+    step = step or 1
+    top = int(hund.max()) // step if hund.size else 0
+    dtype = np.uint8 if top <= np.iinfo(np.uint8).max else np.uint16
+    if top > np.iinfo(np.uint16).max:
+        raise ValueError("score range too large for compact codes")
+
+    codes = np.zeros(values.size, dtype=dtype)
+    codes[mask] = hund // step
+    return CompactColumn(codes=codes, valid=np.packbits(mask), step=step)
+
+
+def patch_column(col: CompactColumn, pos, values, size: int = None) -> CompactColumn:
+    """
+    Copy of `col` grown to `size` rows (new rows missing), with rows `pos`
+    set to float `values` (NaN = missing). Codes stay in place when the
+    values fit the column's grid; otherwise the column is re-encoded
+    (ValueError when it cannot be stored exactly, see encode_column).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    size = len(col) if size is None else size
+    mask = np.zeros(size, dtype=bool)
+    mask[:len(col)] = col.mask()
+    valid = ~np.isnan(values)
+    mask[pos] = valid
+    hund = np.rint(np.where(valid, values, 0.0) * SCALE)
+    fits = (np.array_equal(hund[valid] / SCALE, values[valid])
+            and (hund >= 0).all() and not (hund % col.step).any()
+            and (hund // col.step).max(initial=0) <= np.iinfo(col.codes.dtype).max)
+    if not fits:
+        full = np.full(size, np.nan)
+        full[:len(col)] = col.to_float()
+        full[pos] = values
+        return encode_column(full)
+    codes = np.zeros(size, dtype=col.codes.dtype)  # new array: the store is mapped read-only
+    codes[:len(col)] = col.codes
+    codes[pos] = hund // col.step
+    return CompactColumn(codes=codes, valid=np.packbits(mask), step=col.step)
+
+
+@timed()
+def encode_columns(columns: dict) -> dict:
+    """
+    Encode every column that can be stored exactly; others stay float64.
+    """
+    out = {}
+    for subj, values in columns.items():
+        try:
+            out[subj] = encode_column(values)
+        except ValueError:
+            out[subj] = np.asarray(values, dtype=np.float64)
+    return out
+
+
+def column_mask(col) -> np.ndarray:
+    """
+    Not-null mask for a float or compact column.
+    """
+    if isinstance(col, CompactColumn):
+        return col.mask()
+    return ~np.isnan(col)
+
+
+def columns_nbytes(columns: dict) -> int:
+    return sum(c.nbytes for c in columns.values())
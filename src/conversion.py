@@ -1,23 +1,152 @@
 # src/conversion.py
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import numpy as np
 
-def convert_score_via_percentile(src_table: dict, dst_table: dict, score_src: float) -> float:
-    """
-    Convert score_src from source-percentile-table to equivalent score in dst_table.
-    Uses linear interpolation.
-    """
-    p_src = np.array(sorted(src_table.keys()))
-    s_src = np.array([src_table[int(p)] for p in p_src])
+from src.instrumentation import timed
+
+PERCENTILES = np.arange(0, 101, 1)
 
-    p_dst = np.array(sorted(dst_table.keys()))
-    s_dst = np.array([dst_table[int(p)] for p in p_dst])
+def _table_arrays(table: dict):
+    p = np.array(sorted(table.keys()))
+    s = np.array([table[int(k)] for k in p])
+    return p, s
 
+def _convert(p_src, s_src, p_dst, s_dst, score_src: float) -> float:
     if score_src <= s_src.min():
         pct = 0.0
     elif score_src >= s_src.max():
         pct = 100.0
     else:
         pct = float(np.interp(score_src, s_src, p_src))
+    return float(np.interp(pct, p_dst, s_dst))
+
+def _convert_many(p_src, s_src, p_dst, s_dst, scores) -> np.ndarray:
+    # vector form of _convert (same clamping, element-wise identical)
+    scores = np.asarray(scores, dtype=np.float64)
+    pct = np.interp(scores, s_src, p_src)
+    pct = np.where(scores <= s_src.min(), 0.0, np.where(scores >= s_src.max(), 100.0, pct))
+    return np.interp(pct, p_dst, s_dst)
+
+@timed()
+def convert_score_via_percentile(src_table: dict, dst_table: dict, score_src: float) -> float:
+    """
+    Convert score_src from source-percentile-table to equivalent score in dst_table.
+    Uses linear interpolation.
+    """
+    p_src, s_src = _table_arrays(src_table)
+    p_dst, s_dst = _table_arrays(dst_table)
+    return _convert(p_src, s_src, p_dst, s_dst, score_src)
+
+class _LRU:
+    """
+    Small thread-safe LRU mapping with a fixed number of entries.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ConversionService:
+    """
+    Block -> block conversion over a block index ({code: BlockStats}).
+    Percentile tables (per block) are cached with LRU eviction, so a
+    conversion is two np.interp lookups over 101 points, with no sorting.
+    Safe to share between sessions/threads.
+    """
+    def __init__(self, block_index: dict, max_tables: int = 128):
+        self.block_index = block_index
+        self._tables = _LRU(max_tables)
+
+    def table(self, code: str) -> np.ndarray:
+        table = self._tables.get(code)
+        if table is None:
+            table = self.block_index[code].hist.percentile_table()
+            table.setflags(write=False)
+            self._tables.put(code, table)
+        return table
+
+    def percentile_table(self, code: str) -> dict:
+        """
+        Same dict as build_percentile_table(totals of `code`).
+        """
+        return {int(p): float(s) for p, s in zip(PERCENTILES, self.table(code))}
+
+    def _pair(self, src: str, dst: str):
+        if self.block_index[src].count == 0 or self.block_index[dst].count == 0:
+            return None
+        return self.table(src), self.table(dst)
+
+    def convert(self, src: str, dst: str, score: float) -> float:
+        """
+        Same result as convert_score_via_percentile on the two blocks'
+        tables; NaN when either block has no candidates.
+        """
+        tables = self._pair(src, dst)
+        if tables is None:
+            return float("nan")
+        s_src, s_dst = tables
+        return _convert(PERCENTILES, s_src, PERCENTILES, s_dst, score)
+
+    def convert_many(self, src: str, dst: str, scores) -> np.ndarray:
+        """
+        convert() for an array of scores in one vectorized call.
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        tables = self._pair(src, dst)
+        if tables is None:
+            return np.full(scores.shape, np.nan)
+        s_src, s_dst = tables
+        return _convert_many(PERCENTILES, s_src, PERCENTILES, s_dst, scores)
+
+    def conversion_matrix(self, src: str, scores, dst_blocks) -> np.ndarray:
+        """
+        [len(scores) x len(dst_blocks)] matrix of converted scores. As in the
+        app, converting a block to itself returns the score unchanged.
+        """
+        scores = np.asarray(scores, dtype=np.float64).ravel()
+        out = np.empty((scores.size, len(dst_blocks)))
+        for j, dst in enumerate(dst_blocks):
+            out[:, j] = scores if dst == src else self.convert_many(src, dst, scores)
+        return out
+
+
+class ConversionJobs:
+    """
+    Thread pool for the slow part of a conversion (loading the target
+    dataset, building its percentile tables), so the UI never blocks on
+    it. Requests with the same key share one Future across sessions;
+    finished Futures stay in an LRU so a repeated request is ready at once. Failed jobs are resubmitted on the next request.
+    """
+    def __init__(self, max_workers: int = 2, max_done: int = 1024):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thpt-convert")
+        self._futures = _LRU(max_done)
+        self._lock = threading.Lock()
 
-    score_dst = float(np.interp(pct, p_dst, s_dst))
-    return score_dst
+    def submit(self, key, fn, *args) -> Future:
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._executor.submit(fn, *args)
+                self._futures.put(key, future)
+            return future
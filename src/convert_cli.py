@@ -0,0 +1,67 @@
+# src/convert_cli.py
+"""
+Batch score conversion for whole rosters / result sheets.
+
+Reads a CSV with one score column (totals of block --src), converts every
+row to each --dst block by percentile and writes the input plus one
+column per target block. The input is streamed in chunks, so files of any
+size run in bounded memory.
+
+    python -m src.convert_cli roster.csv out.csv --src A00 --dst D01 C00 B00 \\
+        --score-col "Tổng điểm" --data data/diem_2018.csv
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from src.block_index import build_block_index
+from src.cache import load_subject_columns
+from src.conversion import ConversionService
+
+
+def convert_csv(service: ConversionService, src: str, dst_blocks, in_path: str, out_path: str,
+                score_col: str, chunksize: int = 100_000, decimals: int = 2) -> int:
+    """
+    Stream `in_path` -> `out_path`, adding a 'score_<dst>' column per target
+    block. Returns the number of rows written.
+    """
+    rows = 0
+    reader = pd.read_csv(in_path, chunksize=chunksize)
+    for i, chunk in enumerate(reader):
+        if score_col not in chunk.columns:
+            raise ValueError(f"Column not found: {score_col}")
+        scores = pd.to_numeric(chunk[score_col], errors="coerce").to_numpy(dtype="float64")
+        matrix = service.conversion_matrix(src, scores, dst_blocks).round(decimals)
+        for j, dst in enumerate(dst_blocks):
+            chunk[f"score_{dst}"] = matrix[:, j]
+        chunk.to_csv(out_path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        rows += len(chunk)
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Quy đổi điểm hàng loạt theo percentile")
+    ap.add_argument("input")
+    ap.add_argument("output")
+    ap.add_argument("--src", required=True, help="khối/môn của cột điểm đầu vào")
+    ap.add_argument("--dst", nargs="+", required=True, help="các khối/môn đích")
+    ap.add_argument("--score-col", default="score")
+    ap.add_argument("--data", default="data/diem_2018.csv", help="dữ liệu điểm toàn quốc")
+    ap.add_argument("--chunksize", type=int, default=100_000)
+    args = ap.parse_args(argv)
+
+    _, columns = load_subject_columns(args.data, compact=True)
+    index = build_block_index(columns)
+    missing = [b for b in [args.src, *args.dst] if b not in index]
+    if missing:
+        ap.error(f"Không có dữ liệu cho khối/môn: {', '.join(missing)}")
+
+    service = ConversionService(index)
+    n = convert_csv(service, args.src, args.dst, args.input, args.output,
+                    args.score_col, chunksize=args.chunksize)
+    print(f"{n:,} rows -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,14 @@
 # src/data_loader.py
 import os
 import io
+from importlib.util import find_spec
 
-try:
-    import polars as pl
-    HAS_POLARS = True
-except Exception:
-    HAS_POLARS = False
+from src.instrumentation import timed
 
-import pandas as pd
+# chỉ kiểm tra có cài polars hay không; polars/pandas được import khi đọc file
+HAS_POLARS = find_spec("polars") is not None
 
+@timed()
 def load_data(path: str, use_polars_if_possible: bool = True):
     """
     Load CSV/XLSX from a given path.
@@ -21,6 +20,7 @@ def load_data(path: str, use_polars_if_possible: bool = True):
     ext = os.path.splitext(path)[1].lower()
     if HAS_POLARS and use_polars_if_possible and ext == ".csv":
         try:
+            import polars as pl
             df = pl.read_csv(path)
             return df, "polars"
         except Exception:
@@ -28,6 +28,7 @@ def load_data(path: str, use_polars_if_possible: bool = True):
             pass
 
     # pandas fallback (handles csv & xlsx)
+    import pandas as pd
     if ext == ".csv":
         df = pd.read_csv(path)
     elif ext in [".xls", ".xlsx"]:
@@ -35,3 +36,11 @@ def load_data(path: str, use_polars_if_possible: bool = True):
     else:
         raise ValueError("Unsupported file extension")
     return df, "pandas"
+
+def dataset_version(path: str):
+    """
+    Cheap version key for a data file: (size, mtime_ns).
+    Changes whenever the file is replaced or edited.
+    """
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
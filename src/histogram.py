@@ -0,0 +1,200 @@
+# src/histogram.py
+"""
+Exact score histogram: the whole distribution of a block in a few KB.
+
+Totals are multiples of 0.01, so counts[k] = number of candidates whose
+total is k / 100 describes the distribution exactly. With the cumulative
+sums every statistic the app shows (percentile, rank, ties, threshold
+counts, 1-point histogram bins, percentile table) is an O(log bins) or
+O(bins) lookup, independent of the number of candidates, and gives the
+same numbers as the sorted totals array.
+"""
+import struct
+from functools import cached_property
+
+import numpy as np
+
+from src.compact import SCALE
+
+_MAGIC = b"THPH"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHI")  # magic, version, number of bins
+
+
+class ScoreHistogram:
+    """
+    Counts over the 0.01 grid [0, (size - 1) / 100]. Queries follow the
+    analysis functions (percentile_of_score, rank_of_score, ...), with
+    methods ending in 's' taking an array of scores.
+    """
+    def __init__(self, counts):
+        counts = np.asarray(counts)
+        if counts.ndim != 1 or (counts < 0).any():
+            raise ValueError("counts must be a 1-D array of non-negative integers")
+        self.counts = counts.astype(np.uint32 if counts.size == 0 or counts.max() < 2**32 else np.int64)
+        self.n = int(self.counts.sum(dtype=np.int64))
+
+    @classmethod
+    def from_totals(cls, totals, size=None):
+        """
+        Histogram of float totals (rounded to 0.01, as in the block index).
+        """
+        hund = np.rint(np.asarray(totals, dtype=np.float64) * SCALE).astype(np.int64)
+        return cls(np.bincount(hund, minlength=size or 0))
+
+    def __len__(self):
+        return self.n
+
+    def __eq__(self, other):
+        if not isinstance(other, ScoreHistogram):
+            return NotImplemented
+        a, b = self._padded(other)
+        return bool(np.array_equal(a, b))
+
+    @property
+    def size(self) -> int:
+        return int(self.counts.size)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.counts.nbytes)
+
+    # --- lookup tables (built lazily, O(bins)) ---
+    @cached_property
+    def _grid(self) -> np.ndarray:
+        # the exact float values a sorted totals array would hold
+        return np.arange(self.size) / SCALE
+
+    @cached_property
+    def _cum(self) -> np.ndarray:
+        # _cum[k] = number of candidates with total < k / 100
+        return np.concatenate(([0], np.cumsum(self.counts, dtype=np.int64)))
+
+    # --- raw counts (scalar or array input) ---
+    def count_below(self, scores):
+        return self._cum[np.searchsorted(self._grid, scores, side="left")]
+
+    def count_at_most(self, scores):
+        return self._cum[np.searchsorted(self._grid, scores, side="right")]
+
+    def count_above(self, scores):
+        return self.n - self.count_at_most(scores)
+
+    def count_at_least(self, scores):
+        return self.n - self.count_below(scores)
+
+    def count_equal(self, scores):
+        return self.count_at_most(scores) - self.count_below(scores)
+
+    # --- same semantics as the analysis module functions ---
+    def percentiles(self, scores) -> np.ndarray:
+        scores = np.asarray(scores, dtype=np.float64)
+        if self.n == 0:
+            return np.zeros(scores.shape)
+        left = self.count_below(scores)
+        right = self.count_at_most(scores)
+        return (left + 0.5 * (right - left)) / self.n * 100.0
+
+    def percentile(self, score: float) -> float:
+        return float(self.percentiles(score))
+
+    def ranks(self, scores) -> np.ndarray:
+        return self.count_above(np.asarray(scores, dtype=np.float64)) + 1
+
+    def rank(self, score: float) -> int:
+        return int(self.ranks(score))
+
+    def ties(self, score: float) -> int:
+        return int(self.count_equal(score))
+
+    def counts_at_thresholds(self, max_score=30, min_score=0):
+        marks = np.arange(int(max_score), int(min_score) - 1, -1)
+        counts = self.count_at_least(marks)
+        rows = []
+        for m, cnt in zip(marks, counts):
+            pct = round(int(cnt) / self.n * 100.0, 2) if self.n > 0 else 0.0
+            rows.append({"moc": f"{m}+", "count": int(cnt), "pct": pct})
+        return rows
+
+    # --- derived structures ---
+    def value_at(self, ranks) -> np.ndarray:
+        """
+        Values of the sorted totals at 0-based positions `ranks`.
+        """
+        idx = np.searchsorted(self._cum, np.asarray(ranks, dtype=np.int64), side="right") - 1
+        return self._grid[idx]
+
+    def percentile_table(self, percentiles=None) -> np.ndarray:
+        """
+        np.percentile(sorted totals, percentiles) (linear method) without
+        materializing the totals; zeros when empty, like build_percentile_table.
+        """
+        q = np.arange(0, 101, 1) if percentiles is None else np.asarray(percentiles)
+        if self.n == 0:
+            return np.zeros(q.shape)
+        # same arithmetic as numpy's linear quantile (virtual index + _lerp)
+        virtual = (self.n - 1) * np.true_divide(q, 100)
+        prev = np.floor(virtual).astype(np.int64)
+        nxt = np.minimum(prev + 1, self.n - 1)
+        gamma = virtual - prev
+        a, b = self.value_at(prev), self.value_at(nxt)
+        diff = b - a
+        out = a + diff * gamma
+        np.subtract(b, diff * (1 - gamma), out=out, where=gamma >= 0.5)
+        return out
+
+    def histogram(self, max_score: int, bin_step: int = 1):
+        """
+        (counts, edges) equal to np.histogram(totals, np.arange(0, max_score + step, step)).
+        """
+        edges = np.arange(0, max_score + bin_step, bin_step)
+        width = bin_step * SCALE
+        top = int(edges[-1]) * SCALE
+        counts = np.zeros(top + 1, dtype=np.int64)
+        used = min(self.size, top + 1)
+        counts[:used] = self.counts[:used]
+        binned = counts[:top].reshape(len(edges) - 1, width).sum(axis=1)
+        binned[-1] += counts[top]  # right edge is closed, as in np.histogram
+        return binned, edges
+
+    def sorted_totals(self) -> np.ndarray:
+        """
+        The equivalent sorted totals array (O(candidates) memory).
+        """
+        return np.repeat(self._grid, self.counts)
+
+    # --- merge / serialization ---
+    def _padded(self, other):
+        size = max(self.size, other.size)
+        a = np.zeros(size, dtype=np.int64)
+        b = np.zeros(size, dtype=np.int64)
+        a[:self.size] = self.counts
+        b[:other.size] = other.counts
+        return a, b
+
+    def merge(self, other: "ScoreHistogram") -> "ScoreHistogram":
+        a, b = self._padded(other)
+        return ScoreHistogram(a + b)
+
+    __add__ = merge
+
+    def to_bytes(self) -> bytes:
+        """
+        Header (magic, version, size) + little-endian uint32 counts.
+        """
+        if self.counts.dtype != np.uint32:
+            raise ValueError("counts too large to serialize")
+        return _HEADER.pack(_MAGIC, _VERSION, self.size) + self.counts.astype("<u4").tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ScoreHistogram":
+        if len(data) < _HEADER.size or data[:4] != _MAGIC:
+            raise ValueError("not a score histogram")
+        _, version, size = _HEADER.unpack_from(data)
+        if version != _VERSION:
+            raise ValueError(f"unsupported histogram version: {version}")
+        if len(data) != _HEADER.size + 4 * size:
+            raise ValueError(f"score histogram of {size} bins needs {_HEADER.size + 4 * size} "
+                             f"bytes, got {len(data)}")
+        counts = np.frombuffer(data, dtype="<u4", count=size, offset=_HEADER.size)
+        return cls(counts.copy())
@@ -0,0 +1,301 @@
+# src/incremental.py
+"""
+Incremental updates of a block index by candidate ID (SBD).
+
+Block distributions are count histograms, so they are additive: replacing
+a candidate's row subtracts the old row's block totals and adds the new
+ones, appending only adds. An update batch therefore costs one batched
+pass (src/block_matrix.py) over the changed rows, not over the whole
+dataset, and only the blocks whose counts changed get new BlockStats.
+Weighted scoring schemes (src/schemes.py) are count histograms too and
+follow the same delta, in their own matrix.
+
+Rows keep the storage of the dataset's columns (compact codes from
+src/compact.py, or float64 with NaN = missing) next to a sorted ID index,
+so batches are matched by searchsorted. A batch writes new column arrays
+(patched codes, never a float64 decode), so earlier snapshots of
+`columns` stay valid. Removing a
+candidate clears its scores: an all-missing row contributes to no block.
+
+    python -m src.incremental data/diem_2018.csv phuc_khao_1.csv phuc_khao_2.csv --verify
+
+--verify compares the incremental index with a full rebuild from the
+current rows and with a full reload of the base file merged with the
+updates (last row per SBD wins).
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from src.blocks import BLOCKS
+from src.block_index import (ID_COLUMN, build_block_index, build_block_stats_counts, id_column,
+                             index_blocks, subject_columns)
+from src.block_matrix import block_hundredth_counts
+from src.compact import CompactColumn, patch_column
+from src.instrumentation import timed
+from src.schemes import build_scheme_index, build_scheme_stats_counts, compile_schemes
+
+
+def _take(col, pos) -> np.ndarray:
+    return col.take(pos) if isinstance(col, CompactColumn) else col[pos]
+
+
+def _set_rows(col, pos, values, size: int = None):
+    """
+    New column: `col` grown to `size` rows, rows `pos` set to `values`.
+    """
+    size = len(col) if size is None else size
+    if isinstance(col, CompactColumn):
+        try:
+            return patch_column(col, pos, values, size)
+        except ValueError:
+            col = col.to_float()  # off the 0.01 grid: float64 like encode_columns
+    out = np.full(size, np.nan)
+    out[:len(col)] = col
+    out[pos] = values
+    return out
+
+
+def read_updates(path: str):
+    """
+    (ids, {subject: float64 array}) of an update file (same layout as the
+    result files: SBD + subject columns, foreign language split as usual).
+    """
+    from src.data_loader import load_data
+    from src.preprocessing import preprocess
+    df_raw, backend = load_data(path)
+    df, subjects, backend = preprocess(df_raw, backend)
+    ids = id_column(df, backend)
+    if ids is None:
+        raise ValueError(f"{path}: missing or invalid {ID_COLUMN} column")
+    return ids, subject_columns(df, subjects, backend)
+
+
+class IncrementalIndex:
+    """
+    Block index over candidate rows keyed by ID, updated by delta.
+    `block_index` has the same content as build_block_index(self.columns,
+    blocks, min_count) followed by build_scheme_index(self.columns, schemes,
+    min_count) after every update.
+    """
+    def __init__(self, ids, columns: dict, blocks=BLOCKS, min_count=1, schemes=()):
+        ids = np.asarray(ids, dtype=np.int64)
+        if np.unique(ids).size != ids.size:
+            raise ValueError("duplicate candidate IDs")
+        self.blocks = blocks
+        self.min_count = min_count
+        self.subjects = list(columns)
+        self.columns = {s: (col if isinstance(col, CompactColumn)
+                            else np.array(col, dtype=np.float64))
+                        for s, col in columns.items()}
+        self.ids = ids.copy()
+        self.alive = np.ones(ids.size, dtype=bool)
+        self._order = np.argsort(ids, kind="stable")
+        self._sorted = ids[self._order]
+        self.wanted = index_blocks(self.subjects, blocks)
+        self._scheme_blocks, self._scheme_weights = compile_schemes(schemes, self.subjects)
+        self.schemes = [s for s in schemes if s.name in self._scheme_blocks]
+        self.counts, self.scheme_counts = self._counts(self.columns)
+        self.block_index = {}
+        self._refresh(range(len(self.wanted)), range(len(self.schemes)))
+
+    @classmethod
+    def from_cache(cls, path: str, blocks=BLOCKS, min_count=1, schemes=(), **cache_kwargs):
+        """
+        Start from the memory-mapped store of a result file (src/cache.py).
+        """
+        from src.cache import load_candidate_ids, load_subject_columns
+        _, columns = load_subject_columns(path, **cache_kwargs)
+        ids = load_candidate_ids(path, **cache_kwargs)
+        if ids is None:
+            raise ValueError(f"{path}: missing or invalid {ID_COLUMN} column")
+        return cls(ids, columns, blocks, min_count, schemes)
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    # --- helpers ---
+    def _positions(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Row of each ID, -1 when unknown.
+        """
+        if self._sorted.size == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        i = np.minimum(np.searchsorted(self._sorted, ids), self._sorted.size - 1)
+        return np.where(self._sorted[i] == ids, self._order[i], -1)
+
+    def _batch(self, ids, columns: dict):
+        unknown = set(columns) - set(self.subjects)
+        if unknown:
+            raise ValueError(f"subjects not in the dataset: {sorted(unknown)}")
+        ids = np.asarray(ids, dtype=np.int64)
+        # duplicate IDs inside one batch: the last row wins
+        _, last = np.unique(ids[::-1], return_index=True)
+        keep = np.sort(ids.size - 1 - last)
+        n = ids.size
+        cols = {}
+        for s in self.subjects:
+            col = columns.get(s)
+            cols[s] = (np.full(n, np.nan) if col is None
+                       else np.asarray(col, dtype=np.float64))[keep]
+        return ids[keep], cols
+
+    def _rows(self, pos: np.ndarray) -> dict:
+        return {s: _take(col, pos) for s, col in self.columns.items()}
+
+    def _counts(self, columns: dict) -> list:
+        """
+        [block counts, scheme counts] of some rows (block_hundredth_counts).
+        """
+        return [block_hundredth_counts(columns, self.wanted),
+                block_hundredth_counts(columns, self._scheme_blocks, weights=self._scheme_weights)]
+
+    def _refresh(self, changed, changed_schemes=()):
+        """
+        New BlockStats for the changed rows of `counts` / `scheme_counts`;
+        others are reused.
+        """
+        changed, changed_schemes = set(changed), set(changed_schemes)
+        index = {}
+        for j, (code, subs) in enumerate(self.wanted.items()):
+            stats = self.block_index.get(code)
+            if stats is None or j in changed:
+                stats = build_block_stats_counts(code, subs, self.counts[j])
+            if stats.count >= self.min_count:
+                index[code] = stats
+        for j, scheme in enumerate(self.schemes):
+            stats = self.block_index.get(scheme.name)
+            if stats is None or j in changed_schemes:
+                stats = build_scheme_stats_counts(scheme, self.scheme_counts[j])
+            if stats.count >= self.min_count:
+                index[scheme.name] = stats
+        self.block_index = index
+
+    def _apply_delta(self, delta: list) -> list:
+        self.counts += delta[0]
+        self.scheme_counts += delta[1]
+        changed = np.flatnonzero(delta[0].any(axis=1)).tolist()
+        changed_schemes = np.flatnonzero(delta[1].any(axis=1)).tolist()
+        if changed or changed_schemes:
+            self._refresh(changed, changed_schemes)
+        return [list(self.wanted)[j] for j in changed] + [self.schemes[j].name for j in changed_schemes]
+
+    # --- updates ---
+    @timed("incremental.upsert")
+    def upsert(self, ids, columns: dict) -> dict:
+        """
+        Replace the rows of known IDs and append the others. Subjects
+        missing from `columns` are treated as not taken.
+        Returns {"replaced", "added", "changed_blocks", "rows"} (rows: the
+        positions written, replaced then appended).
+        """
+        ids, columns = self._batch(ids, columns)
+        pos = self._positions(ids)
+        old = pos >= 0
+        delta = self._counts(columns)
+        if old.any():
+            delta = [d - o for d, o in zip(delta, self._counts(self._rows(pos[old])))]
+            self.alive[pos[old]] = True
+        new = ~old
+        start, added = self.ids.size, int(new.sum())
+        rows = np.concatenate([pos[old], start + np.arange(added)])
+        for s in self.subjects:
+            values = np.concatenate([columns[s][old], columns[s][new]])
+            self.columns[s] = _set_rows(self.columns[s], rows, values, start + added)
+        if new.any():
+            self.ids = np.concatenate([self.ids, ids[new]])
+            self.alive = np.concatenate([self.alive, np.ones(added, dtype=bool)])
+            # merge the new IDs into the sorted index (O(n) insert, no re-sort)
+            add_ids = ids[new]
+            add_order = np.argsort(add_ids, kind="stable")
+            at = np.searchsorted(self._sorted, add_ids[add_order])
+            self._sorted = np.insert(self._sorted, at, add_ids[add_order])
+            self._order = np.insert(self._order, at, start + add_order)
+        changed = self._apply_delta(delta)
+        return {"replaced": int(old.sum()), "added": added, "changed_blocks": changed, "rows": rows}
+
+    @timed("incremental.remove")
+    def remove(self, ids) -> dict:
+        """
+        Remove candidates by ID (unknown IDs are ignored).
+        """
+        pos = self._positions(np.unique(np.asarray(ids, dtype=np.int64)))
+        pos = pos[pos >= 0]
+        pos = pos[self.alive[pos]]
+        delta = [-d for d in self._counts(self._rows(pos))]
+        for s in self.subjects:
+            self.columns[s] = _set_rows(self.columns[s], pos, np.full(pos.size, np.nan))
+        self.alive[pos] = False
+        changed = self._apply_delta(delta)
+        return {"removed": int(pos.size), "changed_blocks": changed, "rows": pos}
+
+    def apply_file(self, path: str) -> dict:
+        ids, columns = read_updates(path)
+        return self.upsert(ids, columns)
+
+    # --- verification ---
+    def verify(self, reference: dict = None) -> list:
+        """
+        Codes whose distribution differs from `reference` (default: a full
+        build_block_index + build_scheme_index over the current rows); empty
+        when consistent.
+        """
+        if reference is None:
+            reference = build_block_index(self.columns, self.blocks, min_count=self.min_count)
+            reference.update(build_scheme_index(self.columns, self.schemes, self.min_count))
+        codes = list(dict.fromkeys(list(self.block_index) + list(reference)))
+        return [c for c in codes
+                if c not in self.block_index or c not in reference
+                or self.block_index[c].hist != reference[c].hist]
+
+
+def merged_rebuild(base_path: str, update_paths, blocks=BLOCKS, min_count=1, schemes=()) -> dict:
+    """
+    Full rebuild for --verify: base file + update files concatenated, last
+    row per SBD kept, then the normal load / preprocess / index pipeline.
+    """
+    import pandas as pd
+    from src.data_loader import load_data
+    from src.preprocessing import preprocess
+    frames = []
+    for p in [base_path, *update_paths]:
+        df, backend = load_data(p, use_polars_if_possible=False)
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    df = df[~df[ID_COLUMN].duplicated(keep="last")]
+    df, subjects, backend = preprocess(df, "pandas")
+    columns = subject_columns(df, subjects, backend)
+    index = build_block_index(columns, blocks, min_count=min_count)
+    index.update(build_scheme_index(columns, schemes, min_count))
+    return index
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Apply update files to a dataset's block index by SBD.")
+    ap.add_argument("base", help="result file (CSV/XLSX) with an SBD column")
+    ap.add_argument("updates", nargs="*", help="update files, applied in order")
+    ap.add_argument("--verify", action="store_true", help="compare with full rebuilds")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    inc = IncrementalIndex.from_cache(args.base)
+    print(f"{args.base}: {len(inc):,} candidates, {len(inc.block_index)} blocks "
+          f"({time.perf_counter() - t0:.2f}s)")
+    for p in args.updates:
+        t0 = time.perf_counter()
+        r = inc.apply_file(p)
+        print(f"{p}: {r['replaced']:,} replaced, {r['added']:,} added, "
+              f"{len(r['changed_blocks'])} blocks changed ({time.perf_counter() - t0:.3f}s)")
+    if not args.verify:
+        return 0
+    bad = inc.verify()
+    bad_merged = inc.verify(merged_rebuild(args.base, args.updates))
+    print(f"verify vs rebuild from rows: {'ok' if not bad else bad}")
+    print(f"verify vs merged files:      {'ok' if not bad_merged else bad_merged}")
+    return 1 if bad or bad_merged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# src/instrumentation.py
+"""
+Per-stage timing, allocation counters and optional cProfile capture.
+
+Off by default. Enable with environment variables read at import time:
+
+    THPT_INSTRUMENT=1     record wall time of every @timed stage / stage() block
+    THPT_TRACEMALLOC=1    also record net traced allocation per call (implies
+                          THPT_INSTRUMENT; tracemalloc itself slows Python down)
+
+When disabled, @timed returns the function unchanged and stage() returns a
+shared no-op context manager, so instrumented code runs exactly as before.
+
+Samples are kept per stage in a bounded ring buffer (last MAX_SAMPLES calls)
+and summarized by snapshot() (count, mean, p50/p95/p99, max) for the debug
+panel in app.py and /metrics in src/service.py.
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+
+import numpy as np
+
+TRACE_ALLOC = os.environ.get("THPT_TRACEMALLOC", "0") == "1"
+ENABLED = TRACE_ALLOC or os.environ.get("THPT_INSTRUMENT", "0") == "1"
+MAX_SAMPLES = 1000
+
+_NOOP = nullcontext()
+_lock = threading.Lock()
+_stats = {}
+
+if TRACE_ALLOC and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+class StageStats:
+    """
+    Call count, total time and the last MAX_SAMPLES durations of one stage.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+        self.alloc = 0  # net traced bytes, summed over calls
+
+    def add(self, seconds: float, alloc: int = 0):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        self.alloc += alloc
+
+
+def record(name: str, seconds: float, alloc: int = 0):
+    with _lock:
+        st = _stats.get(name)
+        if st is None:
+            st = _stats[name] = StageStats()
+        st.add(seconds, alloc)
+
+
+class _Stage:
+    __slots__ = ("name", "t0", "m0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.m0 = tracemalloc.get_traced_memory()[0] if TRACE_ALLOC else 0
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        alloc = tracemalloc.get_traced_memory()[0] - self.m0 if TRACE_ALLOC else 0
+        record(self.name, elapsed, alloc)
+        return False
+
+    def stop(self):
+        self.__exit__(None, None, None)
+
+
+def stage(name: str):
+    """
+    Context manager timing one block:  with stage("app.render"): ...
+    """
+    return _Stage(name) if ENABLED else _NOOP
+
+
+def start(name: str):
+    """
+    Start a timer for code that cannot be wrapped in `with` (e.g. a whole
+    Streamlit rerun); call .stop() on the result. No-op when disabled.
+    """
+    return _Stage(name).__enter__() if ENABLED else _NoopTimer
+
+
+class _NoopTimer:
+    @staticmethod
+    def stop():
+        pass
+
+
+def timed(name: str = None):
+    """
+    Decorator recording every call under `name` (default module.function).
+    Returns the function itself when instrumentation is disabled.
+    """
+    def deco(fn):
+        if not ENABLED:
+            return fn
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Stage(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+# --- reports ---
+def snapshot() -> dict:
+    """
+    {stage: {count, total_ms, mean_ms, p50_ms, p95_ms, p99_ms, max_ms, alloc_bytes}};
+    percentiles are over the retained samples.
+    """
+    with _lock:
+        items = [(k, v.count, v.total, np.array(v.samples), v.alloc) for k, v in _stats.items()]
+    out = {}
+    for name, count, total, samples, alloc in sorted(items):
+        ms = samples * 1000.0
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        out[name] = {"count": count, "total_ms": total * 1000.0, "mean_ms": total * 1000.0 / count,
+                     "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+                     "max_ms": float(ms.max()), "alloc_bytes": alloc}
+    return out
+
+
+def samples(name: str) -> np.ndarray:
+    """
+    Retained durations of one stage in milliseconds (for latency histograms).
+    """
+    with _lock:
+        st = _stats.get(name)
+        return np.array(st.samples) * 1000.0 if st is not None else np.zeros(0)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def prometheus_text(prefix: str = "thpt_stage") -> str:
+    """
+    snapshot() in the Prometheus text exposition format (summary per stage).
+    """
+    snap = snapshot()
+    lines = [f"# TYPE {prefix}_seconds summary"]
+    for name, s in snap.items():
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        for q, key in ((0.5, "p50_ms"), (0.95, "p95_ms"), (0.99, "p99_ms")):
+            lines.append(f'{prefix}_seconds{{stage="{label}",quantile="{q}"}} {s[key] / 1000.0:.9f}')
+        lines.append(f'{prefix}_seconds_sum{{stage="{label}"}} {s["total_ms"] / 1000.0:.9f}')
+        lines.append(f'{prefix}_seconds_count{{stage="{label}"}} {s["count"]}')
+    if TRACE_ALLOC:
+        lines.append(f"# TYPE {prefix}_alloc_bytes counter")
+        for name, s in snap.items():
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{prefix}_alloc_bytes{{stage="{label}"}} {s["alloc_bytes"]}')
+    return "\n".join(lines) + "\n"
+
+
+# --- cProfile ---
+class Profile:
+    """
+    cProfile capture of a code region, independent of ENABLED:
+
+        prof = Profile().start(); ...; text = prof.stop()
+    """
+    def __init__(self, sort: str = "cumulative", limit: int = 30):
+        self.sort = sort
+        self.limit = limit
+        self._prof = cProfile.Profile()
+
+    def start(self) -> "Profile":
+        self._prof.enable()
+        return self
+
+    def stop(self) -> str:
+        self._prof.disable()
+        buf = io.StringIO()
+        pstats.Stats(self._prof, stream=buf).sort_stats(self.sort).print_stats(self.limit)
+        return buf.getvalue()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.text = self.stop()
+        return False
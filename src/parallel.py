@@ -0,0 +1,119 @@
+# src/parallel.py
+"""
+Parallel precomputation of block statistics.
+
+The rows are split into one range per worker; each worker computes the
+per-block counts of its range (block_matrix.block_hundredth_counts) and
+the partial counts are summed, so the result is identical to the serial
+build.
+
+- "thread": workers share the columns directly; the matmul (BLAS) and most
+  NumPy array work release the GIL.
+- "process": the subject columns are copied once into a
+  multiprocessing.shared_memory segment; workers attach to it by name and
+  build zero-copy views, so no DataFrame or array is pickled per task.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.block_matrix import CHUNK_ROWS, block_hundredth_counts
+from src.compact import CompactColumn
+from src.instrumentation import timed
+
+
+def default_workers() -> int:
+    return max(1, len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1)
+
+
+def _row_ranges(n: int, parts: int, align: int = CHUNK_ROWS):
+    # ranges aligned to the chunk size, so workers see the same chunks as a serial run
+    step = max(align, -(-n // parts // align) * align)
+    return [(lo, min(lo + step, n)) for lo in range(0, n, step)]
+
+
+# --- shared memory transport (process pool) ---
+def _column_arrays(col):
+    if isinstance(col, CompactColumn):
+        return [col.codes, col.valid]
+    return [np.asarray(col)]
+
+
+def share_columns(columns: dict):
+    """
+    Copy every column array into one SharedMemory segment.
+    Returns (shm, spec); `spec` is small and picklable, see attach_columns.
+    """
+    arrays, spec, offset = [], [], 0
+    for subj, col in columns.items():
+        entries = []
+        for arr in _column_arrays(col):
+            offset = -(-offset // 64) * 64  # cache-line aligned
+            entries.append((offset, arr.dtype.str, arr.shape))
+            arrays.append((offset, arr))
+            offset += arr.nbytes
+        step = col.step if isinstance(col, CompactColumn) else None
+        spec.append((subj, step, entries))
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for off, arr in arrays:
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf, offset=off)[...] = arr
+    return shm, spec
+
+
+def attach_columns(buf, spec) -> dict:
+    """
+    Rebuild the columns dict as views over a shared buffer.
+    """
+    columns = {}
+    for subj, step, entries in spec:
+        arrays = [np.ndarray(shape, dtype=np.dtype(dt), buffer=buf, offset=off)
+                  for off, dt, shape in entries]
+        columns[subj] = CompactColumn(codes=arrays[0], valid=arrays[1], step=step) \
+            if step is not None else arrays[0]
+    return columns
+
+
+_WORKER = {}
+
+
+def _init_worker(name, spec):
+    shm = shared_memory.SharedMemory(name=name)
+    _WORKER["shm"] = shm  # keep the mapping alive for the worker's lifetime
+    _WORKER["columns"] = attach_columns(shm.buf, spec)
+
+
+def _worker_counts(blocks, start, stop, chunk_rows):
+    return block_hundredth_counts(_WORKER["columns"], blocks, chunk_rows, start, stop)
+
+
+@timed()
+def parallel_block_counts(columns: dict, blocks: dict, workers: int = None,
+                          executor: str = "thread", chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+    """
+    block_hundredth_counts(columns, blocks) computed by a pool of workers.
+    """
+    workers = workers or default_workers()
+    blocks = {code: list(subs) for code, subs in blocks.items()}
+    n = len(next(iter(columns.values()))) if columns else 0
+    ranges = _row_ranges(n, workers, chunk_rows)
+    if workers == 1 or len(ranges) <= 1:
+        return block_hundredth_counts(columns, blocks, chunk_rows)
+
+    if executor == "thread":
+        with ThreadPoolExecutor(workers) as ex:
+            parts = ex.map(lambda r: block_hundredth_counts(columns, blocks, chunk_rows, *r), ranges)
+            return sum(parts)
+
+    if executor != "process":
+        raise ValueError(f"Unknown executor: {executor}")
+    shm, spec = share_columns(columns)
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(shm.name, spec)) as ex:
+            futures = [ex.submit(_worker_counts, blocks, lo, hi, chunk_rows) for lo, hi in ranges]
+            return sum(f.result() for f in futures)
+    finally:
+        shm.close()
+        shm.unlink()
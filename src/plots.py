@@ -1,39 +1,114 @@
 # src/plots.py
+import copy
+import json
+from functools import lru_cache
+
 import plotly.graph_objects as go
+import plotly.io as pio
 import numpy as np
-import pandas as pd
 
-def histogram_with_score(totals_arr, user_score: float,
-                         bin_min=0, bin_max=30, bin_step=1,
-                         title="Phổ điểm"):
+from src.histogram import ScoreHistogram
+from src.instrumentation import timed
+
+_BEFORE = "rgba(200,200,200,0.6)"  # cột nằm hoàn toàn dưới điểm của bạn
+_AFTER = "rgba(94,60,193,0.9)"
+_COLORS_SLOT = "__THPT_COLORS__"  # placeholders in the cached base JSON
+_SHAPES_SLOT = "__THPT_SHAPES__"
+_ANNOTATIONS_SLOT = "__THPT_ANNOTATIONS__"
+
+
+def _binned(totals_arr, bin_min, bin_max, bin_step, hist):
+    if hist is not None:
+        return hist
+    if isinstance(totals_arr, ScoreHistogram) and bin_min == 0:
+        return totals_arr.histogram(bin_max, bin_step)
+    if isinstance(totals_arr, ScoreHistogram):
+        totals_arr = totals_arr.sorted_totals()
     bins = np.arange(bin_min, bin_max + bin_step, bin_step)
-    counts, edges = np.histogram(totals_arr, bins=bins)
-    x_centers = (edges[:-1] + edges[1:]) / 2.0
-    labels = [f"{int(edges[i])}-{int(edges[i+1])}" for i in range(len(edges)-1)]
+    return np.histogram(totals_arr, bins=bins)
+
 
-    colors = []
-    for left, right in zip(edges[:-1], edges[1:]):
-        if right <= user_score:
-            colors.append("rgba(200,200,200,0.6)")
-        else:
-            colors.append("rgba(94,60,193,0.9)")
+@lru_cache(maxsize=256)
+def _base_spec(counts: tuple, edges: tuple, bin_step, title) -> dict:
+    """
+    Plotly JSON dict of everything that does not depend on the user's score
+    (bars, tick labels, layout); validated once per block/binning.
+    """
+    counts, edges = np.asarray(counts), np.asarray(edges)
+    x_centers = (edges[:-1] + edges[1:]) / 2.0
+    labels = [f"{int(a)}-{int(b)}" for a, b in zip(edges[:-1], edges[1:])]
 
     fig = go.Figure()
-    fig.add_trace(go.Bar(x=x_centers, y=counts, marker_color=colors, width=bin_step*0.9,
+    fig.add_trace(go.Bar(x=x_centers, y=counts, marker_color=_AFTER, width=bin_step*0.9,
                          hovertemplate="%{x:.0f} — %{y:,} thí sinh<extra></extra>"))
-
-    # vertical line for user score
-    fig.add_vline(x=user_score, line=dict(color="red", width=2, dash="dash"))
-    # annotation
-    y_annot = counts.max() * 0.85 if len(counts)>0 else 0
-    fig.add_annotation(x=user_score, y=y_annot, text=f"<b>Điểm bạn: {user_score:.2f}</b>",
-                       showarrow=True, arrowhead=2, ax=40, ay=-40, bgcolor="white")
-
     fig.update_layout(title=title, xaxis_title="Tổng điểm", yaxis_title="Số thí sinh",
                       template="plotly_white", bargap=0.02,
                       margin=dict(t=50, b=50, l=40, r=40))
     fig.update_xaxes(tickmode="array", tickvals=x_centers, ticktext=labels)
-    return fig
+    return fig.to_plotly_json()
+
+
+@lru_cache(maxsize=256)
+def _base_json(counts: tuple, edges: tuple, bin_step, title) -> str:
+    spec = copy.deepcopy(_base_spec(counts, edges, bin_step, title))
+    spec["data"][0]["marker"]["color"] = _COLORS_SLOT
+    spec["layout"]["shapes"] = _SHAPES_SLOT
+    spec["layout"]["annotations"] = _ANNOTATIONS_SLOT
+    return pio.to_json(spec, validate=False)
+
+
+def _overlay(counts, edges, user_score: float):
+    """
+    The only score-dependent parts: bar colors, the dashed line, the label.
+    """
+    colors = np.where(np.asarray(edges[1:]) <= user_score, _BEFORE, _AFTER).tolist()
+    shape = dict(type="line", xref="x", yref="y domain", x0=user_score, x1=user_score,
+                 y0=0, y1=1, line=dict(color="red", width=2, dash="dash"))
+    y_annot = float(max(counts)) * 0.85 if len(counts) > 0 else 0
+    annotation = dict(x=user_score, y=y_annot, text=f"<b>Điểm bạn: {user_score:.2f}</b>",
+                      showarrow=True, arrowhead=2, ax=40, ay=-40, bgcolor="white")
+    return colors, [shape], [annotation]
+
+
+def _key(totals_arr, bin_min, bin_max, bin_step, hist):
+    counts, edges = _binned(totals_arr, bin_min, bin_max, bin_step, hist)
+    return tuple(np.asarray(counts).tolist()), tuple(np.asarray(edges).tolist())
+
+
+@timed()
+def histogram_with_score(totals_arr, user_score: float,
+                         bin_min=0, bin_max=30, bin_step=1,
+                         title="Phổ điểm", hist=None):
+    """
+    totals_arr: array of totals or a ScoreHistogram (binned in O(bins)).
+    hist: optional precomputed (counts, edges), e.g. from the block index;
+    totals_arr is not scanned when it is given.
+    The base figure is cached per (counts, edges, step, title); only the
+    user's score line, label and bar colors are added per call.
+    """
+    counts, edges = _key(totals_arr, bin_min, bin_max, bin_step, hist)
+    spec = copy.deepcopy(_base_spec(counts, edges, bin_step, title))
+    colors, shapes, annotations = _overlay(counts, edges, user_score)
+    spec["data"][0]["marker"]["color"] = colors
+    spec["layout"]["shapes"] = shapes
+    spec["layout"]["annotations"] = annotations
+    # spec comes from an already validated figure: skip re-validation
+    return go.Figure(spec, _validate=False)
+
+
+def histogram_json(totals_arr, user_score: float,
+                   bin_min=0, bin_max=30, bin_step=1,
+                   title="Phổ điểm", hist=None) -> str:
+    """
+    Same figure as histogram_with_score, serialized to Plotly JSON: the
+    cached base JSON with the score-dependent parts spliced in.
+    """
+    counts, edges = _key(totals_arr, bin_min, bin_max, bin_step, hist)
+    colors, shapes, annotations = _overlay(counts, edges, user_score)
+    return (_base_json(counts, edges, bin_step, title)
+            .replace(f'"{_COLORS_SLOT}"', json.dumps(colors), 1)
+            .replace(f'"{_SHAPES_SLOT}"', json.dumps(shapes), 1)
+            .replace(f'"{_ANNOTATIONS_SLOT}"', json.dumps(annotations, ensure_ascii=False), 1))
 
 def mini_bar_average(subjects, averages):
     """
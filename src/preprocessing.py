@@ -1,10 +1,10 @@
 from typing import List, Tuple
 
-# Polars có sẵn theo dự án của bạn; nếu muốn phòng hờ thì có thể bọc try/except
-import polars as pl
-import pandas as pd
+# polars / pandas được import trong nhánh backend cần đến (khởi động nhanh hơn;
+# đọc từ cache .npy thì không cần thư viện nào trong hai thư viện này)
+from src.instrumentation import timed
 
-# Danh sách môn (giữ nguyên) + bổ sung N1..N7 để detect sau khi tách
+# Danh sách môn (giữ nguyên); các môn ngoại ngữ có cột riêng sau khi tách
 ALL_SUBJECTS = [
     "Toán","Văn","Lí","Hóa","Sinh","Tin học","Sử","Địa",
     "Giáo dục kinh tế và pháp luật","Công nghệ","Công nghệ nông nghiệp",
@@ -29,65 +29,62 @@ def detect_subjects(columns) -> List[str]:
     cols = [str(c).strip() for c in columns]
     return [s for s in ALL_SUBJECTS if s in cols]
 
-# --- Split cho Pandas: tạo cột N1..N7 từ "Ngoại ngữ" + "Mã môn ngoại ngữ" ---
-def _split_foreign_language_pandas(df: pd.DataFrame) -> pd.DataFrame:
+# --- Split ngoại ngữ: "Ngoại ngữ" + "Mã môn ngoại ngữ" -> một cột điểm cho mỗi
+# môn (Tiếng Anh, Tiếng Nga, ...). Hai backend cho cùng kết quả; nếu file đã có
+# sẵn cột môn đó thì giữ giá trị cũ ở các dòng không khớp mã.
+def _is_polars(df) -> bool:
+    # không import polars chỉ để kiểm tra kiểu
+    return type(df).__module__.split(".")[0] == "polars"
+
+
+def _split_foreign_language_pandas(df: "pd.DataFrame") -> "pd.DataFrame":
+    import pandas as pd
     if "Ngoại ngữ" not in df.columns or "Mã môn ngoại ngữ" not in df.columns:
         return df
-    df = df.copy()
     mmnn = df["Mã môn ngoại ngữ"].astype(str).str.upper().str.strip()
+    score = pd.to_numeric(df["Ngoại ngữ"], errors="coerce")
 
-    # tạo cột N1..N7 (numeric), chỉ nhận điểm từ "Ngoại ngữ" khi đúng mã
-    for code in ["N1","N2","N3","N4","N5","N6","N7"]:
-        if code not in df.columns:
-            df[code] = pd.NA
-        mask = mmnn.eq(code)
-        if mask.any():
-            df.loc[mask, code] = df.loc[mask, "Ngoại ngữ"]
-
-    # ép kiểu số cho 7 cột mới
-    for code in ["N1","N2","N3","N4","N5","N6","N7"]:
-        df[code] = pd.to_numeric(df[code], errors="coerce")
-
-    # tuỳ chọn: thêm cột tên môn ngoại ngữ (text) nếu bạn muốn dùng
-    df["Tên môn ngoại ngữ"] = mmnn.map(FOREIGN_LANGUAGE_CODES)
-
-    return df
+    # mỗi cột là một phép where vector hoá; assign tạo DataFrame mới đúng một lần
+    new_cols = {}
+    for code, subject in FOREIGN_LANGUAGE_CODES.items():
+        old = pd.to_numeric(df[subject], errors="coerce") if subject in df.columns else float("nan")
+        new_cols[subject] = score.where(mmnn.eq(code), old)
+    new_cols["Tên môn ngoại ngữ"] = mmnn.map(FOREIGN_LANGUAGE_CODES)
+    return df.assign(**new_cols)
 
 
-def _split_foreign_language_polars(df: pl.DataFrame) -> pl.DataFrame:
-    mapping = {
-        "N1": "Tiếng Anh",
-        "N2": "Tiếng Nga",
-        "N3": "Tiếng Pháp",
-        "N4": "Tiếng Trung",
-        "N5": "Tiếng Đức",
-        "N6": "Tiếng Nhật",
-        "N7": "Tiếng Hàn"
-    }
-
-    # Thêm cột tên môn ngoại ngữ
-    df = df.with_columns(
-        pl.col("Mã môn ngoại ngữ").map_elements(lambda x: mapping.get(x, None), return_dtype=pl.String).alias("Tên môn ngoại ngữ")
+def _split_foreign_language_polars(df: "pl.DataFrame") -> "pl.DataFrame":
+    import polars as pl
+    if "Ngoại ngữ" not in df.columns or "Mã môn ngoại ngữ" not in df.columns:
+        return df
+    mmnn = pl.col("_mmnn")
+    score = pl.col("Ngoại ngữ")
+
+    # một truy vấn lazy: chuẩn hoá mã 1 lần, rồi tên môn (replace_strict, không
+    # lambda) + 7 cột điểm trong cùng một with_columns
+    exprs = [mmnn.replace_strict(FOREIGN_LANGUAGE_CODES, default=None, return_dtype=pl.String)
+                 .alias("Tên môn ngoại ngữ")]
+    for code, subject in FOREIGN_LANGUAGE_CODES.items():
+        old = pl.col(subject) if subject in df.columns else pl.lit(None)
+        exprs.append(pl.when(mmnn == code).then(score).otherwise(old).alias(subject))
+    return (
+        df.lazy()
+        .with_columns(pl.col("Mã môn ngoại ngữ").cast(pl.String).str.strip_chars()
+                      .str.to_uppercase().alias("_mmnn"))
+        .with_columns(exprs)
+        .drop("_mmnn")
+        .collect()
     )
 
-    # Tạo các cột điểm theo môn ngoại ngữ
-    for code, subject in mapping.items():
-        df = df.with_columns(
-            pl.when(pl.col("Mã môn ngoại ngữ") == code)
-              .then(pl.col("Ngoại ngữ"))
-              .otherwise(None)
-              .alias(subject)
-        )
-
-    return df
-
 
+@timed()
 def preprocess(df, backend: str) -> Tuple[object, List[str], str]:
     """
-    Chuẩn hoá tên cột, tách N1..N7, ép kiểu số cho các cột môn.
+    Chuẩn hoá tên cột, tách ngoại ngữ N1..N7 thành cột theo môn, ép kiểu số cho các cột môn.
     Trả về: (df_processed, subjects, backend)
     """
     if backend == "polars":
+        import polars as pl
         assert isinstance(df, pl.DataFrame)
         # chuẩn hoá tên cột
         df = df.rename({c: str(c).strip() for c in df.columns})
@@ -97,9 +94,11 @@ def preprocess(df, backend: str) -> Tuple[object, List[str], str]:
         # detect môn sau khi đã có N1..N7
         subjects = detect_subjects(df.columns)
 
-        # ép float cho tất cả cột môn tìm được (nếu tồn tại)
-        for c in subjects:
-            if c in df.columns:
+        # ép float cho tất cả cột môn tìm được, trong một with_columns
+        try:
+            df = df.with_columns([pl.col(c).cast(pl.Float64, strict=False) for c in subjects])
+        except Exception:
+            for c in subjects:
                 try:
                     df = df.with_columns(pl.col(c).cast(pl.Float64, strict=False).alias(c))
                 except Exception:
@@ -108,9 +107,9 @@ def preprocess(df, backend: str) -> Tuple[object, List[str], str]:
         return df, subjects, "polars"
 
     else:
+        import pandas as pd
         assert isinstance(df, pd.DataFrame)
-        df = df.copy()
-        df.columns = [str(c).strip() for c in df.columns]
+        df = df.rename(columns=lambda c: str(c).strip())
         df = _split_foreign_language_pandas(df)
 
         subjects = detect_subjects(df.columns)
@@ -126,23 +125,35 @@ def filter_candidates(df, subjects):
     """
     if not subjects:
         # trả bản sao để tránh side-effect
-        try:
-            if isinstance(df, pl.DataFrame):
-                return df.clone()
-        except Exception:
-            pass
+        if _is_polars(df):
+            return df.clone()
         return df.copy()
 
     # Polars
     try:
-        if isinstance(df, pl.DataFrame):
+        if _is_polars(df):
             return df.drop_nulls(subset=subjects)
     except Exception:
         pass
 
     # Pandas
-    if isinstance(df, pd.DataFrame):
+    if hasattr(df, "dropna"):
         return df.dropna(subset=subjects).copy()
 
     # fallback
     return df
+
+def count_candidates(df, subjects) -> int:
+    """
+    Số thí sinh có đủ điểm cho toàn bộ 'subjects' (= len(filter_candidates(...)))
+    mà không tạo DataFrame đã lọc.
+    """
+    if _is_polars(df):
+        import polars as pl
+        if not subjects:
+            return df.height
+        expr = pl.all_horizontal([pl.col(s).is_not_null() for s in subjects]).sum()
+        return int(df.lazy().select(expr).collect().item())
+    if not subjects:
+        return len(df)
+    return int(df[subjects].notna().all(axis=1).sum())
@@ -0,0 +1,180 @@
+# src/recommend.py
+"""
+"Best blocks" for a candidate: which blocks (tổ hợp) of BLOCKS give the
+best national percentile for their subject scores.
+
+Every block total is a multiple of 0.01, so the national distribution of
+block j turns into a lookup row pct[j, k] = percentile of total k / 100
+(same formula as ScoreHistogram.percentiles). For a chunk of candidates
+all block totals come from one matmul (block_totals_matrix), the
+percentiles from one gather pct[j, total], and the top k per candidate
+from one argpartition: no per-block scan, no sort of the national data.
+argpartition runs on integer keys (dense rank of the percentile, then
+block position), unique in a row, so blocks tied at the k-th place are
+taken in block order like a stable sort would. Blocks where a candidate
+misses a subject are not eligible.
+
+    python -m src.recommend candidates.csv out.csv -k 3 --data data/diem_2018.csv
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from src.block_matrix import CHUNK_ROWS, block_totals_matrix
+from src.blocks import BLOCKS
+from src.instrumentation import timed
+
+
+class BlockRecommender:
+    """
+    Percentile lookup table of the blocks of `block_index` that are in
+    `blocks` (single subjects are left out unless `include_subjects`).
+    """
+    def __init__(self, block_index: dict, blocks=BLOCKS, include_subjects: bool = False):
+        self.codes = [code for code, st in block_index.items()
+                      if (code in blocks or include_subjects) and st.count > 0]
+        self.wanted = {code: block_index[code].subjects for code in self.codes}
+        self.stats = {code: block_index[code] for code in self.codes}
+        width = max((block_index[c].hist.size for c in self.codes), default=1)
+        self.pct = np.zeros((len(self.codes), width))
+        for j, code in enumerate(self.codes):
+            h = block_index[code].hist
+            counts = h.counts.astype(np.float64)
+            below = np.cumsum(counts) - counts
+            self.pct[j, :h.size] = (below + 0.5 * counts) / h.n * 100.0
+            self.pct[j, h.size:] = 100.0
+        # top_k key of (block, total): ascending = percentile desc, then block
+        # order; equal percentiles share a dense rank, so keys only tie within a block
+        _, rank = np.unique(self.pct, return_inverse=True)
+        rank = rank.reshape(self.pct.shape).astype(np.int64)
+        key = (rank.max(initial=0) - rank) * len(self.codes) + np.arange(len(self.codes))[:, None]
+        self.key = key.astype(np.int32 if key.max(initial=0) < 2**31 - 1 else np.int64)
+
+    def _usable(self, columns: dict) -> list:
+        return [j for j, code in enumerate(self.codes)
+                if all(s in columns for s in self.wanted[code])]
+
+    def _chunk(self, columns: dict, usable: list, start: int, stop: int) -> tuple:
+        # ([rows x usable] positions in the flattened pct[usable] / key[usable], eligible)
+        blocks = {self.codes[j]: self.wanted[self.codes[j]] for j in usable}
+        totals, valid = block_totals_matrix(columns, blocks, start, stop)
+        width = self.pct.shape[1]
+        np.clip(totals, 0, width - 1, out=totals)
+        totals += np.arange(len(usable), dtype=np.int32) * width
+        return totals, valid
+
+    def percentiles(self, columns: dict, start: int = 0, stop: int = None) -> np.ndarray:
+        """
+        [rows x blocks] national percentile of every row in every block
+        (column order = self.codes), NaN where the block is not eligible.
+        Blocks with a subject missing from `columns` are NaN for all rows.
+        """
+        n = len(next(iter(columns.values()), ()))
+        stop = n if stop is None else min(stop, n)
+        out = np.full((stop - start, len(self.codes)), np.nan)
+        usable = self._usable(columns)
+        if usable:
+            at, valid = self._chunk(columns, usable, start, stop)
+            pct = self.pct[usable].ravel()[at]
+            pct[~valid] = np.nan
+            out[:, usable] = pct
+        return out
+
+    @timed("recommend.top_k")
+    def top_k(self, columns: dict, k: int = 3, chunk_rows: int = CHUNK_ROWS):
+        """
+        (codes [rows x k] as indices into self.codes, -1 when fewer than k
+        eligible blocks; percentiles [rows x k], best first, NaN when -1).
+        Ties keep the order of self.codes.
+        """
+        n = len(next(iter(columns.values()), ()))
+        usable = self._usable(columns)
+        k = min(k, len(usable))
+        best = np.full((n, k), -1, dtype=np.int64)
+        best_pct = np.full((n, k), np.nan)
+        if k <= 0:
+            return best, best_pct
+        codes = np.array(usable)
+        pct, keys = self.pct[usable].ravel(), self.key[usable].ravel()
+        for lo in range(0, n, chunk_rows):
+            hi = min(lo + chunk_rows, n)
+            at, valid = self._chunk(columns, usable, lo, hi)
+            key = keys[at]
+            key[~valid] = np.iinfo(key.dtype).max  # not eligible sorts last
+            part = (np.argpartition(key, k - 1, axis=1)[:, :k] if k < key.shape[1]
+                    else np.broadcast_to(np.arange(k), key.shape))
+            order = np.argsort(np.take_along_axis(key, part, axis=1), axis=1)
+            part = np.take_along_axis(part, order, axis=1)
+            ok = np.take_along_axis(valid, part, axis=1)
+            best[lo:hi] = np.where(ok, codes[part], -1)
+            best_pct[lo:hi] = np.where(ok, pct[np.take_along_axis(at, part, axis=1)], np.nan)
+        return best, best_pct
+
+    def recommend(self, scores: dict, k: int = 3) -> list:
+        """
+        Top-k blocks of one candidate ({subject: score}, None/NaN = not
+        taken): list of {block, subjects, total, percentile, top_pct, rank}.
+        """
+        columns = {s: np.array([np.nan if v is None else v], dtype=np.float64)
+                   for s, v in scores.items()}
+        if not columns:
+            return []
+        best, best_pct = self.top_k(columns, k)
+        out = []
+        for j, pct in zip(best[0], best_pct[0]):
+            if j < 0:
+                break
+            code = self.codes[j]
+            total = round(sum(float(columns[s][0]) for s in self.wanted[code]), 2)
+            out.append({"block": code, "subjects": self.wanted[code], "total": total,
+                        "percentile": float(pct), "top_pct": round(100.0 - float(pct), 2),
+                        "rank": self.stats[code].query.rank(total)})
+        return out
+
+
+def recommend_csv(recommender: BlockRecommender, in_path: str, out_path: str, k: int = 3,
+                  chunksize: int = 100_000, decimals: int = 2) -> int:
+    """
+    Stream a result-style CSV (SBD + subject columns) -> `out_path` with
+    SBD (when present) and best_<i> / pct_<i> columns. Returns the rows written.
+    """
+    import pandas as pd
+    from src.block_index import ID_COLUMN, subject_columns
+    from src.preprocessing import preprocess
+
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(in_path, chunksize=chunksize)):
+        df, subjects, backend = preprocess(chunk, "pandas")
+        best, best_pct = recommender.top_k(subject_columns(df, subjects, backend), k)
+        codes = np.array(recommender.codes + [""], dtype=object)
+        out = pd.DataFrame(index=df.index)
+        if ID_COLUMN in df.columns:
+            out[ID_COLUMN] = df[ID_COLUMN]
+        for r in range(best.shape[1]):
+            out[f"best_{r + 1}"] = codes[best[:, r]]
+            out[f"pct_{r + 1}"] = best_pct[:, r].round(decimals)
+        out.to_csv(out_path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        rows += len(out)
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gợi ý k khối có percentile toàn quốc cao nhất")
+    ap.add_argument("input", help="CSV cùng định dạng file điểm (SBD + các môn)")
+    ap.add_argument("output")
+    ap.add_argument("-k", type=int, default=3)
+    ap.add_argument("--data", default="data/diem_2018.csv", help="dữ liệu điểm toàn quốc")
+    ap.add_argument("--chunksize", type=int, default=100_000)
+    args = ap.parse_args(argv)
+
+    from src.block_index import build_block_index
+    from src.cache import load_subject_columns
+    _, columns = load_subject_columns(args.data, compact=True)
+    recommender = BlockRecommender(build_block_index(columns))
+    n = recommend_csv(recommender, args.input, args.output, args.k, args.chunksize)
+    print(f"{n:,} rows -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
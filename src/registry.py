@@ -0,0 +1,360 @@
+# src/registry.py
+"""
+Registry of several score datasets (e.g. one result file per exam year).
+
+Each registered file is prepared once into the memory-mapped column store
+(src/cache.py), so every process maps the same pages instead of holding
+its own copy. A dataset (mapped columns + block index + conversion
+service) is loaded lazily on first use and kept in an LRU; when the
+loaded datasets exceed the memory budget the least recently used ones are
+dropped (their files stay on disk, reloading is a remap + index build).
+
+Correction batches (phúc khảo, regional releases) are registered with
+add_update: applied by delta to a loaded dataset (src/incremental.py: the
+block and scheme counts, and the built province matrices) and re-applied
+after every reload. They need the rows, so they are refused in
+streaming mode.
+
+Weighted scoring schemes (src/schemes.py) are added to the block index as
+extra entries, so every query and conversion works on them too.
+
+Each dataset with an SBD column also gets a SegmentIndex (src/segments.py):
+rows grouped by province for rank / percentile within a province.
+
+A registered path may also be a precomputed statistics bundle
+(src/bundle.py): the block index is read from it, no candidate rows, so
+no province index and no update batches.
+
+Cross-year conversion goes through convert_score_via_percentile on the
+two datasets' percentile tables, exactly like block -> block conversion
+within one year.
+
+    reg = DatasetRegistry(parse_datasets("2018=data/diem_2018.csv,2019=data/diem_2019.csv"))
+    reg.convert("2018", "A00", "2019", "A00", 21.5)
+
+    python -m src.registry 2018=data/diem_2018.csv 2019=data/diem_2019.csv   # prepare stores
+"""
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from src.blocks import BLOCKS
+from src.block_index import build_block_index, index_blocks
+from src.bundle import is_bundle, load_bundle
+from src.cache import CACHE_DIR, load_candidate_ids, load_subject_columns
+from src.compact import columns_nbytes
+from src.conversion import ConversionService, convert_score_via_percentile
+from src.data_loader import dataset_version
+from src.incremental import IncrementalIndex, read_updates
+from src.instrumentation import timed
+from src.recommend import BlockRecommender
+from src.schemes import build_scheme_index
+from src.segments import SegmentIndex
+
+# "2018=data/diem_2018.csv,2019=data/diem_2019.csv"; mặc định một năm như trước
+DATASETS = os.environ.get("THPT_DATASETS", "2018=data/diem_2018.csv")
+# tổng bộ nhớ cho các bộ dữ liệu đang mở (MB); 0 = không giới hạn
+MEMORY_BUDGET = int(os.environ.get("THPT_MEMORY_BUDGET_MB", "0")) * 2**20
+
+
+def parse_datasets(spec: str) -> dict:
+    """
+    "name=path,name=path" -> {name: path}; a bare path is named by its file stem.
+    """
+    out = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, sep, path = item.partition("=")
+        if not sep:
+            name, path = os.path.splitext(os.path.basename(item))[0], item
+        out[name.strip()] = path.strip()
+    return out
+
+
+@dataclass
+class LoadedDataset:
+    name: str
+    path: str
+    version: tuple
+    subjects: list
+    columns: dict  # memory-mapped store; None when built by streaming
+    block_index: dict
+    conversion: ConversionService
+    incremental: IncrementalIndex = None  # created by the first update batch
+    segments: SegmentIndex = None  # None without SBD column or when streaming (plain blocks only)
+    recommender: BlockRecommender = None
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Mapped column bytes + histogram bytes + segment matrices (what the
+        budget is charged).
+        """
+        cols = columns_nbytes(self.columns) if self.columns else 0
+        segs = self.segments.nbytes if self.segments is not None else 0
+        return cols + segs + sum(st.hist.nbytes for st in self.block_index.values())
+
+
+class DatasetRegistry:
+    """
+    name -> data file, loaded on demand with LRU eviction under
+    `memory_budget` bytes (0 = unlimited). Thread-safe; concurrent requests
+    for the same dataset share one load.
+    """
+    def __init__(self, datasets: dict = None, memory_budget: int = MEMORY_BUDGET,
+                 cache_dir: str = CACHE_DIR, compact: bool = True, streaming: bool = False,
+                 blocks=BLOCKS, min_count: int = 1, workers: int = 1, schemes=()):
+        self.memory_budget = memory_budget
+        self.cache_dir = cache_dir
+        self.compact = compact
+        self.streaming = streaming
+        self.blocks = blocks
+        self.min_count = min_count
+        self.workers = workers
+        self.schemes = tuple(schemes)
+        self._paths = {}
+        self._loaded = OrderedDict()
+        self._pending = {}
+        self._updates = {}
+        self._lock = threading.RLock()
+        self._update_lock = threading.Lock()
+        self._executor = None
+        for name, path in (datasets or {}).items():
+            self.register(name, path)
+
+    # --- registration ---
+    def register(self, name: str, path: str):
+        with self._lock:
+            self._paths[name] = path
+            self._updates.pop(name, None)
+            self._loaded.pop(name, None)  # re-registering replaces the file
+
+    def names(self) -> list:
+        with self._lock:
+            return list(self._paths)
+
+    def path(self, name: str) -> str:
+        with self._lock:
+            if name not in self._paths:
+                raise KeyError(f"unknown dataset: {name}")
+            return self._paths[name]
+
+    def prepare(self, names=None):
+        """
+        Write the memory-mapped store of each dataset now (no-op when fresh),
+        without building its index.
+        """
+        for name in names or self.names():
+            if is_bundle(self.path(name)):
+                continue  # nothing to compile
+            load_subject_columns(self.path(name), self.cache_dir, compact=self.compact)
+
+    # --- loading ---
+    @timed("registry.load")
+    def _build(self, name: str, path: str, version) -> LoadedDataset:
+        if is_bundle(path):
+            index = load_bundle(path).block_index(self.min_count)
+            return LoadedDataset(name=name, path=path, version=version,
+                                 subjects=[c for c, st in index.items() if st.subjects == [c]],
+                                 columns=None, block_index=index,
+                                 conversion=ConversionService(index),
+                                 recommender=BlockRecommender(index, self.blocks))
+        if self.streaming:
+            from src.streaming import stream_block_index  # pandas chunk reader
+            subjects, index = stream_block_index(path, self.blocks, min_count=self.min_count)
+            columns = None
+        else:
+            subjects, columns = load_subject_columns(path, self.cache_dir, compact=self.compact)
+            index = build_block_index(columns, self.blocks, min_count=self.min_count,
+                                      workers=self.workers)
+            index.update(build_scheme_index(columns, self.schemes, self.min_count))
+        ds = LoadedDataset(name=name, path=path, version=version, subjects=subjects,
+                           columns=columns, block_index=index,
+                           conversion=ConversionService(index),
+                           recommender=BlockRecommender(index, self.blocks))
+        if columns is not None:
+            ids = load_candidate_ids(path, self.cache_dir, compact=self.compact)
+            if ids is not None:
+                ds.segments = self._segment_index(ds, ids)
+        return ds
+
+    def _updated(self, ds: LoadedDataset, paths) -> tuple:
+        """
+        (new LoadedDataset with `paths` applied by delta, upsert summaries).
+        `ds` itself is left as is, so sessions reading it never see a mix of
+        old and new fields; the caller swaps the new one in.
+        """
+        inc = ds.incremental
+        if inc is None:
+            inc = IncrementalIndex.from_cache(ds.path, self.blocks, self.min_count, self.schemes,
+                                              cache_dir=self.cache_dir, compact=self.compact)
+        results = [inc.apply_file(p) for p in paths]
+        columns = dict(inc.columns)  # snapshot: later batches replace entries of inc.columns
+        index = dict(inc.block_index)  # blocks and schemes, both updated by delta
+        new = replace(ds, columns=columns, block_index=index, conversion=ConversionService(index),
+                      incremental=inc, recommender=BlockRecommender(index, self.blocks))
+        if ds.segments is None:
+            new.segments = self._segment_index(new, inc.ids)
+        else:
+            # ds.segments is over the rows before the batches: carried over by delta
+            rows = np.concatenate([r["rows"] for r in results])
+            new.segments = ds.segments.updated(inc.ids, columns, rows, self._segment_wanted(new))
+        return new, results
+
+    def _segment_wanted(self, ds: LoadedDataset) -> dict:
+        return {code: subs for code, subs in index_blocks(ds.subjects, self.blocks).items()
+                if code in ds.block_index}
+
+    def _segment_index(self, ds: LoadedDataset, ids) -> SegmentIndex:
+        return SegmentIndex(ids, ds.columns, self._segment_wanted(ds))
+
+    def add_update(self, name: str, path: str):
+        """
+        Register an update file (rows replaced / appended by SBD) for dataset
+        `name`. Applied by delta now when the dataset is loaded (returns the
+        upsert summary), and after every later reload; a load in flight
+        picks it up before it is published.
+        """
+        if is_bundle(self.path(name)):
+            raise ValueError(f"{name}: a statistics bundle cannot take update batches")
+        if self.streaming:
+            # the delta needs every row in memory, which streaming mode avoids
+            raise ValueError(f"{name}: update batches need the column store (streaming=False)")
+        # one batch at a time (they share ds.incremental); the registry lock
+        # is only held to register the path and to swap the result in
+        # a batch that cannot be read is refused here: once registered it is
+        # replayed by every later load, so it would make them all fail
+        read_updates(path)
+        with self._update_lock:
+            with self._lock:
+                self._updates.setdefault(name, []).append(path)
+                ds = self._loaded.get(name)
+            if ds is None:
+                return None
+            try:
+                new, results = self._updated(ds, [path])
+            except Exception:
+                self._drop_update(name, path)
+                raise
+            with self._lock:
+                if self._loaded.get(name) is ds:  # not reloaded / evicted meanwhile
+                    self._loaded[name] = new
+                    self._evict_to_budget(keep=name)
+            return results[0]
+
+    def _drop_update(self, name: str, path: str):
+        with self._lock:
+            paths = self._updates.get(name, [])
+            if path in paths:
+                paths.remove(path)
+
+    def _load(self, name: str, path: str, version) -> LoadedDataset:
+        try:
+            ds = self._build(name, path, version)
+            applied = []
+            while True:
+                # batches registered while building are applied before publishing
+                with self._lock:
+                    late = [p for p in self._updates.get(name, []) if p not in applied]
+                    if not late:
+                        if self._paths.get(name) == path:  # not re-registered meanwhile
+                            self._loaded[name] = ds
+                            self._loaded.move_to_end(name)
+                            self._evict_to_budget(keep=name)
+                        return ds
+                for update in late:
+                    try:
+                        ds, _ = self._updated(ds, [update])
+                    except Exception:
+                        # a batch that does not fit the dataset (registered while it
+                        # was not loaded) is dropped, so only this load fails
+                        self._drop_update(name, update)
+                        raise
+                    applied.append(update)
+        finally:
+            with self._lock:
+                self._pending.pop((name, version), None)
+
+    def load_async(self, name: str) -> Future:
+        """
+        Future of the LoadedDataset: already done when it is loaded and its
+        file unchanged, otherwise loaded in a background thread (one load
+        per dataset version, errors are retried on the next call).
+        """
+        path = self.path(name)
+        version = dataset_version(path)
+        with self._lock:
+            ds = self._loaded.get(name)
+            if ds is not None and ds.version == version:
+                self._loaded.move_to_end(name)
+                done = Future()
+                done.set_result(ds)
+                return done
+            future = self._pending.get((name, version))
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thpt-registry")
+                future = self._executor.submit(self._load, name, path, version)
+                self._pending[(name, version)] = future
+            return future
+
+    def get(self, name: str) -> LoadedDataset:
+        return self.load_async(name).result()
+
+    # --- memory ---
+    def loaded(self) -> list:
+        """
+        Names of the loaded datasets, least recently used first.
+        """
+        with self._lock:
+            return list(self._loaded)
+
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(ds.nbytes for ds in self._loaded.values())
+
+    def evict(self, name: str):
+        with self._lock:
+            self._loaded.pop(name, None)
+
+    def _evict_to_budget(self, keep: str):
+        if self.memory_budget <= 0:
+            return
+        while self.memory_usage() > self.memory_budget:
+            victim = next((n for n in self._loaded if n != keep), None)
+            if victim is None:
+                break  # a single dataset larger than the budget stays loaded
+            del self._loaded[victim]
+
+    # --- cross-dataset queries ---
+    def convert(self, src_name: str, src_block: str, dst_name: str, dst_block: str,
+                score: float) -> float:
+        """
+        Score in (src_name, src_block) -> equivalent score in (dst_name, dst_block)
+        via convert_score_via_percentile; NaN when either block is empty.
+        """
+        src, dst = self.get(src_name), self.get(dst_name)
+        for ds, code in ((src, src_block), (dst, dst_block)):
+            if code not in ds.block_index:
+                raise KeyError(f"unknown block in {ds.name}: {code}")
+            if ds.block_index[code].count == 0:
+                return math.nan
+        if src is dst:
+            return score if src_block == dst_block else src.conversion.convert(src_block, dst_block, score)
+        return convert_score_via_percentile(src.conversion.percentile_table(src_block),
+                                            dst.conversion.percentile_table(dst_block), score)
+
+
+if __name__ == "__main__":
+    specs = parse_datasets(",".join(sys.argv[1:]) or DATASETS)
+    reg = DatasetRegistry(specs)
+    for name in reg.names():
+        reg.prepare([name])
+        ds = reg.get(name)
+        print(f"{name}: {reg.path(name)} -> {len(ds.block_index)} blocks, "
+              f"{ds.nbytes / 2**20:.1f} MiB mapped")
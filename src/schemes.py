@@ -0,0 +1,184 @@
+# src/schemes.py
+"""
+Weighted scoring schemes (điểm xét tuyển) on top of BLOCKS.
+
+A scheme is declared as data: a base block, the subjects counted with a
+weight (môn nhân hệ số) and optionally the scale the weighted sum is
+brought back to, e.g. Toán x2 scaled to 30, or kept on 40. It compiles to
+one column of effective weights, so every scheme is evaluated in a single
+batched pass of src/block_matrix.py over the same subject matrix as the
+plain blocks. Weighted totals are rounded to 0.01, so each scheme gets an
+exact ScoreHistogram and a BlockStats entry in the block index: percentile,
+rank, thresholds and ConversionService work on it exactly like on a
+plain block.
+
+Priority / region bonus points (điểm ưu tiên) belong to the candidate and
+are not in the result files: apply_bonus adds them to a candidate's own
+total, reduced above 22.5 / 30 as in the admission rules.
+
+    THPT_SCHEMES=schemes.json
+    [{"name": "A00 Toán×2 (30)", "block": "A00", "weights": {"Toán": 2}, "scale": 30}]
+"""
+import json
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.block_index import BlockStats
+from src.block_matrix import block_hundredth_counts
+from src.blocks import BLOCKS
+from src.compact import SCALE
+from src.histogram import ScoreHistogram
+from src.instrumentation import timed
+
+# file JSON khai báo các cách tính điểm; trống = DEFAULT_SCHEMES
+SCHEMES_PATH = os.environ.get("THPT_SCHEMES", "")
+
+PRIORITY_FROM = 22.5  # điểm ưu tiên giảm dần khi tổng (thang 30) từ 22,5 trở lên
+
+
+def _is_number(x) -> bool:
+    return isinstance(x, (int, float)) and not isinstance(x, bool) and math.isfinite(x)
+
+
+@dataclass(frozen=True)
+class ScoringScheme:
+    name: str
+    block: str
+    weights: tuple = ()  # ((subject, weight), ...); unlisted subjects weigh 1
+    scale: float = 0     # max of the final total; 0 = 10 x sum of weights
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ScoringScheme":
+        name = str(d.get("name", "?"))
+        for key in ("name", "block"):
+            if key not in d:
+                raise ValueError(f"{name}: missing {key!r}")
+        weights = d.get("weights") or {}
+        if not isinstance(weights, dict):
+            raise ValueError(f"{name}: weights must be an object {{subject: weight}}")
+        for s, w in [*weights.items(), ("scale", d.get("scale") or 0)]:
+            if not _is_number(w):
+                raise ValueError(f"{name}: {s} must be a number, got {w!r}")
+        scheme = cls(name=name, block=str(d["block"]),
+                     weights=tuple(sorted((s, float(w)) for s, w in weights.items())),
+                     scale=float(d.get("scale") or 0))
+        scheme.validate()
+        return scheme
+
+    def validate(self):
+        if self.block not in BLOCKS:
+            raise ValueError(f"{self.name}: unknown block {self.block}")
+        for s, w in self.weights:
+            if s not in BLOCKS[self.block]:
+                raise ValueError(f"{self.name}: {s} is not a subject of {self.block}")
+            if not (_is_number(w) and w > 0):
+                raise ValueError(f"{self.name}: weight of {s} must be a positive number")
+        if not (_is_number(self.scale) and self.scale >= 0):
+            raise ValueError(f"{self.name}: scale must be a non-negative number (0 = sum of weights)")
+
+    @property
+    def subjects(self) -> list:
+        return list(BLOCKS[self.block])
+
+    @property
+    def max_score(self) -> float:
+        w = dict(self.weights)
+        return self.scale or 10.0 * sum(w.get(s, 1.0) for s in self.subjects)
+
+    def effective_weights(self) -> dict:
+        """
+        {subject: weight} including the rescaling to `scale`.
+        """
+        w = dict(self.weights)
+        raw = 10.0 * sum(w.get(s, 1.0) for s in self.subjects)
+        return {s: w.get(s, 1.0) * self.max_score / raw for s in self.subjects}
+
+    def total(self, scores: dict) -> float:
+        """
+        Weighted total of one candidate ({subject: score}), rounded to 0.01;
+        NaN when a subject is missing.
+        """
+        values = [scores.get(s) for s in self.subjects]
+        if any(v is None or math.isnan(v) for v in values):
+            return math.nan
+        # same arithmetic as the batched pass: hundredths, weighted, rounded
+        w = self.effective_weights()
+        hund = sum(w[s] * round(v * SCALE) for s, v in zip(self.subjects, values))
+        return float(np.rint(hund)) / SCALE
+
+
+DEFAULT_SCHEMES = (
+    ScoringScheme("A00 Toán×2 (30)", "A00", (("Toán", 2),), 30),
+    ScoringScheme("A01 Toán×2 (40)", "A01", (("Toán", 2),)),
+    ScoringScheme("D01 Toán×2 (40)", "D01", (("Toán", 2),)),
+    ScoringScheme("D01 Anh×2 (40)", "D01", (("Tiếng Anh", 2),)),
+)
+
+
+def load_schemes(path: str = SCHEMES_PATH) -> tuple:
+    """
+    Schemes declared in a JSON file (list of {name, block, weights, scale}),
+    DEFAULT_SCHEMES when `path` is empty.
+    """
+    if not path:
+        return DEFAULT_SCHEMES
+    with open(path, encoding="utf-8") as f:
+        schemes = tuple(ScoringScheme.from_dict(d) for d in json.load(f))
+    names = [s.name for s in schemes]
+    if len(set(names)) != len(names):
+        raise ValueError(f"{path}: duplicate scheme names")
+    return schemes
+
+
+def compile_schemes(schemes, subjects) -> tuple:
+    """
+    (blocks {name: subjects}, weights {name: {subject: weight}}) of the
+    schemes whose subjects all exist in `subjects`, for src/block_matrix.py.
+    """
+    usable = [s for s in schemes if all(x in subjects for x in s.subjects)]
+    return ({s.name: s.subjects for s in usable},
+            {s.name: s.effective_weights() for s in usable})
+
+
+@timed()
+def build_scheme_index(columns: dict, schemes, min_count=1) -> dict:
+    """
+    {name: BlockStats} of the weighted totals of every usable scheme, in one
+    batched pass; merged into a block index next to the plain blocks.
+    """
+    blocks, weights = compile_schemes(schemes, list(columns))
+    if not blocks:
+        return {}
+    counts = block_hundredth_counts(columns, blocks, weights=weights)
+    index = {}
+    for scheme, row in zip((s for s in schemes if s.name in blocks), counts):
+        stats = build_scheme_stats_counts(scheme, row)
+        if stats.count >= min_count:
+            index[scheme.name] = stats
+    return index
+
+
+def build_scheme_stats_counts(scheme: ScoringScheme, counts: np.ndarray) -> BlockStats:
+    """
+    BlockStats of a scheme from its row of block_hundredth_counts.
+    """
+    top = round(scheme.max_score * SCALE)
+    hist = ScoreHistogram(np.pad(counts[:top + 1], (0, max(0, top + 1 - len(counts)))))
+    return BlockStats(code=scheme.name, subjects=scheme.subjects, hist=hist,
+                      max_score=math.ceil(scheme.max_score))
+
+
+def apply_bonus(total: float, bonus: float, max_score: float = 30) -> float:
+    """
+    Total + priority points (`bonus` on the 30 scale, rescaled to
+    `max_score`); from 22.5 / 30 the bonus shrinks linearly to 0 at 30:
+    bonus x (30 - total) / 7.5 on the 30 scale.
+    """
+    if bonus <= 0 or math.isnan(total):
+        return total
+    t30 = total * 30.0 / max_score
+    b30 = bonus if t30 < PRIORITY_FROM else max(0.0, bonus * (30.0 - t30) / (30.0 - PRIORITY_FROM))
+    return round(total + b30 * max_score / 30.0, 2)
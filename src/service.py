@@ -0,0 +1,257 @@
+# src/service.py
+"""
+Headless HTTP/JSON lookup service (plain ASGI, no web framework needed).
+
+    GET /blocks
+    GET /percentile?block=A00&score=21.5
+    GET /rank?block=A00&score=21.5
+    GET /thresholds?block=A00
+    GET /convert?src=A00&dst=D01&score=21.5      (dst may repeat)
+    GET /figure?block=A00&score=21.5             Plotly JSON of the score histogram
+    GET /segments?block=A00&score=21.5           percentile / rank in every province
+                                                 (segment=NN for one province)
+    GET /recommend?Toán=8.5&Lí=7&Hóa=9&k=3       best blocks for subject scores
+    GET /metrics       per-stage latency summaries (Prometheus text format;
+                       needs THPT_INSTRUMENT=1, see src/instrumentation.py)
+
+Every answer comes from the in-memory block index (searchsorted queries)
+and the LRU-cached ConversionService, so a request never touches the
+candidate data. Run with any ASGI server, e.g.
+
+    THPT_DATA_PATH=data/diem_2018.csv uvicorn src.service:app --workers 4
+
+Each worker memory-maps the same columnar cache (src/cache.py), so the
+index is built from shared pages instead of re-parsing the CSV.
+THPT_DATA_PATH may also point to a statistics bundle (src/bundle.py).
+"""
+import json
+import math
+import os
+from urllib.parse import parse_qs
+
+from src.block_index import build_block_index
+from src.bundle import is_bundle, load_bundle
+from src.cache import load_candidate_ids, load_subject_columns
+from src.conversion import ConversionService
+from src.recommend import BlockRecommender
+from src.schemes import build_scheme_index, load_schemes
+from src.segments import SegmentIndex
+from src import instrumentation
+
+DATA_PATH = os.environ.get("THPT_DATA_PATH", "data/diem_2018.csv")
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class LookupService:
+    """
+    Request handlers over a block index; transport-agnostic (dict in, dict out).
+    """
+    def __init__(self, block_index: dict, segments: SegmentIndex = None):
+        self.block_index = block_index
+        self.segments = segments
+        self.conversion = ConversionService(block_index)
+        self.recommender = BlockRecommender(block_index)
+        self.routes = {
+            "/blocks": self.blocks,
+            "/percentile": self.percentile,
+            "/rank": self.rank,
+            "/thresholds": self.thresholds,
+            "/convert": self.convert,
+            "/figure": self.figure,
+            "/segments": self.segment_table,
+            "/recommend": self.recommend,
+            "/health": lambda params: {"status": "ok", "blocks": len(self.block_index)},
+            "/metrics": lambda params: instrumentation.prometheus_text(),
+        }
+
+    @staticmethod
+    def _param(params, name):
+        values = params.get(name)
+        if not values:
+            raise HTTPError(400, f"missing parameter: {name}")
+        return values[0]
+
+    def _block(self, params, name="block"):
+        code = self._param(params, name)
+        if code not in self.block_index:
+            raise HTTPError(404, f"unknown block: {code}")
+        return self.block_index[code]
+
+    def _score(self, params):
+        try:
+            score = float(self._param(params, "score"))
+        except ValueError:
+            raise HTTPError(400, "score must be a number")
+        if not math.isfinite(score):
+            raise HTTPError(400, "score must be a number")
+        return score
+
+    def handle(self, path: str, params: dict):
+        """
+        Dict (sent as JSON), bytes (JSON already encoded) or str (sent as
+        text/plain) for one request.
+        """
+        handler = self.routes.get(path)
+        if handler is None:
+            raise HTTPError(404, f"not found: {path}")
+        with instrumentation.stage(f"service{path}"):
+            return handler(params)
+
+    def blocks(self, params):
+        return {"blocks": [{"code": code, "subjects": st.subjects, "count": st.count,
+                            "max_score": st.max_score}
+                           for code, st in self.block_index.items()]}
+
+    def percentile(self, params):
+        stats, score = self._block(params), self._score(params)
+        pct = stats.query.percentile(score)
+        return {"block": stats.code, "score": score, "count": stats.count,
+                "percentile": pct, "top_pct": round(100.0 - pct, 2)}
+
+    def rank(self, params):
+        stats, score = self._block(params), self._score(params)
+        q = stats.query
+        return {"block": stats.code, "score": score, "count": stats.count,
+                "rank": q.rank(score), "above": int(q.count_above(score)),
+                "ties": q.ties(score)}
+
+    def thresholds(self, params):
+        stats = self._block(params)
+        return {"block": stats.code, "count": stats.count,
+                "rows": stats.query.counts_at_thresholds(max_score=stats.max_score)}
+
+    def figure(self, params):
+        from src.plots import histogram_json  # plotly only when figures are requested
+        stats, score = self._block(params), self._score(params)
+        return histogram_json(stats.hist, score, bin_max=stats.max_score,
+                              title=f"Phổ điểm - {stats.code} (toàn quốc)",
+                              hist=(stats.hist_counts, stats.hist_edges)).encode("utf-8")
+
+    def segment_table(self, params):
+        stats, score = self._block(params), self._score(params)
+        if self.segments is None:
+            raise HTTPError(404, "no candidate IDs in the dataset")
+        if stats.code not in self.segments:
+            raise HTTPError(404, f"no per-province data for {stats.code}")
+        seg = self.segments.stats(stats.code)
+        rows = seg.table(score)
+        if params.get("segment"):
+            try:
+                wanted = int(params["segment"][0])
+            except ValueError:
+                raise HTTPError(400, "segment must be an integer")
+            rows = [r for r in rows if r["segment"] == wanted]
+            if not rows:
+                raise HTTPError(404, f"unknown segment: {wanted}")
+        return {"block": stats.code, "score": score, "segments": rows}
+
+    def recommend(self, params):
+        try:
+            k = int(params.get("k", ["3"])[0])
+            scores = {name: float(values[0]) for name, values in params.items() if name != "k"}
+        except ValueError:
+            raise HTTPError(400, "k and subject scores must be numbers")
+        subjects = {s for subs in self.recommender.wanted.values() for s in subs}
+        unknown = sorted(set(scores) - subjects)
+        if unknown:
+            raise HTTPError(400, f"unknown subjects: {', '.join(unknown)}")
+        if not all(math.isfinite(v) for v in scores.values()):
+            raise HTTPError(400, "scores must be finite numbers")
+        return {"scores": scores, "blocks": self.recommender.recommend(scores, max(k, 1))}
+
+    def convert(self, params):
+        src = self._block(params, "src").code
+        score = self._score(params)
+        dsts = params.get("dst") or []
+        if not dsts:
+            raise HTTPError(400, "missing parameter: dst")
+        out = {}
+        for dst in dsts:
+            if dst not in self.block_index:
+                raise HTTPError(404, f"unknown block: {dst}")
+            value = score if dst == src else self.conversion.convert(src, dst, score)
+            out[dst] = None if math.isnan(value) else value
+        return {"src": src, "score": score, "converted": out}
+
+
+def load_service(path: str = DATA_PATH) -> LookupService:
+    if is_bundle(path):  # precomputed statistics (src/bundle.py): no per-province index
+        return LookupService(load_bundle(path).block_index())
+    _, columns = load_subject_columns(path, compact=True)
+    index = build_block_index(columns, workers=0)
+    ids = load_candidate_ids(path, compact=True)
+    segments = None
+    if ids is not None:
+        segments = SegmentIndex(ids, columns, {code: st.subjects for code, st in index.items()})
+    index.update(build_scheme_index(columns, load_schemes()))  # weighted schemes as extra blocks
+    return LookupService(index, segments)
+
+
+def create_app(service: LookupService = None, data_path: str = DATA_PATH):
+    """
+    ASGI application. The service is built at lifespan startup (or on the
+    first request when the server has no lifespan support) unless given.
+    """
+    state = {"service": service}
+
+    def get_service():
+        if state["service"] is None:
+            state["service"] = load_service(data_path)
+        return state["service"]
+
+    async def send_json(send, status, payload):
+        if isinstance(payload, bytes):
+            body, ctype = payload, b"application/json; charset=utf-8"
+        elif isinstance(payload, str):
+            body, ctype = payload.encode("utf-8"), b"text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, ctype = json.dumps(payload, ensure_ascii=False).encode("utf-8"), b"application/json; charset=utf-8"
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", ctype),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    try:
+                        get_service()
+                    except Exception as e:
+                        await send({"type": "lifespan.startup.failed", "message": str(e)})
+                        return
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        if scope["method"] != "GET":
+            await send_json(send, 405, {"error": "method not allowed"})
+            return
+        params = parse_qs(scope.get("query_string", b"").decode("utf-8"))
+        try:
+            payload = get_service().handle(scope["path"], params)
+        except HTTPError as e:
+            await send_json(send, e.status, {"error": e.message})
+            return
+        await send_json(send, 200, payload)
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn  # optional dependency, only needed to run the service
+
+    uvicorn.run("src.service:app", host="0.0.0.0", port=int(os.environ.get("PORT", "8000")),
+                workers=int(os.environ.get("WEB_CONCURRENCY", "1")))
@@ -0,0 +1,86 @@
+# src/streaming.py
+"""
+Streaming ingestion for score files larger than RAM.
+
+The CSV is read in fixed-size row chunks; each chunk is preprocessed,
+encoded compactly and folded into per-block counts over totals in
+hundredths (src/block_matrix.py). Only that counts matrix (a few MB for
+every block) outlives a chunk, and it is an exact, lossless summary:
+the block index built from it is identical to the in-memory one. Peak
+memory is therefore set by `chunk_rows`, not by the file size.
+
+    python -m src.streaming data/diem_2018.csv --chunk-rows 200000
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.block_index import index_blocks, index_from_counts, subject_columns
+from src.block_matrix import block_hundredth_counts
+from src.blocks import BLOCKS
+from src.compact import encode_columns
+from src.instrumentation import timed
+from src.preprocessing import preprocess
+
+CHUNK_ROWS = 200_000
+
+
+def iter_subject_chunks(path: str, chunk_rows: int = CHUNK_ROWS):
+    """
+    Yield (subjects, columns) per chunk of a CSV, preprocessed and compact.
+    """
+    if os.path.splitext(path)[1].lower() != ".csv":
+        raise ValueError("Streaming ingestion only supports CSV files")
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        df, subjects, backend = preprocess(chunk, "pandas")
+        yield subjects, encode_columns(subject_columns(df, subjects, backend))
+
+
+@timed()
+def stream_block_counts(path: str, blocks=BLOCKS, chunk_rows: int = CHUNK_ROWS):
+    """
+    Return (subjects, wanted, counts, rows): `wanted` = {code: subjects} of the
+    index entries, `counts` = their block_hundredth_counts over the whole file.
+    """
+    subjects, wanted, counts, rows = None, None, None, 0
+    for chunk_subjects, columns in iter_subject_chunks(path, chunk_rows):
+        if wanted is None:
+            subjects = chunk_subjects
+            wanted = index_blocks(subjects, blocks)
+        elif chunk_subjects != subjects:
+            raise ValueError("Subject columns changed between chunks")
+        part = block_hundredth_counts(columns, wanted)
+        counts = part if counts is None else counts + part
+        rows += len(columns[subjects[0]]) if subjects else 0
+    if wanted is None:
+        return [], {}, np.zeros((0, 1), dtype=np.int64), 0
+    return subjects, wanted, counts, rows
+
+
+def stream_block_index(path: str, blocks=BLOCKS, chunk_rows: int = CHUNK_ROWS, min_count=1):
+    """
+    (subjects, block index) of a CSV, built chunk by chunk.
+    """
+    subjects, wanted, counts, _ = stream_block_counts(path, blocks, chunk_rows)
+    return subjects, index_from_counts(wanted, counts, min_count)
+
+
+if __name__ == "__main__":
+    import tracemalloc
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = ap.parse_args()
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    subjects, wanted, counts, rows = stream_block_counts(args.path, chunk_rows=args.chunk_rows)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    print(f"{rows:,} rows, {len(subjects)} subjects, {len(wanted)} blocks/subjects "
+          f"in {elapsed:.2f}s, peak {peak / 2**20:.1f} MiB "
+          f"(counts matrix {counts.nbytes / 2**20:.1f} MiB)")
@@ -1,4 +1,5 @@
 # src/ui.py
+import numpy as np
 import streamlit as st
 
 def render_header():
@@ -21,3 +22,38 @@ def render_stat_cards(cards: dict):
     for col, (k, v) in zip(cols, cards.items()):
         with col:
             st.markdown(f"<div style='background:#fff;padding:14px;border-radius:10px;box-shadow:0 6px 18px rgba(0,0,0,0.04)'><div style='color:#666'>{k}</div><div style='font-size:22px;font-weight:700'>{v}</div></div>", unsafe_allow_html=True)
+
+def render_loading(future, poll_seconds: float = 0.5,
+                   message: str = "Đang chuẩn bị dữ liệu, trang sẽ tự cập nhật khi xong..."):
+    """
+    Placeholder while `future` runs in the background: polls it in a
+    fragment and reruns the whole app once it is done.
+    """
+    @st.fragment(run_every=poll_seconds)
+    def _poll():
+        if future.done():
+            st.rerun()
+        st.info(f"⏳ {message}")
+    _poll()
+
+def render_debug_panel(snapshot: dict, samples_fn, profile_text: str = None):
+    """
+    Sidebar panel: per-stage latency table (src/instrumentation.snapshot())
+    + latency histogram of one stage across reruns + last cProfile output.
+    """
+    import pandas as pd
+
+    with st.sidebar.expander("🛠 Debug: thời gian xử lý", expanded=False):
+        if not snapshot:
+            st.caption("Chưa có số liệu.")
+        else:
+            df = pd.DataFrame.from_dict(snapshot, orient="index")
+            df["alloc_MiB"] = df.pop("alloc_bytes") / 2**20
+            st.dataframe(df.drop(columns=["total_ms"]).round(3), use_container_width=True)
+            name = st.selectbox("Phổ độ trễ của bước", list(snapshot), key="debug_stage")
+            ms = samples_fn(name)
+            counts, edges = np.histogram(ms, bins=min(20, max(1, len(ms))))
+            st.bar_chart(pd.Series(counts, index=[f"{e:.2f}" for e in edges[:-1]], name="lần chạy"))
+        st.checkbox("cProfile lần chạy tiếp theo", key="debug_profile")
+        if profile_text:
+            st.code(profile_text, language=None)
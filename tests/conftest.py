@@ -0,0 +1,77 @@
+# tests/conftest.py
+"""
+Shared synthetic data: a few thousand THPT-shaped rows (benchmarks/synthetic.py),
+as a raw DataFrame, a CSV file, preprocessed float64 columns and their SBDs.
+"""
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_scores
+from src.block_index import id_column, subject_columns
+from src.preprocessing import preprocess
+
+ROWS = 4000
+
+
+@pytest.fixture(scope="session")
+def raw_scores():
+    return make_scores(ROWS, seed=7)
+
+
+@pytest.fixture(scope="session")
+def score_file(raw_scores, tmp_path_factory):
+    path = tmp_path_factory.mktemp("data") / "diem.csv"
+    raw_scores.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def processed(raw_scores):
+    """
+    (preprocessed pandas DataFrame, subjects)
+    """
+    df, subjects, _ = preprocess(raw_scores.copy(), "pandas")
+    return df, subjects
+
+
+@pytest.fixture(scope="session")
+def float_columns(processed):
+    df, subjects = processed
+    return subject_columns(df, subjects, "pandas")
+
+
+@pytest.fixture(scope="session")
+def candidate_ids(processed):
+    df, _ = processed
+    return id_column(df, "pandas")
+
+
+def _assert_same_index(a: dict, b: dict):
+    assert sorted(a) == sorted(b)
+    for code in a:
+        assert a[code].subjects == b[code].subjects, code
+        assert a[code].max_score == b[code].max_score, code
+        assert a[code].hist == b[code].hist, code
+
+
+@pytest.fixture
+def assert_same_index():
+    """
+    Checker for two block indexes: same codes, subjects, max scores and
+    exact distributions.
+    """
+    return _assert_same_index
+
+
+def _row_totals(columns: dict, subjects) -> np.ndarray:
+    totals = np.sum([columns[s] for s in subjects], axis=0)
+    return np.round(totals, 2)
+
+
+@pytest.fixture
+def row_totals():
+    """
+    Brute-force block total of every row (NaN when a subject is missing),
+    on the 0.01 grid like the indexes.
+    """
+    return _row_totals
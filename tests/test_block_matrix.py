@@ -0,0 +1,32 @@
+# tests/test_block_matrix.py
+"""
+The batched block pass (src/block_matrix.py) against per-block pandas
+totals, and the parallel builds (src/parallel.py) against the serial one.
+"""
+import numpy as np
+import pytest
+
+from src.analysis import compute_block_totals
+from src.block_index import build_block_index, index_blocks
+from src.block_matrix import block_hundredth_counts
+from src.histogram import ScoreHistogram
+from src.parallel import parallel_block_counts
+
+
+def test_batched_index_matches_per_block_totals(processed, float_columns):
+    df, subjects = processed
+    wanted = index_blocks(subjects)
+    index = build_block_index(float_columns)
+    reference = compute_block_totals(df, wanted, backend="pandas")
+    assert set(index) == {code for code, totals in reference.items() if totals.size}
+    for code, stats in index.items():
+        assert stats.hist == ScoreHistogram.from_totals(reference[code]), code
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parallel_counts_match_serial(float_columns, executor):
+    wanted = index_blocks(list(float_columns))
+    serial = block_hundredth_counts(float_columns, wanted)
+    parallel = parallel_block_counts(float_columns, wanted, workers=3, executor=executor,
+                                     chunk_rows=512)
+    assert np.array_equal(parallel, serial)
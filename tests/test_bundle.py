@@ -0,0 +1,43 @@
+# tests/test_bundle.py
+"""
+Statistics bundles (src/bundle.py): export -> load gives back the block
+index and the tables it was built from.
+"""
+import numpy as np
+
+from src.block_index import build_block_index
+from src.bundle import export_bundle, is_bundle, load_bundle
+from src.conversion import ConversionService
+from src.registry import DatasetRegistry
+from src.schemes import DEFAULT_SCHEMES, build_scheme_index
+
+
+def test_bundle_round_trip(float_columns, tmp_path, assert_same_index):
+    index = build_block_index(float_columns)
+    index.update(build_scheme_index(float_columns, DEFAULT_SCHEMES))
+    out = str(tmp_path / "bundle")
+    export_bundle(index, out, {"path": "diem.csv"})
+    assert is_bundle(out)
+
+    bundle = load_bundle(out)
+    assert bundle.source == {"path": "diem.csv"}
+    assert_same_index(bundle.block_index(), index)
+    conversion = ConversionService(index)
+    for code, stats in index.items():
+        assert bundle.percentile_table(code) == conversion.percentile_table(code)
+        assert bundle.thresholds(code) == stats.query.counts_at_thresholds(max_score=stats.max_score)
+        assert bundle.blocks[code]["bins"] == stats.hist_counts.tolist()
+    for s_bundle, code in zip(bundle.curve("A00", "D01"), ("A00", "D01")):
+        np.testing.assert_array_equal(s_bundle, conversion.table(code))
+
+
+def test_registry_serves_bundle_like_data_file(score_file, tmp_path):
+    registry = DatasetRegistry({"csv": score_file}, cache_dir=str(tmp_path / "cache"))
+    out = str(tmp_path / "bundle")
+    export_bundle(registry.get("csv").block_index, out)
+    registry.register("bundle", out)
+    ds = registry.get("bundle")
+    assert ds.columns is None and ds.segments is None
+    for score in (12.0, 18.5, 21.0, 26.75):
+        assert (registry.convert("bundle", "A00", "bundle", "D01", score)
+                == registry.convert("csv", "A00", "csv", "D01", score))
@@ -0,0 +1,35 @@
+# tests/test_compact.py
+"""
+Compact score columns (src/compact.py) give the same data and the same
+block index as float64 columns.
+"""
+import numpy as np
+
+from src.block_index import build_block_index
+from src.compact import CompactColumn, encode_column, encode_columns, patch_column
+
+
+def test_encode_round_trip(float_columns):
+    for subj, col in float_columns.items():
+        compact = encode_column(col)
+        assert compact.nbytes < col.nbytes
+        np.testing.assert_array_equal(compact.to_float(), col, err_msg=subj)
+
+
+def test_compact_index_matches_float(float_columns, assert_same_index):
+    compact = encode_columns(float_columns)
+    assert all(isinstance(c, CompactColumn) for c in compact.values())
+    assert_same_index(build_block_index(compact), build_block_index(float_columns))
+
+
+def test_patch_column_matches_reencoding():
+    col = encode_column(np.array([1.0, np.nan, 2.5, 7.75]))
+    pos, values = np.array([1, 4, 0]), np.array([9.25, 3.0, np.nan])
+    patched = patch_column(col, pos, values, size=6)
+    expected = np.array([np.nan, 9.25, 2.5, 7.75, 3.0, np.nan])
+    assert patched.step == col.step  # on the column's grid: codes patched in place
+    np.testing.assert_array_equal(patched.to_float(), expected)
+    np.testing.assert_array_equal(patched.take(np.array([4, 1])), [3.0, 9.25])
+
+    off_grid = patch_column(col, np.array([0]), np.array([3.33]))
+    np.testing.assert_array_equal(off_grid.to_float(), [3.33, np.nan, 2.5, 7.75])
@@ -0,0 +1,85 @@
+# tests/test_conversion.py
+"""
+Block -> block conversion (src/conversion.py) against
+convert_score_via_percentile on percentile tables of the sorted totals,
+and the shared background jobs.
+"""
+import threading
+
+import numpy as np
+import pytest
+
+from src.analysis import build_percentile_table, compute_block_totals
+from src.block_index import build_block_index
+from src.conversion import ConversionJobs, ConversionService, convert_score_via_percentile
+
+BLOCKS = {"A00": ["Toán", "Lí", "Hóa"], "D01": ["Toán", "Văn", "Tiếng Anh"],
+          "C00": ["Văn", "Sử", "Địa"]}
+SCORES = [-1.0, 0.0, 8.25, 15.0, 19.5, 21.05, 24.0, 28.5, 30.0, 31.0]
+
+
+@pytest.fixture(scope="module")
+def tables(processed):
+    df, _ = processed
+    totals = compute_block_totals(df, BLOCKS, backend="pandas")
+    return {code: build_percentile_table(np.round(t, 2)) for code, t in totals.items()}
+
+
+@pytest.fixture(scope="module")
+def conversion(float_columns):
+    return ConversionService(build_block_index(float_columns, BLOCKS))
+
+
+@pytest.mark.parametrize("src, dst", [("A00", "D01"), ("D01", "C00"), ("C00", "A00")])
+def test_convert_matches_percentile_tables(conversion, tables, src, dst):
+    assert conversion.percentile_table(src) == tables[src]
+    expected = [convert_score_via_percentile(tables[src], tables[dst], s) for s in SCORES]
+    assert [conversion.convert(src, dst, s) for s in SCORES] == pytest.approx(expected)
+    np.testing.assert_allclose(conversion.convert_many(src, dst, SCORES), expected)
+    matrix = conversion.conversion_matrix(src, SCORES, [src, dst])
+    np.testing.assert_array_equal(matrix[:, 0], SCORES)
+    np.testing.assert_allclose(matrix[:, 1], expected)
+
+
+def test_convert_empty_block_is_nan(float_columns):
+    columns = dict(float_columns, Sử=np.full_like(float_columns["Sử"], np.nan))
+    conversion = ConversionService(build_block_index(columns, BLOCKS, min_count=0))
+    assert np.isnan(conversion.convert("A00", "C00", 20.0))
+    assert np.isnan(conversion.convert_many("C00", "A00", SCORES)).all()
+
+
+def test_jobs_share_one_future_per_key():
+    jobs = ConversionJobs(max_workers=2)
+    release, calls = threading.Event(), []
+
+    def work(x):
+        calls.append(x)
+        release.wait(5)
+        return x * 2
+
+    first = jobs.submit(("A00", "D01"), work, 1)
+    assert jobs.submit(("A00", "D01"), work, 1) is first
+    other = jobs.submit(("A00", "C00"), work, 2)
+    release.set()
+    assert (first.result(5), other.result(5)) == (2, 4)
+    # finished futures are reused, not recomputed
+    assert jobs.submit(("A00", "D01"), work, 1) is first
+    assert sorted(calls) == [1, 2]
+
+
+def test_jobs_resubmit_failed_key():
+    jobs = ConversionJobs(max_workers=1)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("target file not ready")
+        return 21.05
+
+    failed = jobs.submit("k", flaky)
+    with pytest.raises(OSError):
+        failed.result(5)
+    retry = jobs.submit("k", flaky)
+    assert retry is not failed and retry.result(5) == 21.05
+    assert jobs.submit("k", flaky) is retry and len(attempts) == 2
@@ -0,0 +1,70 @@
+# tests/test_histogram.py
+"""
+ScoreHistogram (src/histogram.py) against the sorted-totals functions of
+src/analysis.py, plus merge and the byte format.
+"""
+import numpy as np
+import pytest
+
+from src.analysis import (build_percentile_table, compute_block_totals, counts_at_thresholds,
+                          percentile_of_score, rank_of_score)
+from src.histogram import ScoreHistogram
+
+BLOCKS = {"A00": ["Toán", "Lí", "Hóa"], "D01": ["Toán", "Văn", "Tiếng Anh"], "Toán": ["Toán"]}
+
+
+@pytest.fixture(scope="module")
+def block_totals(processed):
+    df, _ = processed
+    return compute_block_totals(df, BLOCKS, backend="pandas")
+
+
+@pytest.mark.parametrize("code", list(BLOCKS))
+def test_queries_match_sorted_totals(block_totals, code):
+    totals = np.round(block_totals[code], 2)
+    hist = ScoreHistogram.from_totals(totals)
+    max_score = 10 * len(BLOCKS[code])
+    scores = np.r_[np.unique(totals)[::5], -1.0, 0.0, 12.3, 21.05, max_score, max_score + 1]
+    for score in scores:
+        assert hist.percentile(score) == percentile_of_score(totals, score), score
+        assert hist.rank(score) == rank_of_score(totals, score), score
+    assert hist.counts_at_thresholds(max_score) == counts_at_thresholds(totals, max_score)
+    assert build_percentile_table(hist) == build_percentile_table(totals)
+    np.testing.assert_array_equal(hist.sorted_totals(), np.sort(totals))
+
+
+def test_empty_histogram_matches_empty_totals():
+    hist, totals = ScoreHistogram(np.zeros(0, dtype=np.int64)), np.array([])
+    assert hist.percentile(15.0) == percentile_of_score(totals, 15.0)
+    assert hist.rank(15.0) == rank_of_score(totals, 15.0)
+    assert hist.counts_at_thresholds(30) == counts_at_thresholds(totals, 30)
+    assert build_percentile_table(hist) == build_percentile_table(totals)
+
+
+def test_merge_is_histogram_of_concatenation(block_totals):
+    a, b = np.round(block_totals["A00"], 2), np.round(block_totals["Toán"], 2)
+    merged = ScoreHistogram.from_totals(a).merge(ScoreHistogram.from_totals(b))
+    assert merged == ScoreHistogram.from_totals(np.concatenate([a, b]))
+    assert ScoreHistogram.from_totals(b) + ScoreHistogram.from_totals(a) == merged
+    assert merged.n == a.size + b.size
+
+
+def test_bytes_round_trip(block_totals):
+    hist = ScoreHistogram.from_totals(np.round(block_totals["D01"], 2))
+    data = hist.to_bytes()
+    back = ScoreHistogram.from_bytes(data)
+    assert back == hist and back.size == hist.size
+    assert ScoreHistogram.from_bytes(ScoreHistogram(np.zeros(0, dtype=np.int64)).to_bytes()).n == 0
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda d: d[:-4],             # truncated counts
+    lambda d: d + b"\0\0\0\0",    # trailing bytes
+    lambda d: d[:7],              # truncated header
+    lambda d: b"XXXX" + d[4:],    # wrong magic
+    lambda d: d[:4] + b"\x09\x00" + d[6:],  # unknown version
+])
+def test_from_bytes_rejects_bad_buffers(corrupt):
+    data = ScoreHistogram(np.array([1, 0, 3, 2])).to_bytes()
+    with pytest.raises(ValueError):
+        ScoreHistogram.from_bytes(corrupt(data))
@@ -0,0 +1,58 @@
+# tests/test_incremental.py
+"""
+Delta updates by SBD (src/incremental.py) against full rebuilds.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.block_index import build_block_index
+from src.compact import CompactColumn
+from src.incremental import IncrementalIndex, merged_rebuild
+from src.schemes import DEFAULT_SCHEMES
+
+BASE_ROWS = 3000
+
+
+@pytest.fixture
+def update_files(raw_scores, tmp_path):
+    """
+    (base file, [update files]): appeals on existing candidates, new
+    candidates, and a batch without the Sinh column.
+    """
+    base = raw_scores.iloc[:BASE_ROWS]
+    appeals = base.iloc[100:300].copy()
+    appeals["Toán"] = np.clip(appeals["Toán"].fillna(5.0) + 0.25, 0, 10)
+    late = raw_scores.iloc[BASE_ROWS:BASE_ROWS + 200]
+    second = base.iloc[250:400].drop(columns=["Sinh"])
+    paths = []
+    for i, part in enumerate([base, pd.concat([appeals, late]), second]):
+        path = tmp_path / f"part_{i}.csv"
+        part.to_csv(path, index=False)
+        paths.append(str(path))
+    return paths[0], paths[1:]
+
+
+def test_updates_match_merged_rebuild(update_files, tmp_path):
+    base, updates = update_files
+    inc = IncrementalIndex.from_cache(base, schemes=DEFAULT_SCHEMES,
+                                      cache_dir=str(tmp_path / "cache"), compact=True)
+    first = inc.apply_file(updates[0])
+    assert (first["replaced"], first["added"]) == (200, 200)
+    assert any(s.name in first["changed_blocks"] for s in DEFAULT_SCHEMES)
+    inc.apply_file(updates[1])
+    assert inc.verify() == []
+    assert inc.verify(merged_rebuild(base, updates, schemes=DEFAULT_SCHEMES)) == []
+    # the rows stay in compact storage
+    assert all(isinstance(c, CompactColumn) for c in inc.columns.values())
+
+
+def test_remove_matches_rebuild_without_rows(float_columns, assert_same_index):
+    ids = np.arange(len(next(iter(float_columns.values()))), dtype=np.int64) + 1_000_000
+    inc = IncrementalIndex(ids, float_columns)
+    gone = ids[::7]
+    assert inc.remove(gone)["removed"] == gone.size
+    keep = ~np.isin(ids, gone)
+    assert_same_index(inc.block_index,
+                      build_block_index({s: c[keep] for s, c in float_columns.items()}))
+    assert inc.remove(gone)["removed"] == 0
@@ -0,0 +1,57 @@
+# tests/test_recommend.py
+"""
+Top-k block recommender (src/recommend.py) against the national
+percentile of every eligible block, candidate by candidate.
+"""
+import numpy as np
+import pytest
+
+from src.analysis import percentile_of_score, rank_of_score
+from src.block_index import build_block_index
+from src.blocks import BLOCKS
+from src.recommend import BlockRecommender
+
+ROWS = 300
+
+
+@pytest.fixture(scope="module")
+def recommender(float_columns):
+    return BlockRecommender(build_block_index(float_columns))
+
+
+def _brute_force(recommender, columns, row_totals, k):
+    totals = {code: row_totals(columns, subs) for code, subs in recommender.wanted.items()}
+    eligible = {code: t[~np.isnan(t)] for code, t in totals.items()}
+    out = []
+    for i in range(ROWS):
+        ranked = [(-percentile_of_score(eligible[code], totals[code][i]), j, code)
+                  for j, code in enumerate(recommender.codes) if not np.isnan(totals[code][i])]
+        out.append([(code, -neg) for neg, _, code in sorted(ranked)[:k]])
+    return out
+
+
+@pytest.mark.parametrize("k", [1, 3, 8])
+def test_top_k_matches_brute_force(recommender, float_columns, row_totals, k):
+    assert recommender.codes and all(code in BLOCKS for code in recommender.codes)
+    best, best_pct = recommender.top_k(float_columns, k, chunk_rows=128)
+    expected = _brute_force(recommender, float_columns, row_totals, k)
+    for i, want in enumerate(expected):
+        got = [(recommender.codes[j], p) for j, p in zip(best[i], best_pct[i]) if j >= 0]
+        assert [c for c, _ in got] == [c for c, _ in want], i
+        assert [p for _, p in got] == pytest.approx([p for _, p in want]), i
+        assert (best[i, len(want):] == -1).all() and np.isnan(best_pct[i, len(want):]).all()
+
+
+def test_recommend_one_candidate(recommender, float_columns, row_totals):
+    scores = {"Toán": 8.0, "Lí": 7.5, "Hóa": 6.25, "Văn": 6.0, "Tiếng Anh": None}
+    out = recommender.recommend(scores, k=2)
+    eligible = [c for c in recommender.codes
+                if all(scores.get(s) is not None for s in recommender.wanted[c])]
+    assert [r["block"] for r in out][:1] and all(r["block"] in eligible for r in out)
+    for r in out:
+        totals = row_totals(float_columns, r["subjects"])
+        totals = totals[~np.isnan(totals)]
+        assert r["total"] == round(sum(scores[s] for s in r["subjects"]), 2)
+        assert r["percentile"] == pytest.approx(percentile_of_score(totals, r["total"]))
+        assert r["rank"] == rank_of_score(totals, r["total"])
+    assert recommender.recommend({}) == []
@@ -0,0 +1,92 @@
+# tests/test_registry.py
+"""
+DatasetRegistry (src/registry.py): update batches, reloads, eviction and
+cross-dataset conversion.
+"""
+import pytest
+
+from src.conversion import convert_score_via_percentile
+from src.incremental import merged_rebuild
+from src.registry import DatasetRegistry
+from src.schemes import DEFAULT_SCHEMES
+from src.segments import SegmentIndex
+
+BASE_ROWS = 3000
+
+
+@pytest.fixture
+def registry(raw_scores, tmp_path):
+    """
+    Registry over a base file without the Sinh column, plus update files:
+    "good" (appeals + new candidates), "no_sbd" (unreadable: no SBD) and
+    "new_subject" (readable, but Sinh is not in the dataset).
+    """
+    base = raw_scores.iloc[:BASE_ROWS].drop(columns=["Sinh"])
+    base.to_csv(tmp_path / "base.csv", index=False)
+    files = {
+        "good": raw_scores.iloc[BASE_ROWS - 100:BASE_ROWS + 100].drop(columns=["Sinh"]),
+        "no_sbd": raw_scores.iloc[:50].drop(columns=["SBD"]),
+        "new_subject": raw_scores.iloc[:50],
+    }
+    paths = {}
+    for key, df in files.items():
+        paths[key] = str(tmp_path / f"{key}.csv")
+        df.to_csv(paths[key], index=False)
+    reg = DatasetRegistry({"y": str(tmp_path / "base.csv")}, cache_dir=str(tmp_path / "cache"),
+                          schemes=DEFAULT_SCHEMES)
+    return reg, paths
+
+
+@pytest.mark.parametrize("bad", ["no_sbd", "new_subject"])
+@pytest.mark.parametrize("loaded", [False, True])
+def test_bad_batch_is_not_replayed(registry, bad, loaded):
+    reg, paths = registry
+    if loaded:
+        reg.get("y")
+    reg.add_update("y", paths["good"])
+    if loaded or bad == "no_sbd":
+        with pytest.raises(ValueError):
+            reg.add_update("y", paths[bad])
+    else:
+        # only checkable against the loaded rows: the next load fails once
+        assert reg.add_update("y", paths[bad]) is None
+        with pytest.raises(ValueError):
+            reg.get("y")
+    reg.evict("y")
+    ds = reg.get("y")  # reload replays only the good batch
+    assert ds.incremental is not None and len(ds.incremental) == BASE_ROWS + 100
+
+
+def test_update_matches_rebuild(registry, assert_same_index):
+    reg, paths = registry
+    reg.get("y").segments.build(["A00", "D01"])
+    reg.add_update("y", paths["good"])
+    ds = reg.get("y")
+    # blocks and schemes by delta == the merged files indexed from scratch
+    assert_same_index(ds.block_index,
+                      merged_rebuild(reg.path("y"), [paths["good"]], schemes=DEFAULT_SCHEMES))
+    assert ds.conversion.block_index is ds.block_index
+    # province matrices carried over == built from the new rows
+    fresh = SegmentIndex(ds.incremental.ids, ds.columns, ds.segments.wanted)
+    for code in ("A00", "D01", "Toán"):
+        assert (ds.segments.stats(code)._cum == fresh.stats(code)._cum).all(), code
+
+
+def test_eviction_under_memory_budget(score_file, raw_scores, tmp_path, assert_same_index):
+    other = tmp_path / "other.csv"
+    raw_scores.iloc[:2000].to_csv(other, index=False)
+    reg = DatasetRegistry({"a": score_file, "b": str(other)}, cache_dir=str(tmp_path / "cache"))
+    a = reg.get("a")
+    reg.memory_budget = a.nbytes + 1  # room for "a" alone
+    b = reg.get("b")
+    assert reg.loaded() == ["b"]
+    # a reload gives the same index; the least recently used one goes
+    assert_same_index(reg.get("a").block_index, a.block_index)
+    assert reg.loaded() == ["a"]
+    # cross-dataset conversion == convert_score_via_percentile on both tables
+    for score in (15.0, 21.05, 27.5):
+        expected = convert_score_via_percentile(a.conversion.percentile_table("A00"),
+                                                b.conversion.percentile_table("D01"), score)
+        assert reg.convert("a", "A00", "b", "D01", score) == expected
+    with pytest.raises(KeyError):
+        reg.convert("a", "Z99", "b", "D01", 20.0)
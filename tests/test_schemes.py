@@ -0,0 +1,78 @@
+# tests/test_schemes.py
+"""
+Weighted scoring schemes (src/schemes.py): the batched index against
+ScoringScheme.total candidate by candidate, declaration checks and bonus.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from src.compact import encode_columns
+from src.histogram import ScoreHistogram
+from src.schemes import DEFAULT_SCHEMES, ScoringScheme, apply_bonus, build_scheme_index
+
+
+def _reference_hist(columns: dict, scheme: ScoringScheme) -> ScoreHistogram:
+    n = len(next(iter(columns.values())))
+    totals = [scheme.total({s: float(columns[s][i]) for s in scheme.subjects}) for i in range(n)]
+    return ScoreHistogram.from_totals([t for t in totals if not math.isnan(t)])
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_scheme_index_matches_per_candidate_totals(float_columns, compact):
+    columns = encode_columns(float_columns) if compact else float_columns
+    index = build_scheme_index(columns, DEFAULT_SCHEMES)
+    assert list(index) == [s.name for s in DEFAULT_SCHEMES]
+    for scheme in DEFAULT_SCHEMES:
+        stats = index[scheme.name]
+        assert stats.subjects == scheme.subjects
+        assert stats.max_score == math.ceil(scheme.max_score)
+        assert stats.hist == _reference_hist(float_columns, scheme), scheme.name
+
+
+def test_total_rounds_weighted_sum():
+    scheme = ScoringScheme("A00 Toán×2 (30)", "A00", (("Toán", 2),), 30)
+    # (2 x 7.25 + 6.5 + 8.0) x 30 / 40 = 21.75
+    assert scheme.total({"Toán": 7.25, "Lí": 6.5, "Hóa": 8.0}) == 21.75
+    assert math.isnan(scheme.total({"Toán": 7.25, "Lí": 6.5}))
+    assert scheme.effective_weights() == {"Toán": 1.5, "Lí": 0.75, "Hóa": 0.75}
+
+
+@pytest.mark.parametrize("d", [
+    {"name": "x", "block": "A00", "weights": {"Toán": "2"}},
+    {"name": "x", "block": "A00", "weights": {"Toán": True}},
+    {"name": "x", "block": "A00", "weights": {"Toán": 0}},
+    {"name": "x", "block": "A00", "weights": {"Văn": 2}},
+    {"name": "x", "block": "A00", "weights": [["Toán", 2]]},
+    {"name": "x", "block": "A00", "scale": "30"},
+    {"name": "x", "block": "A00", "scale": -1},
+    {"name": "x", "block": "Z99"},
+    {"name": "x"},
+])
+def test_from_dict_rejects_bad_declarations(d):
+    with pytest.raises(ValueError):
+        ScoringScheme.from_dict(d)
+
+
+def test_from_dict_accepts_defaults():
+    scheme = ScoringScheme.from_dict({"name": "x", "block": "D01", "weights": {"Tiếng Anh": 2}})
+    assert scheme.max_score == 40 and scheme.scale == 0
+    assert ScoringScheme.from_dict({"name": "y", "block": "A00", "scale": 30}).max_score == 30
+
+
+@pytest.mark.parametrize("total, bonus, max_score, expected", [
+    (20.0, 0.0, 30, 20.0),     # no bonus
+    (20.0, 2.0, 30, 22.0),     # below 22.5: full bonus
+    (22.5, 2.0, 30, 24.5),     # at 22.5: still full
+    (27.0, 2.0, 30, 27.8),     # 2 x (30 - 27) / 7.5 = 0.8
+    (30.0, 2.75, 30, 30.0),    # nothing left at the top
+    (28.0, 2.0, 40, 30.67),    # 40 scale: 21/30 -> full 2 points = 2.67 on 40
+    (36.0, 1.5, 40, 36.8),     # 27/30 -> 1.5 x 3 / 7.5 = 0.6 -> 0.8 on 40
+])
+def test_apply_bonus(total, bonus, max_score, expected):
+    assert apply_bonus(total, bonus, max_score) == expected
+
+
+def test_apply_bonus_keeps_nan():
+    assert math.isnan(apply_bonus(math.nan, 1.0))
@@ -0,0 +1,71 @@
+# tests/test_segments.py
+"""
+Per-province segment index (src/segments.py) against filtering the
+candidates of each province.
+"""
+import numpy as np
+import pytest
+
+from src.analysis import percentile_of_score, rank_of_score
+from src.compact import encode_columns
+from src.histogram import ScoreHistogram
+from src.segments import SegmentIndex, province_codes
+
+WANTED = {"A00": ["Toán", "Lí", "Hóa"], "D01": ["Toán", "Văn", "Tiếng Anh"], "Toán": ["Toán"]}
+
+
+def _take(columns: dict, pos) -> dict:
+    return {s: col[pos] for s, col in columns.items()}
+
+
+def _assert_same_stats(a: SegmentIndex, b: SegmentIndex, codes):
+    np.testing.assert_array_equal(a.segments, b.segments)
+    for code in codes:
+        np.testing.assert_array_equal(a.stats(code)._cum, b.stats(code)._cum, err_msg=code)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_updated_matches_rebuild(float_columns, candidate_ids, compact):
+    ids = candidate_ids
+    # base without provinces 5 and 17; the batch appeals 300 rows and adds those provinces
+    late = np.isin(province_codes(ids), [5, 17])
+    order = np.r_[np.flatnonzero(~late), np.flatnonzero(late)]
+    ids, columns = ids[order], _take(float_columns, order)
+    n_base = int((~late).sum())
+    before = _take(columns, np.arange(n_base))
+    after = {s: col.copy() for s, col in columns.items()}
+    appeals = np.arange(100, 400)
+    after["Toán"][appeals] = np.clip(np.nan_to_num(after["Toán"][appeals], nan=5.0) + 0.25, 0, 10)
+    if compact:
+        before, after = encode_columns(before), encode_columns(after)
+
+    seg = SegmentIndex(ids[:n_base], before, WANTED, prebuild=["A00", "Toán"])
+    rows = np.r_[appeals, np.arange(n_base, ids.size)]
+    new = seg.updated(ids, after, rows)
+    assert 5 in new.segments and 5 not in seg.segments
+    # built blocks are carried over, the others are still built on first use
+    assert set(new._cache) == {"A00", "Toán"}
+    _assert_same_stats(new, SegmentIndex(ids, after, WANTED), WANTED)
+    # the old index still answers for the rows before the batch
+    _assert_same_stats(seg, SegmentIndex(ids[:n_base], before, WANTED), WANTED)
+
+
+@pytest.mark.parametrize("code", list(WANTED))
+def test_stats_match_per_province_filtering(float_columns, candidate_ids, row_totals, code):
+    seg = SegmentIndex(candidate_ids, float_columns, WANTED)
+    stats = seg.stats(code)
+    totals = row_totals(float_columns, WANTED[code])
+    provinces = province_codes(candidate_ids)
+    scores = np.array([0.0, 5.5, 12.0, 18.5, 21.05, 27.0])
+    pct, rank = stats.percentiles(scores), stats.ranks(scores)
+    for g, p in enumerate(seg.segments):
+        mine = totals[(provinces == p) & ~np.isnan(totals)]
+        assert stats.n[g] == mine.size
+        assert stats.histogram(p) == ScoreHistogram.from_totals(mine)
+        for i, score in enumerate(scores):
+            assert pct[g, i] == pytest.approx(percentile_of_score(mine, score)), (p, score)
+            assert rank[g, i] == rank_of_score(mine, score), (p, score)
+    row = next(r for r in stats.table(21.05) if r["segment"] == seg.segments[0])
+    mine = totals[(provinces == seg.segments[0]) & ~np.isnan(totals)]
+    assert row["rank"] == rank_of_score(mine, 21.05)
+    assert row["ties"] == int((mine == 21.05).sum())
@@ -0,0 +1,85 @@
+# tests/test_service.py
+"""
+HTTP lookup service (src/service.py) through its ASGI app: answers against
+the sorted-totals functions of src/analysis.py, and the error statuses.
+"""
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from src.analysis import percentile_of_score, rank_of_score
+from src.block_index import build_block_index
+from src.conversion import ConversionService
+from src.segments import SegmentIndex, province_codes
+from src.service import LookupService, create_app
+
+
+@pytest.fixture(scope="module")
+def app(float_columns, candidate_ids):
+    index = build_block_index(float_columns)
+    segments = SegmentIndex(candidate_ids, float_columns, {"A00": index["A00"].subjects})
+    return create_app(LookupService(index, segments))
+
+
+def _get(app, path, query="", method="GET"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode()}
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+@pytest.mark.parametrize("score", [0.0, 12.0, 18.5, 21.05, 30.0])
+def test_percentile_and_rank(app, float_columns, row_totals, score):
+    totals = row_totals(float_columns, ["Toán", "Lí", "Hóa"])
+    totals = totals[~np.isnan(totals)]
+    status, body = _get(app, "/percentile", f"block=A00&score={score}")
+    assert status == 200 and body["count"] == totals.size
+    assert body["percentile"] == pytest.approx(percentile_of_score(totals, score))
+    status, body = _get(app, "/rank", f"block=A00&score={score}")
+    assert status == 200 and body["rank"] == rank_of_score(totals, score)
+    assert body["ties"] == int((totals == score).sum())
+
+
+def test_segments_and_convert(app, float_columns, candidate_ids, row_totals):
+    totals = row_totals(float_columns, ["Toán", "Lí", "Hóa"])
+    province = int(province_codes(candidate_ids)[0])
+    mine = totals[(province_codes(candidate_ids) == province) & ~np.isnan(totals)]
+    status, body = _get(app, "/segments", f"block=A00&score=20&segment={province}")
+    assert status == 200 and body["segments"][0]["rank"] == rank_of_score(mine, 20.0)
+    status, body = _get(app, "/convert", "src=A00&score=21&dst=A00&dst=D01")
+    assert status == 200 and body["converted"]["A00"] == 21.0
+    expected = ConversionService(build_block_index(float_columns)).convert("A00", "D01", 21.0)
+    assert body["converted"]["D01"] == expected
+
+
+@pytest.mark.parametrize("path, query, status", [
+    ("/percentile", "block=A00&score=nan", 400),
+    ("/percentile", "block=A00&score=inf", 400),
+    ("/rank", "block=A00&score=-inf", 400),
+    ("/rank", "block=A00&score=abc", 400),
+    ("/percentile", "block=A00", 400),
+    ("/percentile", "block=Z99&score=20", 404),
+    ("/convert", "src=A00&score=20", 400),
+    ("/convert", "src=A00&score=20&dst=Z99", 404),
+    ("/segments", "block=D01&score=20", 404),
+    ("/segments", "block=A00&score=20&segment=x", 400),
+    ("/recommend", "Toán=nan&Lí=7", 400),
+    ("/recommend", "Tin=8", 400),
+    ("/nope", "", 404),
+])
+def test_errors(app, path, query, status):
+    got, body = _get(app, path, query)
+    assert got == status and "error" in body
+
+
+def test_only_get(app):
+    assert _get(app, "/blocks", method="POST")[0] == 405
@@ -0,0 +1,14 @@
+# tests/test_streaming.py
+"""
+The chunked CSV build (src/streaming.py) against the in-memory build.
+"""
+from src.block_index import build_block_index
+from src.cache import load_subject_columns
+from src.streaming import stream_block_index
+
+
+def test_streaming_index_matches_in_memory(score_file, assert_same_index):
+    subjects, streamed = stream_block_index(score_file, chunk_rows=700)
+    loaded_subjects, columns = load_subject_columns(score_file, use_cache=False)
+    assert sorted(subjects) == sorted(loaded_subjects)
+    assert_same_index(streamed, build_block_index(columns))